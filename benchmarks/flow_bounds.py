@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the flow bound initialization of the OperationalModel.
+
+Compares the bulk assignment of :meth:`OperationalModel._set_flow_bounds
+<oemof.solph.models.OperationalModel._set_flow_bounds>` with the former loop
+which set the bounds variable by variable.
+
+Usage::
+
+    python benchmarks/flow_bounds.py --flows 300 --timesteps 8760
+
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from oemof import solph
+
+
+def create_energy_system(flows, timesteps):
+    """Creates an energy system with one bus and `flows` sources/sinks with
+    time dependent bounds and fixed values.
+    """
+    timeindex = pd.date_range('1/1/2012', periods=timesteps, freq='H')
+    es = solph.EnergySystem(timeindex=timeindex)
+    bus = solph.Bus(label='bus')
+    for n in range(flows):
+        profile = list(np.random.random(timesteps))
+        if n % 2:
+            solph.Source(label='source_{0}'.format(n), outputs={
+                bus: solph.Flow(max=profile, nominal_value=10,
+                                variable_costs=n)})
+        else:
+            solph.Sink(label='sink_{0}'.format(n), inputs={
+                bus: solph.Flow(actual_value=profile, fixed=True,
+                                nominal_value=10)})
+    return es
+
+
+def loop_flow_bounds(om):
+    """The former per-element loop over all flows and timesteps."""
+    for (o, i) in om.FLOWS:
+        for t in om.TIMESTEPS:
+            if om.flows[o, i].actual_value[t] is not None and (
+                    om.flows[o, i].nominal_value is not None):
+                om.flow[o, i, t].value = (om.flows[o, i].actual_value[t] *
+                                          om.flows[o, i].nominal_value)
+                if om.flows[o, i].fixed:
+                    om.flow[o, i, t].fix()
+
+            if om.flows[o, i].nominal_value is not None and (
+                    om.flows[o, i].binary is None):
+                om.flow[o, i, t].setub(om.flows[o, i].max[t] *
+                                       om.flows[o, i].nominal_value)
+                om.flow[o, i, t].setlb(om.flows[o, i].min[t] *
+                                       om.flows[o, i].nominal_value)
+
+
+def timed(function, *args, repeat=3):
+    """Returns the best wall time of `repeat` calls of `function`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_benchmark(flows=100, timesteps=8760, repeat=3):
+    es = create_energy_system(flows, timesteps)
+    om = solph.OperationalModel(es, timeindex=es.timeindex)
+
+    loop = timed(loop_flow_bounds, om, repeat=repeat)
+    bulk = timed(om._set_flow_bounds, repeat=repeat)
+
+    print("flows: {0}, timesteps: {1}".format(flows, timesteps))
+    print("  per-element loop: {0:8.3f} s".format(loop))
+    print("  bulk assignment:  {0:8.3f} s".format(bulk))
+    print("  speedup:          {0:8.1f} x".format(loop / bulk))
+    return loop, bulk
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--flows', type=int, default=100)
+    parser.add_argument('--timesteps', type=int, default=8760)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.flows, args.timesteps, args.repeat)
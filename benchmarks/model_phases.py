@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the phases of a solph model from the energy system to the
+results.
+
+Synthetic energy systems of configurable size are created from regions which
+contain all solph components (buses, sources, sinks, linear and variable
+fraction transformers, storages as well as investment, binary and discrete
+flows). The wall time and the increase of the peak memory of every phase
+are measured:
+
+* `energy_system`: creating the energy system and grouping its nodes
+* `model`: `OperationalModel.__init__`
+* `write`: `om.write`
+* `solve`: `om.solve` (skipped if the solver is not available)
+* `results`: `om.results()`
+* `results_dataframe`: `ResultsDataFrame`
+
+Every size is run in a new process, so the peak memory of a run is not
+influenced by the previous runs. One JSON object per size is written to
+stdout (or `--output`), followed by a summary with the exponent of the
+growth of every phase with the size (1 means linear scaling). With
+`--baseline` the times are compared to a former output and the script exits
+with status 1 if a phase got slower than `--tolerance` times the baseline.
+
+Usage::
+
+    python benchmarks/model_phases.py --sizes 10 20 40 --timesteps 168
+    python benchmarks/model_phases.py --sizes 10 20 40 --output new.json \\
+        --baseline old.json --tolerance 1.5
+
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from pyomo.core import Constraint, Var
+from pyomo.opt import SolverFactory
+
+from oemof import solph
+from oemof.outputlib import ResultsDataFrame
+from oemof.solph.profiler import peak_rss
+
+PHASES = ('energy_system', 'model', 'write', 'solve', 'results',
+          'results_dataframe')
+
+
+def create_energy_system(regions, timesteps, seed=0):
+    """Creates an energy system of `regions` regions connected by lines.
+
+    Every region has an electricity and a heat bus, a power plant with an
+    investment flow, a chp plant (VariableFractionTransformer), a peak
+    power plant with a binary flow, a boiler with a discrete flow, a wind
+    source, fixed demands, a storage with investment and excess and
+    shortage flows. All regions share one gas bus.
+    """
+    rnd = np.random.RandomState(seed)
+    timeindex = pd.date_range('1/1/2012', periods=timesteps, freq='H')
+    es = solph.EnergySystem(groupings=solph.GROUPINGS, timeindex=timeindex)
+    bgas = solph.Bus(label='gas')
+    solph.Source(label='gas_import', outputs={bgas: solph.Flow(
+        variable_costs=30)})
+    electricity = []
+    for r in range(regions):
+        bel = solph.Bus(label='electricity_{0}'.format(r))
+        bth = solph.Bus(label='heat_{0}'.format(r))
+        electricity.append(bel)
+        solph.Source(label='wind_{0}'.format(r), outputs={bel: solph.Flow(
+            actual_value=rnd.rand(timesteps), nominal_value=50,
+            fixed=True)})
+        solph.Sink(label='demand_el_{0}'.format(r), inputs={bel: solph.Flow(
+            actual_value=rnd.rand(timesteps), nominal_value=80,
+            fixed=True)})
+        solph.Sink(label='demand_th_{0}'.format(r), inputs={bth: solph.Flow(
+            actual_value=rnd.rand(timesteps), nominal_value=40,
+            fixed=True)})
+        solph.LinearTransformer(
+            label='pp_{0}'.format(r), inputs={bgas: solph.Flow()},
+            outputs={bel: solph.Flow(
+                variable_costs=10 + rnd.rand(),
+                investment=solph.Investment(maximum=100, ep_costs=20))},
+            conversion_factors={bel: 0.58})
+        solph.VariableFractionTransformer(
+            label='chp_{0}'.format(r),
+            inputs={bgas: solph.Flow(nominal_value=100)},
+            outputs={bel: solph.Flow(), bth: solph.Flow()},
+            conversion_factors={bel: 0.3, bth: 0.5},
+            conversion_factor_single_flow={bel: 0.5})
+        solph.LinearTransformer(
+            label='peak_{0}'.format(r), inputs={bgas: solph.Flow()},
+            outputs={bel: solph.Flow(
+                nominal_value=30, min=0.3, variable_costs=50,
+                binary=solph.BinaryFlow(startup_costs=100))},
+            conversion_factors={bel: 0.4})
+        solph.LinearTransformer(
+            label='boiler_{0}'.format(r), inputs={bgas: solph.Flow()},
+            outputs={bth: solph.Flow(nominal_value=20,
+                                     discrete=solph.DiscreteFlow())},
+            conversion_factors={bth: 0.9})
+        solph.Storage(
+            label='storage_{0}'.format(r),
+            inputs={bel: solph.Flow(variable_costs=1)},
+            outputs={bel: solph.Flow()},
+            capacity_loss=0.01, nominal_input_capacity_ratio=1 / 6,
+            nominal_output_capacity_ratio=1 / 6,
+            inflow_conversion_factor=0.97, outflow_conversion_factor=0.86,
+            investment=solph.Investment(ep_costs=145, maximum=500))
+        solph.Sink(label='excess_{0}'.format(r), inputs={bel: solph.Flow(
+            variable_costs=1)})
+        solph.Source(label='shortage_{0}'.format(r), outputs={bel: solph.Flow(
+            variable_costs=1000)})
+        solph.Source(label='shortage_th_{0}'.format(r), outputs={
+            bth: solph.Flow(variable_costs=1000)})
+    for r in range(1, regions):
+        a, b = electricity[r - 1], electricity[r]
+        for i, o in ((a, b), (b, a)):
+            solph.LinearTransformer(
+                label='line_{0}_{1}'.format(i.label, o.label),
+                inputs={i: solph.Flow()},
+                outputs={o: solph.Flow(nominal_value=60)},
+                conversion_factors={o: 0.98})
+    es.groups
+    return es
+
+
+class Phases:
+    """Measures the wall time and the increase of the peak memory of the
+    phases of a run.
+    """
+    def __init__(self):
+        self.phases = {}
+
+    def measure(self, name, function, *args, **kwargs):
+        rss = peak_rss()
+        start = time.perf_counter()
+        value = function(*args, **kwargs)
+        self.phases[name] = {
+            'time': time.perf_counter() - start,
+            'rss': None if rss is None else peak_rss() - rss}
+        return value
+
+
+def run(regions, timesteps, solver='glpk', seed=0):
+    """Runs all phases for an energy system of `regions` regions and
+    returns the measurements as dictionary.
+    """
+    logging.disable(logging.WARNING)
+    phases = Phases()
+    es = phases.measure('energy_system', create_energy_system, regions,
+                        timesteps, seed)
+    om = phases.measure('model', solph.OperationalModel, es)
+    with tempfile.TemporaryDirectory() as directory:
+        phases.measure('write', om.write,
+                       os.path.join(directory, 'model.lp'),
+                       io_options={'symbolic_solver_labels': True})
+
+    opt = SolverFactory(solver)
+    if opt is not None and opt.available(exception_flag=False):
+        phases.measure('solve', om.solve, solver=solver)
+        phases.measure('results', om.results)
+        phases.measure('results_dataframe', ResultsDataFrame,
+                       energy_system=es)
+
+    return {'regions': regions, 'timesteps': timesteps,
+            'nodes': len(es.nodes), 'flows': len(es.flows()),
+            'variables': _count(om, Var),
+            'constraints': _count(om, Constraint),
+            'phases': phases.phases, 'peak_rss': peak_rss()}
+
+
+def _count(om, ctype):
+    return sum(1 for _ in om.component_data_objects(ctype, active=True))
+
+
+def _run(arguments):
+    return run(*arguments)
+
+
+def scaling(runs):
+    """Returns the exponent of the growth of the time of every phase with
+    the number of regions, i.e. the slope of a least squares fit in log-log
+    scale.
+    """
+    exponents = {}
+    for phase in PHASES:
+        points = [(r['regions'], r['phases'][phase]['time']) for r in runs
+                  if phase in r['phases'] and r['phases'][phase]['time'] > 0]
+        if len(set(p[0] for p in points)) > 1:
+            x, y = np.log(np.array(points)).T
+            exponents[phase] = float(np.polyfit(x, y, 1)[0])
+    return exponents
+
+
+def regressions(runs, baseline, tolerance):
+    """Returns a message for every phase which is more than `tolerance` times
+    slower than in the run of the same size in `baseline`.
+    """
+    former = {(r['regions'], r['timesteps']): r for r in baseline
+              if 'regions' in r}
+    messages = []
+    for r in runs:
+        old = former.get((r['regions'], r['timesteps']))
+        if old is None:
+            continue
+        for phase, values in r['phases'].items():
+            if phase not in old['phases']:
+                continue
+            ratio = values['time'] / max(old['phases'][phase]['time'], 1e-9)
+            if ratio > tolerance:
+                messages.append(
+                    "{0} with {1} regions: {2:.3f}s instead of {3:.3f}s "
+                    "({4:.2f}x)".format(phase, r['regions'], values['time'],
+                                        old['phases'][phase]['time'], ratio))
+    return messages
+
+
+def run_benchmark(sizes, timesteps=168, solver='glpk', seed=0, output=None,
+                  baseline=None, tolerance=1.5):
+    runs = []
+    out = open(output, 'w') if output else sys.stdout
+    try:
+        for regions in sizes:
+            # a new process for every size to measure its peak memory
+            with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                result = pool.apply(_run, ((regions, timesteps, solver,
+                                            seed),))
+            runs.append(result)
+            out.write(json.dumps(result, sort_keys=True) + '\n')
+            out.flush()
+        out.write(json.dumps({'scaling': scaling(runs)}, sort_keys=True) +
+                  '\n')
+    finally:
+        if output:
+            out.close()
+
+    if baseline:
+        with open(baseline) as f:
+            messages = regressions(runs, [json.loads(line) for line in f],
+                                   tolerance)
+        for message in messages:
+            sys.stderr.write("regression: " + message + '\n')
+        return not messages
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20],
+                        help="numbers of regions of the energy systems")
+    parser.add_argument('--timesteps', type=int, default=168)
+    parser.add_argument('--solver', default='glpk')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="file for the JSON lines")
+    parser.add_argument('--baseline', help="output of a former run")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.sizes, args.timesteps, args.solver,
+                                args.seed, args.output, args.baseline,
+                                args.tolerance) else 1)
@@ -5,15 +5,21 @@ Created on Mon Jul 20 15:53:14 2015
 @author: uwe
 """
 
-from functools import partial
 import logging
 import os
 
 import dill as pickle
+import numpy as np
+import pandas as pd
+
+try:
+    from collections.abc import MutableMapping as MuMa
+except ImportError:
+    from collections import MutableMapping as MuMa
 
 from oemof.network import Entity
 from oemof.groupings import DEFAULT as BY_UID, Grouping, Nodes
-from oemof.network import Node
+from oemof.network import GraphStore, Node
 
 
 class EnergySystem:
@@ -56,6 +62,11 @@ class EnergySystem:
         <oemof.core.network.Entity>` are automatically added to this list on
         construction.
     groups : dict
+        The groups of the entities created by the groupings. The entities
+        added since the last access are grouped on access.
+    graph : :class:`GraphStore <oemof.network.GraphStore>`
+        The nodes and flows of the nodes created while this energy system is
+        the registry of nodes.
     results : dictionary
         A dictionary holding the results produced by the energy system.
         Is `None` while no results are produced.
@@ -108,33 +119,87 @@ class EnergySystem:
 
         Entity.registry = self
         Node.registry = self
+        self.graph = GraphStore()
         self._groups = {}
         self._groupings = ([BY_UID] +
                            [g if isinstance(g, Grouping) else Nodes(g)
                             for g in kwargs.get('groupings', [])])
-        for e in self.entities:
-            for g in self._groupings:
-                g(e, self.groups)
+        # the number of entities already grouped and the keys of the groups
+        # written by every grouping
+        self._grouped = {g: 0 for g in self._groupings}
+        self._keys = {g: set() for g in self._groupings}
         self.results = kwargs.get('results')
         self.timeindex = kwargs.get('timeindex')
 
-    @staticmethod
-    def _regroup(entity, groups, groupings):
-        for g in groupings:
-            g(entity, groups)
-        return groups
-
     def add(self, entity):
         """ Add an `entity` to this energy system.
+
+        A node created while another energy system (or none) was the registry
+        is moved into the :attr:`graph` of this energy system together with
+        its flows.
         """
         self.entities.append(entity)
-        self._groups = partial(self._regroup, entity, self.groups,
-                               self._groupings)
+        self._adopt(entity)
+
+    def add_all(self, entities):
+        """ Add all `entities` to this energy system at once (see
+        :meth:`add`).
+        """
+        start = len(self.entities)
+        self.entities.extend(entities)
+        for entity in self.entities[start:]:
+            self._adopt(entity)
+
+    def _adopt(self, node):
+        """ Moves `node` and its edges into the graph of this energy system
+        unless it is stored there already.
+        """
+        if not isinstance(node, Node) or node._graph is self.graph:
+            return
+        edges = ([(node, target, f) for target, f in node.outputs.items()] +
+                 [(source, node, f) for source, f in node.inputs.items()])
+        self.graph.node_id(node)
+        for source, target, f in edges:
+            self.graph.add_edge(source, target, f)
+        node._graph = self.graph
+
+    def invalidate(self, grouping=None):
+        """ Recreate the groups of `grouping` on the next access of
+        :attr:`groups`.
+
+        The groups are created incrementally, i.e. only entities added since
+        the last access of :attr:`groups` are grouped. If an entity which is
+        already grouped changes (e.g. its flows or the attributes used by a
+        grouping), the groups of the affected grouping have to be recreated
+        from all entities.
+
+        Parameters
+        ----------
+        grouping : :class:`Grouping <oemof.groupings.Grouping>` or callable
+            The grouping or the function it was created from. Defaults to all
+            groupings.
+        """
+        stale = [g for g in self._groupings
+                 if grouping is None or grouping in (g, g.key)]
+        if not stale:
+            raise ValueError("Unknown grouping: {0}".format(grouping))
+        keys = set().union(*(self._keys[g] for g in stale))
+        for k in keys:
+            self._groups.pop(k, None)
+        # groupings sharing a key with a stale one lose their part of it, too
+        for g in self._groupings:
+            if g in stale or not self._keys[g].isdisjoint(keys):
+                self._grouped[g] = 0
+                self._keys[g] = set()
 
     @property
     def groups(self):
-        while callable(self._groups):
-            self._groups = self._groups()
+        for g in self._groupings:
+            if self._grouped[g] < len(self.entities):
+                groups = _Recorder(self._groups, self._keys[g])
+                for e in self.entities[self._grouped[g]:]:
+                    g(e, groups)
+                self._grouped[g] = len(self.entities)
         return self._groups
 
     @property
@@ -144,14 +209,29 @@ class EnergySystem:
     @nodes.setter
     def nodes(self, value):
         self.entities = value
+        self.invalidate()
 
     def flows(self):
-        return {(source, target): source.outputs[target]
+        return {(source, target): f
                 for source in self.nodes
-                for target in source.outputs}
+                for target, f in source.outputs.items()}
 
-    def dump(self, dpath=None, filename=None):
+    def dump(self, dpath=None, filename=None, binary=False):
         r""" Dump an EnergySystem instance.
+
+        Parameters
+        ----------
+        dpath : str (optional)
+            Directory of the dump. Defaults to `~/.oemof/dumps`.
+        filename : str (optional)
+            Name of the dump. Defaults to `es_dump.oemof`.
+        binary : boolean
+            If True, all time series (one dimensional float arrays, float
+            series of pandas and lists of floats) are stored in one array file
+            `<filename>.npy` next to the dump, which only holds the topology
+            and the scalar attributes. :meth:`restore` maps the array file
+            into memory, hence the values of a series are only read on first
+            access. Lists of floats are restored as arrays.
         """
         if dpath is None:
             bpath = os.path.join(os.path.expanduser("~"), '.oemof')
@@ -164,15 +244,31 @@ class EnergySystem:
         if filename is None:
             filename = 'es_dump.oemof'
 
-        pickle.dump(self.__dict__, open(os.path.join(dpath, filename), 'wb'))
+        # the entities are grouped before they are dumped, as restored
+        # entities may lack attributes used by the groupings
+        self.groups
+        # the graph is restored from the dumped nodes
+        attributes = {k: v for k, v in self.__dict__.items() if k != 'graph'}
+        path = os.path.join(dpath, filename)
+        with open(path, 'wb') as f:
+            if binary:
+                pickle.dump(_BINARY_DUMP, f)
+                pickler = _SeriesPickler(f)
+                pickler.dump(attributes)
+                np.save(path + '.npy', np.concatenate(
+                    [np.zeros(0)] + pickler.series))
+            else:
+                pickle.dump(attributes, f)
 
-        msg = ('Attributes dumped to: {0}'.format(os.path.join(
-            dpath, filename)))
+        msg = ('Attributes dumped to: {0}'.format(path))
         logging.debug(msg)
         return msg
 
     def restore(self, dpath=None, filename=None):
         r""" Restore an EnergySystem instance.
+
+        Both dumps with and without `binary=True` (see :meth:`dump`) are
+        restored.
         """
         logging.info(
             "Restoring attributes will overwrite existing attributes.")
@@ -182,8 +278,109 @@ class EnergySystem:
         if filename is None:
             filename = 'es_dump.oemof'
 
-        self.__dict__ = pickle.load(open(os.path.join(dpath, filename), "rb"))
-        msg = ('Attributes restored from: {0}'.format(os.path.join(
-            dpath, filename)))
+        # restored nodes add their flows to the graph of the current registry
+        graph = getattr(self, 'graph', None)
+        path = os.path.join(dpath, filename)
+        with open(path, 'rb') as f:
+            attributes = pickle.load(f)
+            if isinstance(attributes, str) and attributes == _BINARY_DUMP:
+                # copy on write, so restored series can be changed in memory
+                series = np.load(path + '.npy', mmap_mode='c')
+                attributes = _SeriesUnpickler(f, series).load()
+        self.__dict__ = attributes
+        self.graph = graph if graph is not None else GraphStore()
+        msg = ('Attributes restored from: {0}'.format(path))
         logging.debug(msg)
         return msg
+
+
+#: Marks a dump whose time series are stored in a separate array file.
+_BINARY_DUMP = 'oemof binary dump 1'
+
+
+def _is_series(obj):
+    """ Tests if `obj` is a time series which is stored in the array file of
+    a binary dump.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.ndim == 1 and obj.dtype == np.float64 and len(obj) > 0
+    if type(obj) is list:
+        return len(obj) > 1 and all(isinstance(v, float) for v in obj)
+    return False
+
+
+class _SeriesPickler(pickle.Pickler):
+    """ Pickles everything but time series, which are collected in the list
+    `series` and replaced by their position in the concatenated series.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.series = []
+        self.size = 0
+        self.stored = {}
+
+    def persistent_id(self, obj):
+        if (isinstance(obj, pd.Series) and obj.dtype == np.float64 and
+                len(obj) > 0):
+            values = obj.values
+            extra = (obj.index, obj.name)
+        elif _is_series(obj):
+            values = np.asarray(obj, dtype=float)
+            extra = None
+        else:
+            return None
+        if id(obj) not in self.stored:
+            # `obj` is kept to make sure that its id is not reused
+            self.stored[id(obj)] = (obj, (self.size, len(values), extra))
+            self.series.append(values)
+            self.size += len(values)
+        return self.stored[id(obj)][1]
+
+
+class _SeriesUnpickler(pickle.Unpickler):
+    """ Restores the time series pickled by :class:`_SeriesPickler` as views
+    on the array `series`.
+    """
+    def __init__(self, f, series):
+        super().__init__(f)
+        self.series = series
+        self.loaded = {}
+
+    def persistent_load(self, pid):
+        start, length, extra = pid
+        # objects referenced more than once are restored as one object
+        if start not in self.loaded:
+            values = np.asarray(self.series[start:start + length])
+            if extra is not None:
+                index, name = extra
+                values = pd.Series(values, index=index, name=name, copy=False)
+            self.loaded[start] = values
+        return self.loaded[start]
+
+
+class _Recorder(MuMa):
+    """ Passes everything through to the `groups` dictionary and records the
+    keys of the groups set by a grouping in the set `written`.
+    """
+    def __init__(self, groups, written):
+        self.groups = groups
+        self.written = written
+
+    def __getitem__(self, key):
+        return self.groups[key]
+
+    def __setitem__(self, key, value):
+        self.written.add(key)
+        self.groups[key] = value
+
+    def __delitem__(self, key):
+        del self.groups[key]
+
+    def __contains__(self, key):
+        return key in self.groups
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
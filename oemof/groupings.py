@@ -186,7 +186,11 @@ class Grouping:
         if k is None:
             return
         v = self.value(e)
-        if isinstance(v, MuMa):
+        if type(v) is set:
+            # the common case of the `Nodes` groupings, which avoids the
+            # comparatively slow checks against the abstract base classes
+            v = set(filter(self.filter, v))
+        elif isinstance(v, MuMa):
             for k in list(filterfalse(self.filter, v)):
                 v.pop(k)
         elif isinstance(v, Mapping):
@@ -200,7 +204,14 @@ class Grouping:
         for group in (k if (isinstance(k, Iterable) and not
                             isinstance(k, Hashable))
                       else [k]):
-            d[group] = (self.merge(v, d[group]) if group in d else v)
+            if group in d:
+                d[group] = self.merge(v, d[group])
+            else:
+                d[group] = v
+                # sets are merged in place (see `Nodes.merge`), so every new
+                # group needs a set of its own
+                if type(v) is set:
+                    v = set(v)
 
 
 class Nodes(Grouping):
@@ -220,7 +231,8 @@ class Nodes(Grouping):
         :meth:`Updates <set.update>` :obj:`old` to be the union of :obj:`old`
         and :obj:`new`.
         """
-        return old.union(new)
+        old.update(new)
+        return old
 
 
 class Flows(Nodes):
@@ -258,9 +270,8 @@ class FlowsWithNodes(Nodes):
         return set(tuples)
 
     def __call__(self, n, d):
-        tuples = set(chain(
-            ((n, t, f) for (t, f) in n.outputs.items()),
-            ((s, n, f) for (s, f) in n.inputs.items())))
+        tuples = {(n, t, f) for (t, f) in n.outputs.items()}
+        tuples.update((s, n, f) for (s, f) in n.inputs.items())
         super().__call__(tuples, d)
 
 
@@ -1,5 +1,6 @@
+from collections import abc
 from functools import total_ordering
-from weakref import WeakKeyDictionary as WeKeDi, WeakSet as WeSe
+import numpy as np
 """
 This package (along with its subpackages) contains the classes used to model
 energy systems. An energy system is modelled as a graph/network of entities
@@ -9,28 +10,198 @@ connected.
 """
 
 
-class _Edges:
-    """ Internal utility class keeping track of known edges.
+class GraphStore:
+    """ Stores the nodes and edges (flows) of an energy system graph.
+
+    Every node and every edge gets a contiguous integer id. The edges of a
+    node are found in compressed sparse row (CSR) arrays: the ids of the
+    outgoing edges of node `i` are `outgoing[out_pointer[i]:out_pointer[i +
+    1]]` (likewise for the incoming edges), in the order in which the edges
+    were added. Edges added after the arrays were built are kept in small
+    per-node lists until the arrays are rebuilt, which happens once the
+    number of these edges exceeds a quarter of all edges.
 
-    As this is currently quite dirty and hackish, it should be treated as an
-    internal implementation detail with an unstable interface. Maye it can be
-    converted to a fully fledged useful :python:`Edge` class later on, but for
-    now it simply hides most of the dirty secrets of the :class:`Node` class.
+    Every :class:`~oemof.energy_system.EnergySystem` has its own store (its
+    attribute `graph`), which holds the nodes created while it is the
+    :attr:`registry <Node.registry>`. A node created without a registry
+    gets a store of its own, so it is not referenced by any global state. An
+    edge between nodes of different stores is stored in both stores.
 
+    The stores are accessed through the attributes :attr:`Node.inputs` and
+    :attr:`Node.outputs`, which are views on the store.
+    """
+    def __init__(self):
+        self.nodes = []
+        self._ids = {}
+        self.sources = []
+        self.targets = []
+        self.values = []
+        self._edge_ids = {}
+        self.out_pointer = [0]
+        self.outgoing = []
+        self.in_pointer = [0]
+        self.incoming = []
+        self._pending = ({}, {})
+        self._pending_size = 0
+
+    def node_id(self, node):
+        """ Returns the id of `node`, which is added to the store if it is not
+        known yet.
+        """
+        key = id(node)
+        if key not in self._ids:
+            self._ids[key] = len(self.nodes)
+            self.nodes.append(node)
+        return self._ids[key]
+
+    def add_edge(self, source, target, value):
+        """ Adds the edge from node `source` to node `target` with `value`
+        (the flow) or replaces the value of an existing edge.
+        """
+        key = (self.node_id(source), self.node_id(target))
+        edge = self._edge_ids.get(key)
+        if edge is not None:
+            self.values[edge] = value
+            return
+        edge = self._edge_ids[key] = len(self.values)
+        self.sources.append(key[0])
+        self.targets.append(key[1])
+        self.values.append(value)
+        outgoing, incoming = self._pending
+        outgoing.setdefault(key[0], []).append(edge)
+        incoming.setdefault(key[1], []).append(edge)
+        self._pending_size += 1
+
+    def edge(self, source, target):
+        """ Returns the id of the edge from `source` to `target` or None.
+        """
+        s = self._ids.get(id(source))
+        t = self._ids.get(id(target))
+        if s is None or t is None:
+            return None
+        return self._edge_ids.get((s, t))
+
+    def edges_of(self, node, outgoing=True):
+        """ Returns the ids of the outgoing (or incoming) edges of `node`.
+        """
+        i = self._ids.get(id(node))
+        if i is None:
+            return []
+        if self._pending_size > max(64, len(self.values) // 4):
+            self._compact()
+        if outgoing:
+            pointer, edges, pending = (self.out_pointer, self.outgoing,
+                                       self._pending[0])
+        else:
+            pointer, edges, pending = (self.in_pointer, self.incoming,
+                                       self._pending[1])
+        if i + 1 < len(pointer):
+            edges = edges[pointer[i]:pointer[i + 1]]
+        else:
+            edges = []
+        return edges + pending.get(i, []) if i in pending else edges
+
+    def _compact(self):
+        """ Rebuilds the CSR arrays from all edges.
+        """
+        n = len(self.nodes)
+        for nodes, pointer, edges in ((self.sources, 'out_pointer',
+                                       'outgoing'),
+                                      (self.targets, 'in_pointer',
+                                       'incoming')):
+            nodes = np.array(nodes, dtype=int)
+            setattr(self, pointer, np.append(0, np.cumsum(
+                np.bincount(nodes, minlength=n))).tolist())
+            setattr(self, edges,
+                    np.argsort(nodes, kind='mergesort').tolist())
+        self._pending = ({}, {})
+        self._pending_size = 0
+
+
+class _Adjacency(abc.Mapping):
+    """ View of the outgoing (or incoming) edges of a node in a
+    :class:`GraphStore` as mapping of the adjacent nodes to the flows.
+
+    Setting an item adds an edge to the store.
     """
-    _in_edges = WeKeDi()
-    _flows = WeKeDi()
+    __slots__ = ('_node', '_store', '_outgoing')
+
+    def __init__(self, node, store, outgoing):
+        self._node = node
+        self._store = store
+        self._outgoing = outgoing
+
+    def _adjacent(self):
+        return self._store.targets if self._outgoing else self._store.sources
+
+    def __getitem__(self, node):
+        if self._outgoing:
+            edge = self._store.edge(self._node, node)
+        else:
+            edge = self._store.edge(node, self._node)
+        if edge is None:
+            raise KeyError(node)
+        return self._store.values[edge]
+
+    def __setitem__(self, node, value):
+        if self._outgoing:
+            flow[self._node, node] = value
+        else:
+            flow[node, self._node] = value
+
+    def __contains__(self, node):
+        if self._outgoing:
+            return self._store.edge(self._node, node) is not None
+        return self._store.edge(node, self._node) is not None
+
+    def __iter__(self):
+        nodes, adjacent = self._store.nodes, self._adjacent()
+        return iter([nodes[adjacent[e]] for e in
+                     self._store.edges_of(self._node, self._outgoing)])
 
+    def __len__(self):
+        return len(self._store.edges_of(self._node, self._outgoing))
+
+    def items(self):
+        return _AdjacencyItems(self)
+
+    def values(self):
+        return _AdjacencyValues(self)
+
+    def _items(self):
+        store, adjacent = self._store, self._adjacent()
+        return [(store.nodes[adjacent[e]], store.values[e]) for e in
+                store.edges_of(self._node, self._outgoing)]
+
+    def __repr__(self):
+        return repr(dict(self._items()))
+
+
+class _AdjacencyItems(abc.ItemsView):
+    def __iter__(self):
+        return iter(self._mapping._items())
+
+
+class _AdjacencyValues(abc.ValuesView):
+    def __iter__(self):
+        return iter([v for k, v in self._mapping._items()])
+
+
+class _Edges:
+    """ Internal utility class to set and get edges (flows).
+
+    `flow[source, target] = value` adds an edge to the :class:`GraphStore` of
+    the source and of the target, `flow(source)` returns the outputs of
+    `source` and `flow(source, target)` the flow from `source` to `target`.
+    """
     def __getitem__(self, key):
-        self._flows[key] = self._flows.get(key, WeKeDi())
-        return self._flows[key]
+        return key.outputs
 
     def __setitem__(self, key, value):
         source, target = key
-        self._in_edges[target] = self._in_edges.get(target, WeSe())
-        self._in_edges[target].add(source)
-        self._flows[source] = self._flows.get(source, WeKeDi())
-        self._flows[source][target] = value
+        source._graph.add_edge(source, target, value)
+        if target._graph is not source._graph:
+            target._graph.add_edge(source, target, value)
 
     def __call__(self, *keys):
         result = self
@@ -101,7 +272,7 @@ class Node:
     #       needed to confirm that.
 
     registry = None
-    __slots__ = ["__weakref__", "_label", "_state"]
+    __slots__ = ["__weakref__", "_label", "_state", "_graph"]
 
     def __init__(self, *args, **kwargs):
         self._state = (args, kwargs)
@@ -110,10 +281,18 @@ class Node:
             __class__.registry.add(self)
 
     def __getstate__(self):
-        return self._state
+        # the attributes set by subclasses (e.g. the `conversion_factors` of
+        # a transformer) are not part of the initialization arguments
+        return self._state + (dict(getattr(self, '__dict__', {})),)
 
     def __setstate__(self, state):
-        args, kwargs = state
+        args, kwargs = state[:2]
+        self._state = (args, kwargs)
+        if len(state) > 2 and state[2]:
+            self.__dict__.update(state[2])
+        registry = __class__.registry
+        self._graph = (registry.graph if registry is not None else
+                       GraphStore())
         for optional in ['label']:
             if optional in kwargs:
                 setattr(self, '_' + optional, kwargs[optional])
@@ -142,21 +321,18 @@ class Node:
 
     @property
     def label(self):
-        return (self._label if hasattr(self, "_label")
-                else "<{} #0x{:x}>".format(type(self).__name__, id(self)))
+        try:
+            return self._label
+        except AttributeError:
+            return "<{} #0x{:x}>".format(type(self).__name__, id(self))
 
     @property
     def inputs(self):
-        # TODO: Accessing :class:`Flow`'s `_in_edges` is kinda ugly.
-        #       Find a way to replace it.
-        #       This can also have unintuitive behaviour since adding new
-        #       associations to the returned mapping will NOT add a new input
-        #       flow to this node.
-        return {k: flow(k, self) for k in flow._in_edges.get(self, ())}
+        return _Adjacency(self, self._graph, outgoing=False)
 
     @property
     def outputs(self):
-        return flow(self)
+        return _Adjacency(self, self._graph, outgoing=True)
 
 
 class Bus(Node):
@@ -1,8 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8
 
+from collections import UserList
 import os
 import logging
+import numpy as np
 import pandas as pd
 try:
     import matplotlib.pyplot as plt
@@ -11,6 +13,18 @@ except ImportError:
     logging.warning('Matplotlib could not be imported. Plotting will not work.')
 
 
+def _multi_index(levels, codes, names):
+    """ Creates a MultiIndex from its levels and the codes of the entries.
+    """
+    try:
+        return pd.MultiIndex(levels=levels, codes=codes, names=names,
+                             verify_integrity=False)
+    except TypeError:
+        # pandas < 0.24
+        return pd.MultiIndex(levels=levels, labels=codes, names=names,
+                             verify_integrity=False)
+
+
 class ResultsDataFrame(pd.DataFrame):
     r"""Creates a multi-indexed pandas dataframe from a solph result object
     and holds methods to create subsets of the data.
@@ -48,69 +62,58 @@ class ResultsDataFrame(pd.DataFrame):
         for k, v in es.results.items():
             if 'Bus' in str(k.__class__):
                 for kk, vv in v.items():
-                    row = dict()
-                    row['bus_label'] = k.label
                     if k is kk:
-                        row['type'] = 'other'
-                    else:
-                        row['type'] = 'from_bus'
-                    if k is kk:
-                        row['obj_label'] = 'duals'
+                        rows_list.append((k.label, 'other', 'duals', vv))
                     elif isinstance(kk, str):
-                        row['obj_label'] = 'kk'
+                        rows_list.append((k.label, 'from_bus', 'kk', vv))
                     else:
-                        row['obj_label'] = kk.label
-                    row['datetime'] = es.timeindex
-                    row['val'] = vv
-                    rows_list.append(row)
+                        rows_list.append((k.label, 'from_bus', kk.label, vv))
             else:
                 if k in v.keys():
                     # self ref. components (results[component][component])
+                    bus = list(k.outputs.keys())[0]
                     for kk, vv in v.items():
                         if k is kk:
                             # self ref. comp. (results[component][component])
-                            row = dict()
-                            row['bus_label'] = list(k.outputs.keys())[0].label
-                            row['type'] = 'other'
-                            row['obj_label'] = k.label
-                            row['datetime'] = es.timeindex
-                            row['val'] = vv
-                            rows_list.append(row)
+                            rows_list.append((bus.label, 'other', k.label, vv))
                         else:
                             # bus inputs (only self ref. components)
-                            row = dict()
-                            row['bus_label'] = list(k.outputs.keys())[0].label
-                            row['type'] = 'to_bus'
-                            row['obj_label'] = k.label
-                            row['datetime'] = es.timeindex
-                            row['val'] = v.get(list(k.outputs.keys())[0])
-                            rows_list.append(row)
+                            rows_list.append((bus.label, 'to_bus', k.label,
+                                              v.get(bus)))
                 else:
                     for kk, vv in v.items():
                         # bus inputs (results[component][bus])
-                        row = dict()
-                        row['bus_label'] = kk.label
-                        row['type'] = 'to_bus'
-                        row['obj_label'] = k.label
-                        row['datetime'] = es.timeindex
-                        row['val'] = vv
-                        rows_list.append(row)
-
-        # split date and value lists to tuples
-        tuples = [
-            (item['bus_label'], item['type'], item['obj_label'],
-             date, val)
-            for item in rows_list for date, val in zip(item['datetime'],
-                                                       item['val'])]
-
-        # create MultiIndex DataFrame
-        index = ['bus_label', 'type', 'obj_label', 'datetime']
+                        rows_list.append((kk.label, 'to_bus', k.label, vv))
+
+        # one block with the values of all rows, the index is created from
+        # the codes of the labels of the rows and the positions in the
+        # time index (without creating a tuple for every value)
+        rows_list.sort(key=lambda row: row[:3])
+        values = [np.asarray(row[3].data if isinstance(row[3], UserList)
+                             else row[3], dtype=float)[:len(es.timeindex)]
+                  for row in rows_list]
+        lengths = np.array([len(v) for v in values], dtype=int)
+        positions = (np.arange(lengths.sum()) -
+                     np.repeat(np.cumsum(lengths) - lengths, lengths))
 
-        columns = index + ['val']
-
-        super().__init__(tuples, columns=columns)
-        self.set_index(index, inplace=True)
-        self.sort_index(inplace=True)
+        index = ['bus_label', 'type', 'obj_label', 'datetime']
+        levels, codes = [], []
+        for level in range(3):
+            level_codes, labels = pd.factorize(
+                [row[level] for row in rows_list], sort=True)
+            levels.append(labels)
+            codes.append(np.repeat(level_codes, lengths))
+        levels.append(es.timeindex)
+        codes.append(positions)
+        multi_index = _multi_index(levels, codes, index)
+
+        super().__init__(
+            np.concatenate(values + [np.zeros(0)])[:, np.newaxis],
+            index=multi_index, columns=['val'])
+        # the rows are sorted already, the values of a row only if the time
+        # index is sorted
+        if not pd.Index(es.timeindex).is_monotonic_increasing:
+            self.sort_index(inplace=True)
 
     def from_file(self, filename):
         """
@@ -172,6 +175,31 @@ class ResultsDataFrame(pd.DataFrame):
         formatted : boolean
 
         """
+        if (unstacklevel == 'obj_label' and 'obj_label' not in kwargs and
+                isinstance(self.index.levels[3], pd.DatetimeIndex) and
+                not isinstance(kwargs.get('bus_label', slice(None)),
+                               (slice, list)) and
+                not isinstance(kwargs.get('type', slice(None)),
+                               (slice, list))):
+            # one bus and type: select the columns of the wide layout
+            wide = self.to_wide()
+            selected = ((wide.columns.get_level_values(0) ==
+                         kwargs['bus_label']) &
+                        (wide.columns.get_level_values(1) == kwargs['type']))
+            if selected.any():
+                subset = wide.loc[
+                    pd.Timestamp(kwargs.get('date_from', wide.index[0])):
+                    pd.Timestamp(kwargs.get('date_to', wide.index[-1])),
+                    selected]
+                subset.columns = pd.Index(
+                    subset.columns.get_level_values(2), name='obj_label')
+                if formatted is not True:
+                    subset.index = pd.MultiIndex.from_product(
+                        [[kwargs['bus_label']], [kwargs['type']],
+                         subset.index],
+                        names=['bus_label', 'type', 'datetime'])
+                return subset
+
         subset = self.slice_by(**kwargs)
         subset = subset.unstack(level=unstacklevel)
         if formatted is True:
@@ -190,16 +218,37 @@ class ResultsDataFrame(pd.DataFrame):
         bus_label : string
 
         """
-        dfs = []
-        for l in self.index.levels[1]:
-            df = self.slice_unstacked(bus_label=bus_label, type=l,
-                                      formatted=True)
-            dfs.append(df)
-        subset = pd.concat(dfs, axis=1)
+        subset = self.to_wide()[bus_label]
         # use standard instead of multi-indexed columns
-        subset.columns = [v for v in subset.columns]
+        subset.columns = [v for v in subset.columns.get_level_values(1)]
         return subset
 
+    def to_wide(self):
+        r"""Returns the values in a wide layout, i.e. as DataFrame with the
+        datetime as index and a column for every combination of bus_label,
+        type and obj_label.
+
+        If every combination has a value for every datetime (which is the
+        case for a ResultsDataFrame created from an energy system), the
+        values are reshaped without unstacking them.
+        """
+        index = self.index
+        dates = index.levels[3]
+        codes = [np.asarray(c) for c in
+                 (index.codes if hasattr(index, 'codes') else index.labels)]
+        rows = len(self) // max(len(dates), 1)
+        if (rows * len(dates) == len(self) and
+                (codes[3].reshape(rows, len(dates)) ==
+                 np.arange(len(dates))).all()):
+            columns = _multi_index(
+                index.levels[:3], [c[::len(dates)] for c in codes[:3]],
+                index.names[:3])
+            wide = pd.DataFrame(
+                self['val'].values.reshape(rows, len(dates)).T,
+                index=dates.rename('datetime'), columns=columns)
+            return wide
+        return self['val'].unstack(level=[0, 1, 2])
+
     def bus_balance_to_csv(self, bus_labels=None, output_path=''):
         r"""Method for saving bus balances of the ResultsDataFrame as single
         csv files. A balance around each bus with inputs, outputs and other
@@ -7,6 +7,11 @@ from oemof.solph.network import (Sink, Source, LinearTransformer, Storage, Bus,
                                  VariableFractionTransformer)
 
 from oemof.solph.models import OperationalModel
+from oemof.solph.matrix import MatrixModel
+from oemof.solph.rolling_horizon import RollingHorizon
+from oemof.solph.aggregation import TypicalPeriods, VariableResolution
+from oemof.solph.reduction import NetworkReduction
 from oemof.solph.groupings import GROUPINGS
 from oemof.solph.options import (Investment, BinaryFlow, DiscreteFlow)
 from oemof.solph.inputlib.csv_tools import NodesFromCSV
+from oemof.solph.inputlib.parquet_tools import NodesFromParquet
@@ -0,0 +1,686 @@
+# -*- coding: utf-8 -*-
+"""Aggregating the time series of an energy system into typical periods or
+onto coarser timesteps.
+"""
+
+from collections import abc
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+from .models import OperationalModel, timestep_lengths
+from .plumbing import _Sequence, sequence, to_array
+
+
+class TypicalPeriods:
+    r""" Builds and solves an :class:`~oemof.solph.models.OperationalModel`
+    over a few typical periods (e.g. days) instead of the whole time index of
+    an energy system.
+
+    The time index is split into periods of `period_length` timesteps. The
+    periods are clustered by the time series of the energy system, i.e. all
+    sequences attached to flows and nodes (e.g. `actual_value`, `max`,
+    `variable_costs` of flows or `capacity_loss` of storages), and one
+    existing period of every cluster is chosen as its typical period. The
+    model is built over the typical periods, and every timestep is weighted
+    by the number of periods of its cluster through the `timeincrement`, so
+    costs and summed flow limits refer to the whole time index.
+
+    The storages are modelled as described by Kotzur et al. (2018): the
+    capacity within a typical period is relative to the capacity at its
+    beginning, which is a new variable `level` for every original period of
+    the time index. These levels are linked in the order of the original
+    periods, so storages can shift energy between periods (seasonal
+    storage). The storage balances use the length of a timestep without
+    weights. The limits of the capacity are applied to the level of every
+    period plus the highest (lowest) relative capacity of its typical period.
+
+    The results are disaggregated onto the original time index (see
+    :meth:`results`).
+
+    Gradients and the status of binary flows are not linked between the
+    typical periods: the gradient, startup and shutdown constraints of the
+    first timestep of every typical period but the first are deactivated, as
+    the previous timestep of the model belongs to an unrelated period. The
+    model cannot be updated by :meth:`OperationalModel.update()
+    <oemof.solph.models.OperationalModel.update>`.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Object that holds the nodes of an oemof energy system graph. The
+        length of its time index has to be a multiple of `period_length`.
+    period_length : int
+        Number of timesteps of a period. Defaults to 24.
+    number_of_periods : int
+        Number of typical periods. Defaults to 8.
+    method : str
+        Clustering method: 'hierarchical' (Ward's method) or 'medoids'
+        (k-medoids). Defaults to 'hierarchical'.
+    seed : int (optional)
+        Seed of the random initialisation of k-medoids.
+    \**kwargs : keyword arguments
+        Passed to the :class:`~oemof.solph.models.OperationalModel`, e.g.
+        `constraint_groups` or `timeincrement`.
+
+    Attributes
+    ----------
+    assignment : numpy.array
+        The typical period (index into `representatives`) of every original
+        period.
+    representatives : numpy.array
+        The original periods which are used as typical periods.
+    weights : numpy.array
+        The number of original periods represented by every typical period.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof import solph
+    >>> es = solph.EnergySystem(
+    ...     timeindex=pd.date_range('1/1/2012', periods=8, freq='H'))
+    >>> bel = solph.Bus(label='electricity')
+    >>> demand = solph.Sink(label='demand', inputs={bel: solph.Flow(
+    ...     nominal_value=10, fixed=True,
+    ...     actual_value=[1, 2, 1, 2, 5, 6, 1, 2])})
+    >>> tp = TypicalPeriods(es, period_length=2, number_of_periods=2)
+    >>> tp.cluster()
+    >>> tp.representatives.tolist(), tp.weights.tolist()
+    ([0, 2], [3, 1])
+    >>> tp.assignment.tolist()
+    [0, 0, 1, 0]
+    """
+    def __init__(self, es, period_length=24, number_of_periods=8,
+                 method='hierarchical', seed=None, **kwargs):
+        if method not in ('hierarchical', 'medoids'):
+            raise ValueError("Unknown clustering method '{0}'.".format(
+                method))
+        self.es = es
+        self.period_length = period_length
+        self.method = method
+        self.seed = seed
+        self.timeindex = kwargs.pop('timeindex', es.timeindex)
+        timeincrement = kwargs.pop('timeincrement', None)
+        if timeincrement is None:
+            timeincrement = timestep_lengths(self.timeindex)
+        self.timeincrement = to_array(sequence(timeincrement),
+                                      len(self.timeindex))
+        self.model_kwargs = kwargs
+        if len(self.timeindex) % period_length:
+            raise ValueError("The length of the time index has to be a "
+                             "multiple of the period length.")
+        self.periods = len(self.timeindex) // period_length
+        self.number_of_periods = min(number_of_periods, self.periods)
+        self.assignment = None
+        self.representatives = None
+        self.weights = None
+
+    def features(self):
+        """ Returns the normalised time series as array with one row per
+        period. Missing values are zero.
+        """
+        length = len(self.timeindex)
+        columns = []
+        for container, key, name in time_series(self.es, length):
+            values = to_array(container[key], length)
+            values[np.isnan(values)] = 0
+            spread = values.max() - values.min()
+            if spread > 0:
+                columns.append(((values - values.min()) / spread).reshape(
+                    self.periods, self.period_length))
+        if not columns:
+            return np.zeros((self.periods, 1))
+        return np.hstack(columns)
+
+    def cluster(self):
+        """ Clusters the periods and sets :attr:`assignment`,
+        :attr:`representatives` and :attr:`weights`.
+        """
+        features = self.features()
+        distances = _squared_distances(features)
+        if self.method == 'hierarchical':
+            labels = _ward(features, self.number_of_periods)
+        else:
+            labels = _k_medoids(distances, self.number_of_periods,
+                                np.random.RandomState(self.seed))
+
+        # the member with the least distance to all other members of a
+        # cluster represents it; typical periods are in chronological order
+        representatives = []
+        for label in np.unique(labels):
+            members = np.flatnonzero(labels == label)
+            costs = distances[np.ix_(members, members)].sum(axis=1)
+            representatives.append(members[np.argmin(costs)])
+        self.representatives = np.array(sorted(representatives))
+        position = {labels[p]: k for k, p in enumerate(self.representatives)}
+        self.assignment = np.array([position[label] for label in labels])
+        self.weights = np.bincount(self.assignment,
+                                   minlength=len(self.representatives))
+
+    def timesteps(self):
+        """ Returns the original timesteps of the typical periods in the
+        order of the timesteps of the aggregated model.
+        """
+        return (self.representatives[:, None] * self.period_length +
+                np.arange(self.period_length)).ravel()
+
+    def model(self):
+        """ Returns the :class:`~oemof.solph.models.OperationalModel` over the
+        typical periods with linked storages. The periods are clustered
+        first if :meth:`cluster` has not been called.
+        """
+        if self.representatives is None:
+            self.cluster()
+        timesteps = self.timesteps()
+        weights = np.repeat(self.weights, self.period_length)
+        increments = self.timeincrement[timesteps]
+
+        def aggregate(values, name):
+            return [values[t] for t in timesteps]
+
+        with _aggregated(self.es, len(self.timeindex), aggregate):
+            om = OperationalModel(
+                self.es, timeindex=self.timeindex[:len(timesteps)],
+                timesteps=range(len(timesteps)),
+                timeincrement=(weights * increments).tolist(),
+                **self.model_kwargs)
+            self._decouple_periods(om)
+            self._link_storages(om, increments)
+        return om
+
+    def _decouple_periods(self, om):
+        """ Deactivates the constraints of `om` which link the first
+        timestep of a typical period to the last timestep of the previous
+        one.
+        """
+        starts = range(self.period_length, len(om.TIMESTEPS),
+                       self.period_length)
+        for name, constraints in (
+                ('Flow', ('positive_gradient_constr',
+                          'negative_gradient_constr')),
+                ('BinaryFlow', ('startup_constr', 'shutdown_constr'))):
+            block = getattr(om, name, None)
+            for constraint in (getattr(block, c, None) for c in constraints):
+                if constraint is None:
+                    continue
+                # the constraints are indexed by (i, o, t)
+                for i, o in om.FLOWS:
+                    for t in starts:
+                        if (i, o, t) in constraint:
+                            constraint[i, o, t].deactivate()
+
+    def _link_storages(self, om, increments):
+        """ Replaces the storage balances of `om` by balances within the
+        typical periods (with the unweighted `increments`) and links the
+        periods by the new variable `level`.
+
+        The aggregated time series have to be set on the nodes.
+        """
+        L = self.period_length
+        typical = range(len(self.representatives))
+        storages = []
+        for name, nodes in (('Storage', 'STORAGES'),
+                            ('InvestmentStorage', 'INVESTSTORAGES')):
+            block = getattr(om, name, None)
+            for n in getattr(block, nodes, []):
+                storages.append((n, block))
+        if not storages:
+            return
+
+        for n, block in storages:
+            i = [i for i in n.inputs][0]
+            o = [o for o in n.outputs][0]
+            for t in om.TIMESTEPS:
+                capacity = block.capacity[n, t]
+                capacity.unfix()
+                capacity.setlb(None)
+                capacity.setub(None)
+                capacity.domain = po.Reals
+                # the capacity is relative to the beginning of the period
+                expr = 0
+                expr += capacity
+                if t % L:
+                    expr += - block.capacity[n, t - 1] * (
+                        1 - n.capacity_loss[t])
+                expr += (- om.flow[i, n, t] *
+                         n.inflow_conversion_factor[t]) * increments[t]
+                expr += (om.flow[n, o, t] /
+                         n.outflow_conversion_factor[t]) * increments[t]
+                block.balance[n, t].set_value(expr == 0)
+            if block is getattr(om, 'InvestmentStorage', None):
+                for c in (block.max_capacity, block.min_capacity):
+                    for t in om.TIMESTEPS:
+                        if (n, t) in c:
+                            c[n, t].deactivate()
+                if n in block.INITIAL_CAPACITY:
+                    block.initial_capacity[n].deactivate()
+
+        def nominal(n):
+            if n.investment is None:
+                return n.nominal_capacity
+            return om.InvestmentStorage.invest[n]
+
+        decay = {}
+        limits = {}
+        for n, block in storages:
+            for k in typical:
+                steps = range(k * L, (k + 1) * L)
+                decay[n, k] = np.prod([1 - n.capacity_loss[t] for t in steps])
+                limits[n, k] = (max(n.capacity_min[t] for t in steps),
+                                min(n.capacity_max[t] for t in steps))
+
+        linking = po.Block()
+        om.add_component('StorageLinking', linking)
+        nodes = [n for n, block in storages]
+        capacity = {n: block.capacity for n, block in storages}
+        linking.STORAGES = po.Set(initialize=nodes, ordered=True)
+        linking.PERIODS = po.Set(initialize=range(self.periods + 1),
+                                 ordered=True)
+        linking.TYPICAL_PERIODS = po.Set(initialize=typical, ordered=True)
+        linking.level = po.Var(linking.STORAGES, linking.PERIODS,
+                               within=po.NonNegativeReals)
+        linking.intra_max = po.Var(linking.STORAGES, linking.TYPICAL_PERIODS,
+                                   within=po.NonNegativeReals)
+        linking.intra_min = po.Var(linking.STORAGES, linking.TYPICAL_PERIODS,
+                                   within=po.NonPositiveReals)
+
+        def _transition_rule(block, n, p):
+            """Rule definition for the level at the end of period p.
+            """
+            if p == self.periods:
+                return po.Constraint.Skip
+            k = self.assignment[p]
+            return (block.level[n, p + 1] == block.level[n, p] * decay[n, k] +
+                    capacity[n][n, (k + 1) * L - 1])
+        linking.transition = po.Constraint(linking.STORAGES, linking.PERIODS,
+                                           rule=_transition_rule)
+
+        def _intra_max_rule(block, n, t):
+            return capacity[n][n, t] <= block.intra_max[n, t // L]
+        linking.intra_max_constr = po.Constraint(
+            linking.STORAGES, om.TIMESTEPS, rule=_intra_max_rule)
+
+        def _intra_min_rule(block, n, t):
+            return capacity[n][n, t] >= block.intra_min[n, t // L]
+        linking.intra_min_constr = po.Constraint(
+            linking.STORAGES, om.TIMESTEPS, rule=_intra_min_rule)
+
+        def _max_level_rule(block, n, p):
+            """Rule definition for the upper limit of the capacity in period
+            p.
+            """
+            if p == self.periods:
+                return po.Constraint.Skip
+            k = self.assignment[p]
+            return (block.level[n, p] + block.intra_max[n, k] <=
+                    limits[n, k][1] * nominal(n))
+        linking.max_level = po.Constraint(linking.STORAGES, linking.PERIODS,
+                                          rule=_max_level_rule)
+
+        def _min_level_rule(block, n, p):
+            """Rule definition for the lower limit of the capacity in period
+            p.
+            """
+            if p == self.periods:
+                return po.Constraint.Skip
+            k = self.assignment[p]
+            return (block.level[n, p] + block.intra_min[n, k] >=
+                    limits[n, k][0] * nominal(n))
+        linking.min_level = po.Constraint(linking.STORAGES, linking.PERIODS,
+                                          rule=_min_level_rule)
+
+        def _boundary_rule(block, n, p):
+            """Rule definition for the level at the beginning and at the end
+            of the time index.
+            """
+            if n.initial_capacity is None:
+                if p == 0:
+                    return po.Constraint.Skip
+                return block.level[n, self.periods] == block.level[n, 0]
+            return block.level[n, p] == n.initial_capacity * nominal(n)
+        linking.boundary = po.Constraint(
+            linking.STORAGES, [0, self.periods], rule=_boundary_rule)
+
+    def results(self, om):
+        """ Returns the results of the solved model `om` (see :meth:`model`)
+        on the original time index as nested dictionary like
+        :meth:`OperationalModel.results()
+        <oemof.solph.models.OperationalModel.results>`.
+
+        The values of the flows (and the duals of the buses) of every
+        original period are the ones of its typical period. The capacity of
+        a storage is its level at the beginning of the original period plus
+        its capacity relative to the beginning of the typical period.
+        """
+        columnar = om.columnar_results()
+        L = self.period_length
+
+        def disaggregate(array):
+            periods = array.reshape(len(array), -1, L)[:, self.assignment, :]
+            return periods.reshape(len(array), -1)
+
+        columnar.flow = disaggregate(columnar.flow)
+        if columnar.duals is not None:
+            columnar.duals = disaggregate(columnar.duals)
+        if columnar.storages:
+            relative = disaggregate(columnar.capacity)
+            for row, n in enumerate(columnar.storages):
+                loss = np.array([n.capacity_loss[t] for t in self.timesteps()])
+                decay = disaggregate(np.cumprod(
+                    (1 - loss).reshape(-1, L), axis=1).reshape(1, -1))[0]
+                level = np.array([om.StorageLinking.level[n, p].value
+                                  for p in range(self.periods)], dtype=float)
+                relative[row] += np.repeat(level, L) * decay
+            columnar.capacity = relative
+        columnar.timesteps = list(range(len(self.timeindex)))
+        return columnar.to_dict()
+
+    def solve(self, solver='glpk', solver_io='lp', **kwargs):
+        r""" Creates and solves the model over the typical periods and stores
+        the disaggregated results in :attr:`es.results`.
+
+        Parameters
+        ----------
+        solver : string
+            solver to be used e.g. "glpk","gurobi","cplex"
+        solver_io : string
+            pyomo solver interface file format: "lp","python","nl", etc.
+        \**kwargs : keyword arguments
+            Passed to :meth:`OperationalModel.solve()
+            <oemof.solph.models.OperationalModel.solve>`.
+
+        Returns
+        -------
+        The results of the solver.
+        """
+        om = self.model()
+        results = om.solve(solver=solver, solver_io=solver_io, **kwargs)
+        self.es.results = self.results(om)
+        self.es.results.solver = results
+        return results
+
+
+class VariableResolution:
+    r""" Builds and solves an :class:`~oemof.solph.models.OperationalModel`
+    of an energy system on a coarser, possibly irregular time index, e.g.
+    hourly for the first week and 4-hourly afterwards.
+
+    Every timestep of the coarse time index lasts until its next timestamp
+    (the last one until the end of the time index of the energy system) and
+    the `timeincrement` of the model is derived from these lengths. The time
+    series of flows and nodes (see :func:`time_series`) are aggregated onto
+    the coarse timesteps by averaging weighted by the length of the original
+    timesteps, which conserves the energy of fixed flows. The rules of some
+    attributes differ (see :attr:`AGGREGATION`): the `capacity_loss` of
+    storages is compounded and the gradients of flows are summed.
+
+    The results are disaggregated onto the time index of the energy system
+    (see :meth:`results`).
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Object that holds the nodes of an oemof energy system graph
+    timeindex : pandas.DatetimeIndex
+        The coarse time index. It has to start with the first timestamp of
+        the time index of the energy system and all its timestamps have to
+        be part of it.
+    \**kwargs : keyword arguments
+        Passed to the :class:`~oemof.solph.models.OperationalModel`, e.g.
+        `constraint_groups`. A `timeincrement` refers to the time index of
+        the energy system.
+
+    Attributes
+    ----------
+    steps : numpy.array
+        The coarse timestep of every timestep of the energy system.
+    timeincrement : numpy.array
+        The length of every coarse timestep in hours.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof import solph
+    >>> es = solph.EnergySystem(
+    ...     timeindex=pd.date_range('1/1/2012', periods=6, freq='H'))
+    >>> bel = solph.Bus(label='electricity')
+    >>> demand = solph.Sink(label='demand', inputs={bel: solph.Flow(
+    ...     nominal_value=10, fixed=True,
+    ...     actual_value=[0.1, 0.2, 0.3, 0.5, 0.4, 0.6])})
+    >>> vr = VariableResolution(es, es.timeindex[:2].append(
+    ...     es.timeindex[2::2]))
+    >>> vr.timeincrement.tolist()
+    [1.0, 1.0, 2.0, 2.0]
+    >>> om = vr.model()
+    >>> [round(om.flow[bel, demand, t].value, 6) for t in om.TIMESTEPS]
+    [1.0, 2.0, 4.0, 5.0]
+    """
+    #: Aggregation rules of attributes which are not averaged: 'loss'
+    #: compounds the losses of all timesteps, 'sum' sums the values.
+    AGGREGATION = {'capacity_loss': 'loss',
+                   'positive_gradient': 'sum',
+                   'negative_gradient': 'sum'}
+
+    def __init__(self, es, timeindex, **kwargs):
+        self.es = es
+        self.timeindex = timeindex
+        self.original_timeindex = es.timeindex
+        length = len(self.original_timeindex)
+        timeincrement = kwargs.pop('timeincrement', None)
+        if timeincrement is None:
+            timeincrement = timestep_lengths(self.original_timeindex)
+        self.original_timeincrement = to_array(sequence(timeincrement),
+                                               length)
+        self.model_kwargs = kwargs
+
+        positions = self.original_timeindex.get_indexer(timeindex)
+        if (len(positions) == 0 or positions[0] != 0 or
+                (positions < 0).any() or (np.diff(positions) <= 0).any()):
+            raise ValueError("The coarse time index has to start with the "
+                             "first timestamp of the time index of the "
+                             "energy system and has to be a sorted part "
+                             "of it.")
+        self.steps = np.searchsorted(positions, np.arange(length),
+                                     side='right') - 1
+        self.timeincrement = np.bincount(
+            self.steps, weights=self.original_timeincrement)
+
+    def aggregate(self, values, name):
+        """ Returns the time series `values` of the attribute `name`
+        aggregated onto the coarse timesteps as list. Missing values (None)
+        are kept if all values of a coarse timestep are missing.
+        """
+        values = to_array(values, len(self.original_timeindex))
+        rule = self.AGGREGATION.get(name)
+        if rule == 'loss':
+            with np.errstate(divide='ignore'):
+                result = 1 - np.exp(np.bincount(
+                    self.steps, weights=np.log(1 - values)))
+        elif rule == 'sum':
+            result = np.bincount(self.steps, weights=values)
+        else:
+            result = np.bincount(
+                self.steps, weights=values * self.original_timeincrement
+                ) / self.timeincrement
+        return [None if np.isnan(v) else v for v in result.tolist()]
+
+    def model(self):
+        """ Returns the :class:`~oemof.solph.models.OperationalModel` on the
+        coarse time index.
+        """
+        with _aggregated(self.es, len(self.original_timeindex),
+                         self.aggregate):
+            return OperationalModel(
+                self.es, timeindex=self.timeindex,
+                timesteps=range(len(self.timeindex)),
+                timeincrement=self.timeincrement.tolist(),
+                **self.model_kwargs)
+
+    def results(self, om):
+        """ Returns the results of the solved model `om` (see :meth:`model`)
+        on the time index of the energy system as nested dictionary like
+        :meth:`OperationalModel.results()
+        <oemof.solph.models.OperationalModel.results>`.
+
+        The values of the flows (and the duals of the buses) are the values
+        of their coarse timestep. The capacity of a storage is interpolated
+        linearly between the end of the previous coarse timestep and the end
+        of its coarse timestep.
+        """
+        columnar = om.columnar_results()
+        columnar.flow = columnar.flow[:, self.steps]
+        if columnar.duals is not None:
+            columnar.duals = columnar.duals[:, self.steps]
+        if columnar.storages:
+            # share of every timestep of its coarse timestep at its end
+            elapsed = np.cumsum(self.original_timeincrement)
+            start = np.append(0, np.cumsum(self.timeincrement))[self.steps]
+            share = (elapsed - start) / self.timeincrement[self.steps]
+            end = columnar.capacity[:, self.steps]
+            previous = np.roll(columnar.capacity, 1, axis=1)[:, self.steps]
+            columnar.capacity = previous + (end - previous) * share
+        columnar.timesteps = list(range(len(self.original_timeindex)))
+        return columnar.to_dict()
+
+    def solve(self, solver='glpk', solver_io='lp', **kwargs):
+        r""" Creates and solves the model on the coarse time index and stores
+        the disaggregated results in :attr:`es.results`.
+
+        Parameters
+        ----------
+        solver : string
+            solver to be used e.g. "glpk","gurobi","cplex"
+        solver_io : string
+            pyomo solver interface file format: "lp","python","nl", etc.
+        \**kwargs : keyword arguments
+            Passed to :meth:`OperationalModel.solve()
+            <oemof.solph.models.OperationalModel.solve>`.
+
+        Returns
+        -------
+        The results of the solver.
+        """
+        om = self.model()
+        results = om.solve(solver=solver, solver_io=solver_io, **kwargs)
+        self.es.results = self.results(om)
+        self.es.results.solver = results
+        return results
+
+
+def time_series(es, length):
+    """ Returns the time series of an energy system, i.e. all sequences
+    attached to its nodes and flows with explicit values for at least
+    `length` timesteps.
+
+    Returns
+    -------
+    list
+        Tuples of the container (the attribute dictionary of a flow or node or
+        a dictionary attribute like `conversion_factors`), the key of the
+        time series in the container and the name of the attribute.
+    """
+    objects = list(es.nodes) + list(es.flows().values())
+    series = []
+    for obj in objects:
+        attributes = getattr(obj, '__dict__', {})
+        for key, value in attributes.items():
+            if _is_time_series(value, length):
+                series.append((attributes, key, key))
+            elif isinstance(value, dict):
+                series.extend((value, k, key) for k, v in value.items()
+                              if _is_time_series(v, length))
+    return series
+
+
+@contextmanager
+def _aggregated(es, length, aggregate):
+    """ Replaces every time series of the energy system (see
+    :func:`time_series`) by `aggregate(values, name)` within the context.
+    """
+    series = time_series(es, length)
+    original = [(container, key, container[key])
+                for container, key, name in series]
+    try:
+        for container, key, name in series:
+            container[key] = aggregate(container[key], name)
+        yield
+    finally:
+        for container, key, values in original:
+            container[key] = values
+
+
+def _is_time_series(value, length):
+    """ Tests if `value` holds explicit values for at least `length`
+    timesteps (emulated sequences of scalars are no time series).
+    """
+    if isinstance(value, _Sequence):
+        return value._size > 0
+    return (isinstance(value, (abc.Sequence, np.ndarray, pd.Series)) and
+            not isinstance(value, str) and len(value) >= length)
+
+
+def _squared_distances(features):
+    """ Returns the squared euclidean distances between all rows.
+    """
+    norms = (features ** 2).sum(axis=1)
+    distances = norms[:, None] + norms[None, :] - 2 * features.dot(features.T)
+    return np.maximum(distances, 0)
+
+
+def _ward(features, n_clusters):
+    """ Clusters the rows of `features` by Ward's hierarchical method and
+    returns the cluster of every row.
+    """
+    n = len(features)
+    sizes = np.ones(n)
+    # increase of the sum of squares if two clusters are merged
+    costs = _squared_distances(features) / 2
+    np.fill_diagonal(costs, np.inf)
+    labels = np.arange(n)
+    active = np.ones(n, dtype=bool)
+    for _ in range(n - n_clusters):
+        a, b = np.unravel_index(np.argmin(costs), costs.shape)
+        a, b = min(a, b), max(a, b)
+        # Lance-Williams update of the costs of the merged cluster a
+        merged = ((sizes + sizes[a]) * costs[a] + (sizes + sizes[b]) *
+                  costs[b] - sizes * costs[a, b]) / (sizes + sizes[a] +
+                                                     sizes[b])
+        merged[~active] = np.inf
+        merged[a] = np.inf
+        costs[a, :] = costs[:, a] = merged
+        costs[b, :] = costs[:, b] = np.inf
+        sizes[a] += sizes[b]
+        active[b] = False
+        labels[labels == b] = a
+    return labels
+
+
+def _k_medoids(distances, n_clusters, random_state, max_iterations=100):
+    """ Clusters the rows of `distances` by k-medoids (alternating
+    assignment and update of the medoids) and returns the cluster of every
+    row.
+    """
+    n = len(distances)
+    # k-medoids++ initialisation
+    medoids = [random_state.randint(n)]
+    for _ in range(1, n_clusters):
+        nearest = distances[:, medoids].min(axis=1)
+        if nearest.sum() == 0:
+            candidates = np.setdiff1d(np.arange(n), medoids)
+            medoids.append(random_state.choice(candidates))
+        else:
+            medoids.append(random_state.choice(n, p=nearest / nearest.sum()))
+    medoids = np.array(medoids)
+    for _ in range(max_iterations):
+        labels = np.argmin(distances[:, medoids], axis=1)
+        # keep the medoids themselves in their own cluster
+        labels[medoids] = np.arange(n_clusters)
+        updated = medoids.copy()
+        for k in range(n_clusters):
+            members = np.flatnonzero(labels == k)
+            costs = distances[np.ix_(members, members)].sum(axis=1)
+            updated[k] = members[np.argmin(costs)]
+        if (updated == medoids).all():
+            break
+        medoids = updated
+    return labels
@@ -3,9 +3,34 @@
 for the specified groups.
 """
 
+from collections import OrderedDict
+import numpy as np
 from pyomo.core import (Var, Set, Constraint, BuildAction, Expression,
                         NonNegativeReals, Binary, NonNegativeIntegers)
 from pyomo.core.base.block import SimpleBlock
+from .plumbing import linear_expression, to_array
+
+
+def cost_expressions(block, parts):
+    """ Adds an `Expression` for every part of the costs of a block to the
+    block and returns the variables, coefficients and constant of the sum of
+    all parts.
+
+    Parameters
+    ----------
+    block : SimpleBlock
+    parts : OrderedDict
+        Maps the name of the expression to a tuple of its variables,
+        coefficients and constant as returned by `_objective_terms` of the
+        blocks.
+    """
+    variables, coefficients, constant = [], [], 0
+    for name, (v, c, k) in parts.items():
+        setattr(block, name, Expression(expr=linear_expression(v, c, k)))
+        variables.extend(v)
+        coefficients.append(np.asarray(c, dtype=float))
+        constant += k
+    return variables, np.concatenate(coefficients + [np.zeros(0)]), constant
 
 
 class Storage(SimpleBlock):
@@ -98,13 +123,13 @@ class Storage(SimpleBlock):
         self.balance = Constraint(self.STORAGES, m.TIMESTEPS,
                                   rule=_storage_balance_rule)
 
-    def _objective_expression(self):
-        """Objective expression for storages with no investment.
+    def _objective_terms(self):
+        """Parts of the objective function for storages with no investment.
         Note: This adds only fixed costs as variable costs are already
         added in the Block :class:`Flow`.
         """
         if not hasattr(self, 'STORAGES'):
-            return 0
+            return OrderedDict()
 
         fixed_costs = 0
 
@@ -112,9 +137,13 @@ class Storage(SimpleBlock):
             if n.fixed_costs is not None:
                 fixed_costs += n.nominal_capacity * n.fixed_costs
 
-        self.fixed_costs = Expression(expr=fixed_costs)
+        return OrderedDict([('fixed_costs', ([], [], fixed_costs))])
 
-        return fixed_costs
+    def _objective_expression(self):
+        """Objective expression for storages with no investment.
+        """
+        return linear_expression(*cost_expressions(
+            self, self._objective_terms()))
 
 
 class InvestmentStorage(SimpleBlock):
@@ -303,27 +332,37 @@ class InvestmentStorage(SimpleBlock):
             self.MIN_INVESTSTORAGES, m.TIMESTEPS,
             rule=_min_capacity_invest_rule)
 
-    def _objective_expression(self):
-        """Objective expression with fixed and investement costs.
+    def _objective_terms(self):
+        """Parts of the objective function with fixed and investement costs.
         """
         if not hasattr(self, 'INVESTSTORAGES'):
-            return 0
+            return OrderedDict()
 
-        investment_costs = 0
-        fixed_costs = 0
+        invest = []
+        investment_costs = []
+        fixed = []
+        fixed_costs = []
 
         for n in self.INVESTSTORAGES:
             if n.investment.ep_costs is not None:
-                investment_costs += self.invest[n] * n.investment.ep_costs
+                invest.append(self.invest[n])
+                investment_costs.append(n.investment.ep_costs)
             else:
                 raise ValueError("Missing value for investment costs!")
 
             if n.fixed_costs is not None:
-                fixed_costs += self.invest[n] * n.fixed_costs
-        self.investment_costs = Expression(expr=investment_costs)
-        self.fixed_costs = Expression(expr=fixed_costs)
+                fixed.append(self.invest[n])
+                fixed_costs.append(n.fixed_costs)
+
+        return OrderedDict([('fixed_costs', (fixed, fixed_costs, 0)),
+                            ('investment_costs',
+                             (invest, investment_costs, 0))])
 
-        return fixed_costs + investment_costs
+    def _objective_expression(self):
+        """Objective expression with fixed and investement costs.
+        """
+        return linear_expression(*cost_expressions(
+            self, self._objective_terms()))
 
 
 class Flow(SimpleBlock):
@@ -356,14 +395,14 @@ class Flow(SimpleBlock):
         \\forall (i, o) \\in \\textrm{SUMMED\_MIN\_FLOWS}.
 
     Negative gradient constraint \
-    :attr:`om.Flow.negative_gradient_constr[i, o]`:
+    :attr:`om.Flow.negative_gradient_constr[i, o, t]`:
       .. math:: flow(i, o, t-1) - flow(i, o, t) \\geq \
         negative\_flow\_gradient(i, o, t), \\\\
         \\forall (i, o) \\in \\textrm{NEGATIVE\_GRADIENT\_FLOWS}, \\\\
         \\forall t \\in \\textrm{TIMESTEPS}.
 
     Positive gradient constraint \
-    :attr:`om.Flow.positive_gradient_constr[i, o]`:
+    :attr:`om.Flow.positive_gradient_constr[i, o, t]`:
         .. math:: flow(i, o, t) - flow(i, o, t-1) \\geq \
             positive\_flow\_gradient(i, o, t), \\\\
             \\forall (i, o) \\in \\textrm{POSITIVE\_GRADIENT\_FLOWS}, \\\\
@@ -462,7 +501,7 @@ class Flow(SimpleBlock):
             """
             for inp, out in self.POSITIVE_GRADIENT_FLOWS:
                 for ts in m.TIMESTEPS:
-                    if ts > 0:
+                    if ts > m.TIMESTEPS[1]:
                         lhs = m.flow[inp, out, ts] - m.flow[inp, out, ts-1]
                         rhs = m.positive_flow_gradient[inp, out, ts]
                         self.positive_gradient_constr.add((inp, out, ts),
@@ -470,7 +509,7 @@ class Flow(SimpleBlock):
                     else:
                         pass  # return(Constraint.Skip)
         self.positive_gradient_constr = Constraint(
-            self.POSITIVE_GRADIENT_FLOWS, noruleinit=True)
+            self.POSITIVE_GRADIENT_FLOWS, m.TIMESTEPS, noruleinit=True)
         self.positive_gradient_build = BuildAction(
             rule=_positive_gradient_flow_rule)
 
@@ -479,7 +518,7 @@ class Flow(SimpleBlock):
             """
             for inp, out in self.NEGATIVE_GRADIENT_FLOWS:
                 for ts in m.TIMESTEPS:
-                    if ts > 0:
+                    if ts > m.TIMESTEPS[1]:
                         lhs = m.flow[inp, out, ts-1] - m.flow[inp, out, ts]
                         rhs = m.negative_flow_gradient[inp, out, ts]
                         self.negative_gradient_constr.add((inp, out, ts),
@@ -487,36 +526,51 @@ class Flow(SimpleBlock):
                     else:
                         pass  # return(Constraint.Skip)
         self.negative_gradient_constr = Constraint(
-            self.NEGATIVE_GRADIENT_FLOWS, noruleinit=True)
+            self.NEGATIVE_GRADIENT_FLOWS, m.TIMESTEPS, noruleinit=True)
         self.negative_gradient_build = BuildAction(
             rule=_negative_gradient_flow_rule)
 
-    def _objective_expression(self):
-        """ Objective expression for all standard flows with fixed costs
-        and variable costs.
+    def _objective_terms(self):
+        """ Parts of the objective function for all standard flows with fixed
+        costs and variable costs.
+
+        The variable costs of all flows and timesteps are computed as one
+        array, flows without variable costs are skipped.
         """
         m = self.parent_block()
 
-        variable_costs = 0
+        variables = []
+        coefficients = []
         fixed_costs = 0
 
-        for i, o in m.FLOWS:
-            for t in m.TIMESTEPS:
-                # add variable costs
-                if m.flows[i, o].variable_costs[0] is not None:
-                    variable_costs += (m.flow[i, o, t] * m.timeincrement[t] *
-                                       m.flows[i, o].variable_costs[t])
+        length = max(m.timesteps) + 1
+        timeincrement = to_array(m.timeincrement, length)[m.timesteps]
+        width = len(m.timesteps)
+        for k, (i, o) in enumerate(m.FLOWS):
+            flow = m.flows[i, o]
+            # add variable costs
+            if flow.variable_costs[0] is not None:
+                costs = to_array(flow.variable_costs, length)[m.timesteps]
+                if np.isnan(costs).any():
+                    raise ValueError("Missing value for the variable costs "
+                                     "of the flow {0} -> {1}!".format(i, o))
+                variables.extend(m._flow_variables[k * width:(k + 1) * width])
+                coefficients.append(timeincrement * costs)
             # add fixed costs if nominal_value is not None
-            if (m.flows[i, o].fixed_costs and
-                    m.flows[i, o].nominal_value is not None):
-                fixed_costs += (m.flows[i, o].nominal_value *
-                                m.flows[i, o].fixed_costs)
+            if flow.fixed_costs and flow.nominal_value is not None:
+                fixed_costs += flow.nominal_value * flow.fixed_costs
 
-        # add the costs expression to the block
-        self.fixed_costs = Expression(expr=fixed_costs)
-        self.variable_costs = Expression(expr=variable_costs)
+        return OrderedDict([
+            ('fixed_costs', ([], [], fixed_costs)),
+            ('variable_costs',
+             (variables, np.concatenate(coefficients + [np.zeros(0)]), 0))])
 
-        return fixed_costs + variable_costs
+    def _objective_expression(self):
+        """ Objective expression for all standard flows with fixed costs
+        and variable costs.
+        """
+        return linear_expression(*cost_expressions(
+            self, self._objective_terms()))
 
 
 class InvestmentFlow(SimpleBlock):
@@ -698,36 +752,44 @@ class InvestmentFlow(SimpleBlock):
         self.summed_min = Constraint(self.SUMMED_MIN_FLOWS,
                                      rule=_summed_min_investflow_rule)
 
-    def _objective_expression(self):
-        """ Objective expression for flows with investment attribute of type
-        class:`.Investment`. The returned costs are fixed, variable and
-        investment costs.
+    def _objective_terms(self):
+        """ Parts of the objective function for flows with investment
+        attribute of type class:`.Investment`. The parts are fixed, variable
+        and investment costs.
         """
         if not hasattr(self, 'FLOWS'):
-            return 0
+            return OrderedDict()
 
         m = self.parent_block()
-        fixed_costs = 0
-        variable_costs = 0
-        investment_costs = 0
+        fixed = []
+        fixed_costs = []
+        invest = []
+        investment_costs = []
 
         for i, o in self.FLOWS:
             # fixed costs
             if m.flows[i, o].fixed_costs is not None:
-                fixed_costs += (self.invest[i, o] *
-                                m.flows[i, o].fixed_costs)
+                fixed.append(self.invest[i, o])
+                fixed_costs.append(m.flows[i, o].fixed_costs)
             # investment costs
             if m.flows[i, o].investment.ep_costs is not None:
-                investment_costs += (self.invest[i, o] *
-                                     m.flows[i, o].investment.ep_costs)
+                invest.append(self.invest[i, o])
+                investment_costs.append(m.flows[i, o].investment.ep_costs)
             else:
                 raise ValueError("Missing value for investment costs!")
 
-        self.investment_costs = Expression(expr=investment_costs)
-        self.fixed_costs = Expression(expr=fixed_costs)
-        self.variable_costs = Expression(expr=variable_costs)
+        return OrderedDict([('fixed_costs', (fixed, fixed_costs, 0)),
+                            ('variable_costs', ([], [], 0)),
+                            ('investment_costs',
+                             (invest, investment_costs, 0))])
 
-        return fixed_costs + variable_costs + investment_costs
+    def _objective_expression(self):
+        """ Objective expression for flows with investment attribute of type
+        class:`.Investment`. The returned costs are fixed, variable and
+        investment costs.
+        """
+        return linear_expression(*cost_expressions(
+            self, self._objective_terms()))
 
 
 class Bus(SimpleBlock):
@@ -738,8 +800,8 @@ class Bus(SimpleBlock):
 
     Bus balance  :attr:`om.Bus.balance[i, o, t]`
       .. math::
-        \\sum_{i \\in INPUTS(n)} flow(i, n, t) \\cdot \\tau =  \
-        \\sum_{o \\in OUTPUTS(n)} flow(n, o, t) \\cdot \\tau, \\\\
+        \\sum_{i \\in INPUTS(n)} flow(i, n, t) =  \
+        \\sum_{o \\in OUTPUTS(n)} flow(n, o, t), \\\\
         \\forall n \\in \\textrm{BUSES},
         \\forall t \\in \\textrm{TIMESTEPS}.
     """
@@ -760,24 +822,32 @@ class Bus(SimpleBlock):
 
         m = self.parent_block()
 
-        I = {}
-        O = {}
+        # incidence of the buses and the flows: the positions of the flows of
+        # every bus in `m.FLOWS` and their coefficients. The body of the
+        # balance is `inflows - outflows` like pyomo creates it from
+        # `inflows == outflows` (or the sum of the flows of a bus with flows
+        # on one side only).
+        position = {f: k for k, f in enumerate(m.FLOWS)}
+        width = len(m.timesteps)
+        incidence = []
         for n in group:
-            I[n] = [i for i in n.inputs]
-            O[n] = [o for o in n.outputs]
+            inflows = [position[i, n] for i in n.inputs]
+            outflows = [position[n, o] for o in n.outputs]
+            if not inflows and not outflows:
+                # no inflows no outflows yield: 0 == 0 which is True
+                continue
+            sign = -1.0 if inflows else 1.0
+            incidence.append((n, np.array(inflows + outflows) * width,
+                              [1.0] * len(inflows) + [sign] * len(outflows)))
 
         def _busbalance_rule(block):
-            for t in m.TIMESTEPS:
-                for n in group:
-                    lhs = sum(m.flow[i, n, t] * m.timeincrement[t]
-                              for i in I[n])
-                    rhs = sum(m.flow[n, o, t] * m.timeincrement[t]
-                              for o in O[n])
-                    expr = (lhs == rhs)
-                    # no inflows no outflows yield: 0 == 0 which is True
-                    if expr is not True:
-                        block.balance.add((n, t), expr)
-        self.balance = Constraint(group, noruleinit=True)
+            variables = m._flow_variables
+            for p, t in enumerate(m.timesteps):
+                for n, columns, coefficients in incidence:
+                    block.balance.add((n, t), (linear_expression(
+                        [variables[c] for c in (columns + p).tolist()],
+                        list(coefficients), skip_zeros=False), 0))
+        self.balance = Constraint(group, m.TIMESTEPS, noruleinit=True)
         self.balance_build = BuildAction(rule=_busbalance_rule)
 
 
@@ -1179,32 +1249,36 @@ class BinaryFlow(SimpleBlock):
         # TODO: Add gradient constraints for binary block / flows
         # TODO: Add  min-up/min-downtime constraints
 
-    def _objective_expression(self):
-        """Objective expression for binary flows.
+    def _objective_terms(self):
+        """Parts of the objective function for binary flows.
         """
         if not hasattr(self, 'BINARY_FLOWS'):
-            return 0
+            return OrderedDict()
 
         m = self.parent_block()
-
-        startcosts = 0
-        shutdowncosts = 0
+        parts = OrderedDict()
 
         if self.STARTUPFLOWS:
-            startcosts += sum(self.startup[i, o, t] *
-                              m.flows[i, o].binary.startup_costs
-                              for i, o in self.STARTUPFLOWS
-                              for t in m.TIMESTEPS)
-            self.startcosts = Expression(expr=startcosts)
+            parts['startcosts'] = (
+                [self.startup[i, o, t] for i, o in self.STARTUPFLOWS
+                 for t in m.TIMESTEPS],
+                [m.flows[i, o].binary.startup_costs
+                 for i, o in self.STARTUPFLOWS for t in m.TIMESTEPS], 0)
 
         if self.SHUTDOWNFLOWS:
-            shutdowncosts += sum(self.shutdown[i, o, t] *
-                                 m.flows[i, o].binary.shutdown_costs
-                                 for i, o in self.SHUTDOWNFLOWS
-                                 for t in m.TIMESTEPS)
-            self.shudowcosts = Expression(expr=shutdowncosts)
+            parts['shudowcosts'] = (
+                [self.shutdown[i, o, t] for i, o in self.SHUTDOWNFLOWS
+                 for t in m.TIMESTEPS],
+                [m.flows[i, o].binary.shutdown_costs
+                 for i, o in self.SHUTDOWNFLOWS for t in m.TIMESTEPS], 0)
+
+        return parts
 
-        return startcosts + shutdowncosts
+    def _objective_expression(self):
+        """Objective expression for binary flows.
+        """
+        return linear_expression(*cost_expressions(
+            self, self._objective_terms()))
 
 
 class DiscreteFlow(SimpleBlock):
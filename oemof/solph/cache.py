@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Caching the layout of a :class:`~oemof.solph.matrix.MatrixModel` between
+builds of energy systems with the same structure.
+
+The parts of building and writing a model which do not depend on the
+numbers of the energy system and are expensive to sort (the permutations
+sorting the terms of the constraint matrix and the LP file symbols of the
+rows and columns) are stored in a :class:`Layout`. The layouts are persisted
+by a :class:`ModelCache` under the :func:`fingerprint` of the structure of
+the energy system and reused when a model with the same structure but new
+numbers is built.
+
+The builders of the blocks still run on a cache hit, i.e. the rows, columns
+and coefficients of the constraint matrix are assembled again and only the
+sorting and naming is skipped. The cache is used by the
+:class:`~oemof.solph.matrix.MatrixModel` only, an
+:class:`~oemof.solph.models.OperationalModel` is always built from scratch.
+
+Every entry of a layout is stored with a digest of the input it was computed
+from and is only reused if the digest matches, so a stale or colliding cache
+entry never changes the model, it is recomputed instead.
+"""
+
+import hashlib
+import os
+import pickle
+import numpy as np
+
+
+def digest(*objects):
+    """ Returns a hex digest of `objects`.
+
+    Numpy arrays are hashed by their type, shape and data, all other objects
+    by their `repr`.
+
+    Examples
+    --------
+    >>> digest(np.arange(3)) == digest(np.arange(3))
+    True
+    >>> digest(np.arange(3)) == digest(np.arange(3.))
+    False
+    """
+    h = hashlib.sha1()
+    for obj in objects:
+        if isinstance(obj, np.ndarray):
+            h.update(repr((obj.dtype.str, obj.shape)).encode())
+            h.update(np.ascontiguousarray(obj).data)
+        else:
+            h.update(repr(obj).encode())
+    return h.hexdigest()
+
+
+def fingerprint(es, timesteps, constraint_groups=()):
+    """ Returns a hex digest of the structure of the energy system `es`.
+
+    The structure consists of the classes and labels of the nodes, the edges,
+    the options set for every flow (investment, binary, discrete, gradients,
+    fixed and summed limits), the timesteps and the constraint groups of the
+    model. The numbers of the energy system (e.g. costs, bounds or time
+    series) are not part of the fingerprint.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+    timesteps : sequence
+        Timesteps of the model.
+    constraint_groups : list
+        The constraint groups of the model.
+    """
+    nodes = sorted((type(n).__module__ + '.' + type(n).__name__, str(n),
+                    getattr(n, 'investment', None) is not None)
+                   for n in es.nodes)
+    flows = sorted((str(i), str(o), _flow_options(f))
+                   for (i, o), f in es.flows().items())
+    return digest(nodes, flows, list(timesteps),
+                  [getattr(g, '__name__', str(g)) for g in constraint_groups])
+
+
+def _flow_options(flow):
+    """ Returns the options set for `flow` as a tuple of flags.
+    """
+    options = [getattr(flow, attribute, None) is not None for attribute in (
+        'investment', 'binary', 'discrete', 'summed_max', 'summed_min',
+        'nominal_value')]
+    for attribute in ('positive_gradient', 'negative_gradient'):
+        gradient = getattr(flow, attribute, None)
+        options.append(gradient is not None and gradient[0] is not None)
+    options.append(bool(getattr(flow, 'fixed', False)))
+    return tuple(options)
+
+
+class Layout(dict):
+    """ The entries of the layout of a model by name. Every entry is a tuple
+    of a digest and a value.
+
+    Attributes
+    ----------
+    modified : boolean
+        True if an entry has been computed since the layout was created or
+        saved.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.modified = False
+
+    def lookup(self, name, check, compute):
+        """ Returns the value of entry `name` if its digest equals `check()`,
+        otherwise the value is computed by `compute()` and stored.
+
+        Examples
+        --------
+        >>> layout = Layout()
+        >>> layout.lookup('order', lambda: 'a', lambda: [1, 0])
+        [1, 0]
+        >>> layout.lookup('order', lambda: 'a', lambda: [0, 1])
+        [1, 0]
+        >>> layout.lookup('order', lambda: 'b', lambda: [0, 1])
+        [0, 1]
+        """
+        check = check()
+        entry = self.get(name)
+        if entry is not None and entry[0] == check:
+            return entry[1]
+        value = compute()
+        self[name] = (check, value)
+        self.modified = True
+        return value
+
+
+def lookup(layout, name, check, compute):
+    """ Like :meth:`Layout.lookup` but just returns `compute()` if `layout`
+    is None.
+    """
+    if layout is None:
+        return compute()
+    return layout.lookup(name, check, compute)
+
+
+class ModelCache:
+    """ Stores layouts of models as files in a directory.
+
+    The least recently used files are deleted as soon as the total size of
+    the cache exceeds `max_size`. A layout which is larger than `max_size` is
+    not kept at all.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the cache. It is created if it does not exist.
+    max_size : int
+        Maximal total size of the files of the cache in bytes.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> cache = ModelCache(tempfile.mkdtemp())
+    >>> layout = cache.load('abc')
+    >>> len(layout)
+    0
+    >>> _ = layout.lookup('order', lambda: 'a', lambda: [1, 0])
+    >>> cache.save('abc', layout)
+    >>> cache.load('abc')['order']
+    ('a', [1, 0])
+    """
+    extension = '.layout'
+
+    def __init__(self, directory, max_size=2 ** 30):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def load(self, key):
+        """ Returns the layout stored under `key` or an empty layout.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                layout = Layout(pickle.load(f))
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return Layout()
+        # the modification time marks the use of the entry
+        os.utime(path)
+        return layout
+
+    def save(self, key, layout):
+        """ Stores `layout` under `key` if it has been modified and evicts the
+        least recently used entries if the cache is too large.
+        """
+        if not layout.modified:
+            return
+        path = self._path(key)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            pickle.dump(dict(layout), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        layout.modified = False
+        self.evict()
+
+    def entries(self):
+        """ Returns the paths of all entries, least recently used first.
+        """
+        paths = [os.path.join(self.directory, n) for n in
+                 os.listdir(self.directory) if n.endswith(self.extension)]
+        return sorted(paths, key=os.path.getmtime)
+
+    def size(self):
+        """ Returns the total size of all entries in bytes.
+        """
+        return sum(os.path.getsize(p) for p in self.entries())
+
+    def evict(self):
+        """ Deletes the least recently used entries until the total size of
+        the cache does not exceed `max_size`.
+        """
+        paths = self.entries()
+        size = sum(os.path.getsize(p) for p in paths)
+        for path in paths:
+            if size <= self.max_size:
+                break
+            size -= os.path.getsize(path)
+            os.remove(path)
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import csv
+import numpy as np
 import pandas as pd
 import os
 import logging
@@ -35,6 +37,22 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
         List of string with attributes that shall be recognized inside the
         csv file and set as flow attribute
 
+    """
+    nodes_flows = pd.read_csv(file_nodes_flows, sep=delimiter)
+    sequences, positions = _read_sequences(file_nodes_flows_sequences,
+                                           delimiter)
+    return _create_nodes(nodes_flows, sequences, positions,
+                         additional_classes, additional_seq_attributes,
+                         additional_flow_attributes)
+
+
+def _create_nodes(nodes_flows, sequences, positions, additional_classes=None,
+                  additional_seq_attributes=None,
+                  additional_flow_attributes=None):
+    """ Creates the nodes of :func:`NodesFromCSV` from the table of nodes and
+    flows, the block of sequences and the dictionary mapping the tuple
+    `(class, label, source, target, attribute)` of every sequence to its
+    column in the block.
     """
     # Check attributes for None values
     if additional_classes is None:
@@ -44,16 +62,10 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
     if additional_flow_attributes is None:
         additional_flow_attributes = list()
 
-    # dataframe creation and manipulation
-    nodes_flows = pd.read_csv(file_nodes_flows, sep=delimiter)
-    nodes_flows_seq = pd.read_csv(file_nodes_flows_sequences, sep=delimiter,
-                                  header=None)
-    nodes_flows_seq.dropna(axis=0, how='all', inplace=True)
-    nodes_flows_seq.drop(0, axis=1, inplace=True)
-    nodes_flows_seq = nodes_flows_seq.transpose()
-    nodes_flows_seq.set_index([0, 1, 2, 3, 4], inplace=True)
-    nodes_flows_seq.columns = range(0, len(nodes_flows_seq.columns))
-    nodes_flows_seq = nodes_flows_seq.astype(float)
+    def sequence_of(row, attr):
+        # a view on the column of the sequence in the sequence block
+        return sequences[:, positions[row['class'], row['label'],
+                                      row['source'], row['target'], attr]]
 
     # class dictionary for dynamic instantiation
     classes = {'Source': Source, 'Sink': Sink,
@@ -71,19 +83,23 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
     # attributes of different classes
     flow_attrs = list(vars(Flow()).keys()) + additional_flow_attributes
     bus_attrs = vars(Bus()).keys()
+    # for the if check below we use all flow_attrs except investment
+    # because for storages investment needs to be set as a node
+    # attribute (and a flow attribute)
+    flow_attrs_ = [i for i in flow_attrs if i != 'investment']
 
-    # iteration over dataframe rows to create objects
+    # iteration over the rows of the dataframe to create objects
     nodes = {}
-    for i, r in nodes_flows.iterrows():
+    columns = nodes_flows.columns.values
+    for i, values, valid in zip(nodes_flows.index, nodes_flows.values,
+                                nodes_flows.notnull().values):
+
+        # save column labels and row values without NaN values in dict
+        row = {c: v for c, v, ok in zip(columns, values, valid) if ok}
 
         # check if current line holds valid data or is just for visual purposes
         # e.g. a blank line or a line that contains data explanations
-        if isinstance(r['class'], str) and r['class'] in classes.keys():
-
-            # drop NaN values from series
-            r = r.dropna()
-            # save column labels and row values in dict
-            row = dict(zip(r.index.values, r.values))
+        if isinstance(row.get('class'), str) and row['class'] in classes:
 
             # create node if not existent and set attributes
             # (attributes must be placed either in the first line or in all
@@ -93,11 +109,6 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
                     node = nodes.get(row['label'])
                     if node is None:
                         node = classes[row['class']](label=row['label'])
-                # for the if check below we use all flow_attrs except
-                # investment
-                # because for storages investment needs to be set as a node
-                # attribute (and a flow attribute)
-                flow_attrs_ = [i for i in flow_attrs if i != 'investment']
                 for attr in row.keys():
                     if (attr not in flow_attrs_ and
                        attr not in ('class', 'label', 'source', 'target',
@@ -121,17 +132,7 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
                                     setattr(node, attr, row[attr])
 
                             else:
-                                seq = nodes_flows_seq.loc[row['class'],
-                                                          row['label'],
-                                                          row['source'],
-                                                          row['target'],
-                                                          attr]
-                                if attr in seq_attributes:
-                                    seq = [i for i in seq]
-                                    seq = sequence(seq)
-                                else:
-                                    seq = [i for i in seq.values]
-                                setattr(node, attr, seq)
+                                setattr(node, attr, sequence_of(row, attr))
             except:
                 print('Error with node creation in line', i+2, 'in csv file.')
                 print('Label:', row['label'])
@@ -147,17 +148,7 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
                                 row[attr] = sequence(float(row[attr]))
                             setattr(flow, attr, row[attr])
                         if row[attr] == 'seq':
-                            seq = nodes_flows_seq.loc[row['class'],
-                                                      row['label'],
-                                                      row['source'],
-                                                      row['target'],
-                                                      attr]
-                            if attr in seq_attributes:
-                                seq = [i for i in seq]
-                                seq = sequence(seq)
-                            else:
-                                seq = [i for i in seq.values]
-                            setattr(flow, attr, seq)
+                            setattr(flow, attr, sequence_of(row, attr))
                         # this block is only for binary flows!
                         if attr == 'binary' and row[attr] is True:
                             # create binary object for flow
@@ -223,14 +214,9 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
             try:
                 if row['target'] and 'conversion_factors' in row:
                     if row['conversion_factors'] == 'seq':
-                        seq = nodes_flows_seq.loc[row['class'],
-                                                  row['label'],
-                                                  row['source'],
-                                                  row['target'],
-                                                  'conversion_factors']
-                        seq = [i for i in seq]
-                        seq = sequence(seq)
-                        conversion_factors = {nodes[row['target']]: seq}
+                        conversion_factors = {nodes[row['target']]:
+                                              sequence_of(
+                                                  row, 'conversion_factors')}
                     else:
                         conversion_factors = \
                             {nodes[row['target']]:
@@ -265,6 +251,45 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
     return nodes
 
 
+def _read_sequences(file_nodes_flows_sequences, delimiter=','):
+    """ Reads the sequences of :func:`NodesFromCSV` into one float block.
+
+    The first five lines of the file hold the class, label, source, target
+    and attribute of every sequence, the first column an (ignored) time
+    index. Lines without any value are skipped.
+
+    Returns
+    -------
+    tuple
+        The block (one column per sequence, stored in column-major order, so
+        its columns are contiguous) and a dictionary which maps the tuple
+        `(class, label, source, target, attribute)` of every sequence to its
+        column.
+    """
+    with open(file_nodes_flows_sequences, newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [next(reader)[1:] for row in range(5)]
+        positions = {key: k for k, key in enumerate(zip(*header))}
+
+        cells = []
+        width = len(header[0])
+        for line in f:
+            # splitting is much faster than the csv reader for long lines
+            row = (line.rstrip('\r\n').split(delimiter) if '"' not in line
+                   else next(csv.reader([line], delimiter=delimiter)))
+            if any(c.strip() for c in row):
+                row = row[1:width + 1]
+                cells.extend(row + [''] * (width - len(row)))
+
+    try:
+        values = np.array(cells, dtype=float)
+    except ValueError:
+        # empty cells are missing values
+        values = np.array([float(c) if c.strip() else np.nan for c in cells])
+    return (np.asfortranarray(values.reshape(len(cells) // width, width)),
+            positions)
+
+
 def merge_csv_files(path=None, output_path=None, write=True):
     """
     Merge csv files from a specified directory. All files with 'seq' will be
@@ -289,17 +314,17 @@ def merge_csv_files(path=None, output_path=None, write=True):
 
     files = [f for f in os.listdir(path) if f.endswith('.csv')]
 
-    nodes_flows = pd.DataFrame()
-    nodes_flows_seq = pd.DataFrame()
-
+    # the frames are concatenated at once, which copies every value once
+    sequences = [pd.DataFrame()]
+    tables = [pd.DataFrame()]
     for f in files:
         if 'seq' in f:
-            tmp_df = pd.read_csv(os.path.join(path, f), index_col=[0],
-                                 header=[0, 1, 2, 3, 4])
-            nodes_flows_seq = pd.concat([nodes_flows_seq, tmp_df], axis=1)
+            sequences.append(pd.read_csv(os.path.join(path, f), index_col=[0],
+                                         header=[0, 1, 2, 3, 4]))
         else:
-            tmp_df = pd.read_csv(os.path.join(path, f))
-            nodes_flows = pd.concat([nodes_flows, tmp_df])
+            tables.append(pd.read_csv(os.path.join(path, f)))
+    nodes_flows_seq = pd.concat(sequences, axis=1)
+    nodes_flows = pd.concat(tables)
 
     if write is True:
         nodes_flows.to_csv(os.path.join(output_path,
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Reading the nodes, flows and sequences of the csv reader from Parquet
+files.
+
+The scenario has the schema of the csv files read by
+:func:`~oemof.solph.inputlib.csv_tools.NodesFromCSV`: a table of nodes and
+flows with the columns `class`, `label`, `source`, `target` and one column
+per attribute and a table of sequences with one column per sequence. The name
+of a sequence column joins its class, label, source, target and attribute
+with :data:`SEPARATOR`, e.g. `'Source|wind|wind|bus|actual_value'`.
+
+Both tables may be single Parquet files or directories of (partitioned)
+Parquet files. Parquet files are read and written with `pyarrow`, which has
+to be installed to use this module.
+"""
+
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from .csv_tools import _create_nodes, _read_sequences
+
+#: Separates the class, label, source, target and attribute in the names of
+#: the sequence columns.
+SEPARATOR = '|'
+
+
+def _parquet():
+    """ Returns the module `pyarrow.parquet` or raises an ImportError.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading and writing Parquet files requires the "
+                          "package pyarrow.")
+    return pq
+
+
+def NodesFromParquet(nodes_flows, sequences, classes=None, labels=None,
+                     use_threads=True, additional_classes=None,
+                     additional_seq_attributes=None,
+                     additional_flow_attributes=None):
+    """ Creates nodes with their respective flows and sequences from Parquet
+    files with the schema of the csv files of
+    :func:`~oemof.solph.inputlib.csv_tools.NodesFromCSV`.
+
+    Only the rows of the selected classes and labels are read from the table
+    of nodes and flows (the selection is passed as filter to the Parquet
+    reader, so row groups and partitions which do not contain any selected
+    row are skipped) and only the sequences used by these rows are read.
+
+    Parameters
+    ----------
+    nodes_flows : string
+        Parquet file or directory with nodes and flows
+    sequences : string
+        Parquet file or directory containing sequences
+    classes : iterable (optional)
+        Classes of the rows to be read, e.g. ['Source', 'Sink']. Defaults to
+        all classes.
+    labels : iterable (optional)
+        Labels of the rows to be read. Defaults to all labels.
+    use_threads : boolean
+        If True, the columns and files of a table are read in parallel.
+    additional_classes : dict
+        Dictionary containing additional classes to be recognized inside the
+        reader. Looks like: {'MyClass1': MyClass1, ...}
+    additional_seq_attributes : iterable
+        List of string with attributes that have to be of type 'solph sequence'
+        and that shall be recognized inside the files.
+    additional_flow_attributes : iterable
+        List of string with attributes that shall be recognized inside the
+        files and set as flow attribute
+
+    Returns
+    -------
+    dict
+        The created nodes by label.
+    """
+    pq = _parquet()
+    filters = [(column, 'in', set(values)) for column, values in
+               (('class', classes), ('label', labels)) if values is not None]
+    frame = pq.read_table(nodes_flows, filters=filters or None,
+                          use_threads=use_threads).to_pandas()
+    # partitions (and not row groups) are filtered by older versions of
+    # pyarrow only
+    for column, operator, values in filters:
+        frame = frame[frame[column].astype(object).isin(values).values]
+    # partition columns are categorical
+    for column in frame.columns:
+        if pd.api.types.is_categorical_dtype(frame[column]):
+            frame[column] = frame[column].astype(object)
+
+    # the sequences used by the selected rows
+    keys = []
+    for row in frame.to_dict('records'):
+        for attr, value in row.items():
+            if isinstance(value, str) and value == 'seq':
+                keys.append((row['class'], row['label'], row['source'],
+                             row['target'], attr))
+    keys = list(OrderedDict.fromkeys(keys))
+    columns = [SEPARATOR.join(str(v) for v in key) for key in keys]
+    if columns:
+        block = pq.read_table(sequences, columns=columns,
+                              use_threads=use_threads).to_pandas()
+        block = np.asfortranarray(block[columns].values, dtype=float)
+    else:
+        block = np.empty((0, 0))
+    positions = {key: k for k, key in enumerate(keys)}
+
+    return _create_nodes(frame, block, positions, additional_classes,
+                         additional_seq_attributes, additional_flow_attributes)
+
+
+def csv_to_parquet(file_nodes_flows, file_nodes_flows_sequences,
+                   nodes_flows, sequences, delimiter=',', partition_on=None):
+    """ Converts the csv files of
+    :func:`~oemof.solph.inputlib.csv_tools.NodesFromCSV` into Parquet files
+    read by :func:`NodesFromParquet`.
+
+    Columns which contain strings (e.g. 'seq') and numbers are stored as
+    strings like they are read from the csv file, all other columns keep
+    their type.
+
+    Parameters
+    ----------
+    file_nodes_flows : string
+        Name of CSV file with nodes and flows
+    file_nodes_flows_sequences : string
+        Name of of CSV file containing sequences
+    nodes_flows : string
+        Name of the Parquet file (or directory if `partition_on` is given)
+        of the nodes and flows
+    sequences : string
+        Name of the Parquet file of the sequences
+    delimiter : str
+        Delimiter of CSV file
+    partition_on : list (optional)
+        Columns of the nodes and flows to partition the files by, e.g.
+        ['class'].
+    """
+    pq = _parquet()
+    import pyarrow as pa
+
+    frame = pd.read_csv(file_nodes_flows, sep=delimiter)
+    # keep the rows of nodes only, i.e. drop comments and blank lines
+    frame = frame[frame['class'].notnull().values &
+                  frame['label'].notnull().values].copy()
+    for column in frame.columns:
+        values = frame[column]
+        if (values.dtype == object and
+                values.map(lambda v: isinstance(v, str)).any()):
+            frame[column] = values.map(
+                lambda v: None if pd.isnull(v) else
+                v if isinstance(v, str) else str(v))
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if partition_on:
+        pq.write_to_dataset(table, nodes_flows, partition_cols=partition_on)
+    else:
+        pq.write_table(table, nodes_flows)
+
+    block, positions = _read_sequences(file_nodes_flows_sequences, delimiter)
+    columns = [None] * len(positions)
+    for key, k in positions.items():
+        columns[k] = SEPARATOR.join(key)
+    pq.write_table(pa.Table.from_pandas(
+        pd.DataFrame(block, columns=columns), preserve_index=False),
+        sequences)
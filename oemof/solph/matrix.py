@@ -0,0 +1,1404 @@
+# -*- coding: utf-8 -*-
+"""Building the optimization problem of the :class:`.OperationalModel`
+directly as a sparse matrix.
+
+The :class:`MatrixModel` creates the same variables, constraints and objective
+function as the :class:`~oemof.solph.models.OperationalModel` but without
+creating a pyomo expression for every single constraint. Instead, every block
+contributes row and column indices plus coefficients (i.e. a sparse matrix in
+coordinate format) for all of its constraints and timesteps at once. The
+problem is written to a LP or MPS file directly from these arrays.
+
+The LP files are written in the same format (names, order and number format)
+as the pyomo LP writer uses with `symbolic_solver_labels`, so both models
+produce identical files.
+"""
+
+from collections import OrderedDict
+import gzip
+import multiprocessing
+import numpy as np
+from oemof.solph import blocks
+from .cache import digest, fingerprint, lookup
+from .models import OperationalModel, flow_bounds, timestep_lengths
+from .plumbing import sequence, to_array
+from . import presolve as _presolve
+
+
+# translation of component names to LP file symbols as done by pyomo
+_SYMBOL_TRANSLATION = str.maketrans("[]{} -#$%&*+.,/;<=>?@^!~':",
+                                    "()()______________________")
+
+_CONTINUOUS, _INTEGER, _BINARY = 0, 1, 2
+
+
+def _escape(index):
+    """ Returns the string representation of an index element as used by
+    pyomo in component names.
+    """
+    x = str(index).replace("\\", "\\\\").replace("'", "\\'")
+    if ',' in x or "'" in x:
+        return "'" + x + "'"
+    return x
+
+
+def _symbol(name, index):
+    """ Returns the LP file symbol of the component `name` at `index`.
+
+    Examples
+    --------
+    >>> _symbol('Bus.balance', ('electricity', 0))
+    'Bus_balance(electricity_0)'
+    >>> _symbol('flow', ('a b', 'c', 1))
+    'flow(a_b_c_1)'
+    """
+    index = ",".join(_escape(i) for i in index)
+    return (name + "[" + index + "]").translate(_SYMBOL_TRANSLATION)
+
+
+def _timestep_symbols(name, keys, timesteps):
+    """ Returns the LP file symbols of the component `name` for all `keys`
+    and `timesteps`, i.e. `_symbol(name, key + (t,))` for every key and
+    timestep. Only the symbols of the keys and timesteps are created, not
+    every combination of both.
+    """
+    prefixes = [(name + "[" + "".join(_escape(i) + "," for i in k)).translate(
+        _SYMBOL_TRANSLATION) for k in keys]
+    suffixes = [(_escape(t) + "]").translate(_SYMBOL_TRANSLATION)
+                for t in timesteps]
+    return [p + s for p in prefixes for s in suffixes]
+
+
+def _structure(family):
+    """ Returns a digest of everything the LP file symbols of a family of
+    variables or constraints depend on.
+    """
+    return digest(family.name, [tuple(str(i) for i in k) for k in family.keys],
+                  family.timesteps)
+
+
+def _no_negative_zero(value):
+    """ Makes sure -0 is never written to a file.
+    """
+    if value == 0:
+        return 0
+    return value
+
+
+class _Variables:
+    """ A family of variables of the :class:`MatrixModel`, i.e. the
+    counterpart of a pyomo `Var` component.
+
+    The columns of a family are numbered consecutively starting at `offset`,
+    ordered by their (sorted) keys and timesteps.
+
+    Parameters
+    ----------
+    name : str
+        Name of the family, e.g. `'flow'` or `'Storage.capacity'`.
+    keys : iterable
+        Index tuples of the family (without the timestep).
+    timesteps : list or None
+        The timesteps of the model if the family is indexed by timesteps.
+    offset : int
+        Column index of the first variable of the family.
+    domain : int
+        One of `_CONTINUOUS`, `_INTEGER` or `_BINARY`.
+    nonnegative : boolean
+        If True the lower bound of all variables is at least zero.
+    """
+    def __init__(self, name, keys, timesteps, offset, domain=_CONTINUOUS,
+                 nonnegative=True):
+        self.name = name
+        self.keys = sorted(keys)
+        self.position = {k: p for p, k in enumerate(self.keys)}
+        self.timesteps = timesteps
+        self.width = 1 if timesteps is None else len(timesteps)
+        self.offset = offset
+        self.size = len(self.keys) * self.width
+        self.domain = domain
+        self.domain_bounds = ((0 if nonnegative or domain == _BINARY
+                               else -np.inf),
+                              1 if domain == _BINARY else np.inf)
+        self.lb = np.full(self.size, -np.inf)
+        self.ub = np.full(self.size, np.inf)
+        self.fixed = np.zeros(self.size, dtype=bool)
+        self.value = np.full(self.size, np.nan)
+
+    def __contains__(self, key):
+        return key in self.position
+
+    def local(self, key):
+        """ Returns the local column indices (i.e. relative to `offset`) of
+        the variables of `key` for all timesteps.
+        """
+        start = self.position[key] * self.width
+        return np.arange(start, start + self.width)
+
+    def columns(self, key):
+        """ Returns the column indices of the variables of `key` for all
+        timesteps (or the single column of `key` if the family is not indexed
+        by timesteps).
+        """
+        return self.offset + self.local(key)
+
+    def column(self, key):
+        """ Returns the column index of a family not indexed by timesteps.
+        """
+        return self.offset + self.position[key]
+
+    def set_bounds(self, key, lb=None, ub=None):
+        """ Sets the lower and/or upper bounds of the variables of `key`.
+        """
+        local = self.local(key)
+        if lb is not None:
+            self.lb[local] = lb
+        if ub is not None:
+            self.ub[local] = ub
+
+    def bounds(self):
+        """ Returns the lower and upper bounds of all variables of the family
+        combined with the bounds of their domain.
+        """
+        dlb, dub = self.domain_bounds
+        return np.fmax(self.lb, dlb), np.fmin(self.ub, dub)
+
+    def names(self):
+        """ Returns the LP file symbols of all variables of the family.
+        """
+        if self.timesteps is None:
+            return [_symbol(self.name, k) for k in self.keys]
+        return _timestep_symbols(self.name, self.keys, self.timesteps)
+
+
+class _Constraints:
+    """ A family of constraints of the :class:`MatrixModel`, i.e. the
+    counterpart of a pyomo `Constraint` component.
+
+    Every constraint is stored as a left hand side and a right hand side, each
+    consisting of linear terms and a constant. This way the constraints are
+    transformed into rows by :meth:`rows` exactly like pyomo transforms
+    relational expressions into constraint bodies and bounds.
+
+    Parameters
+    ----------
+    name : str
+        Name of the family, e.g. `'Bus.balance'`.
+    keys : iterable
+        Index tuples of the family (without the timestep).
+    timesteps : list or None
+        The timesteps of the model if the family is indexed by timesteps.
+    sense : str
+        One of `'=='`, `'<='` or `'>='`.
+    """
+    def __init__(self, name, keys, timesteps, sense):
+        self.name = name
+        self.keys = sorted(keys)
+        self.position = {k: p for p, k in enumerate(self.keys)}
+        self.timesteps = timesteps
+        self.width = 1 if timesteps is None else len(timesteps)
+        self.size = len(self.keys) * self.width
+        self.sense = sense
+        self.added = np.zeros(self.size, dtype=bool)
+        self.constants = np.zeros((2, self.size))
+        self._terms = []
+
+    def add(self, key, lhs=(), rhs=(), lhs_constant=0, rhs_constant=0,
+            positions=None):
+        """ Adds the constraints of `key`.
+
+        Parameters
+        ----------
+        key : tuple
+            Index of the constraints.
+        lhs, rhs : list
+            Linear terms of the left/right hand side as (columns,
+            coefficients) tuples. Columns and coefficients are broadcasted
+            against the rows of the constraints.
+        lhs_constant, rhs_constant : numeric or array
+            Constant of the left/right hand side.
+        positions : array (optional)
+            Positions of the timesteps to add the constraints for. Defaults to
+            all timesteps.
+        """
+        rows = self.position[key] * self.width + (
+            np.arange(self.width) if positions is None
+            else np.asarray(positions))
+        self.added[rows] = True
+        self.constants[0, rows] += lhs_constant
+        self.constants[1, rows] += rhs_constant
+        for side, terms in enumerate((lhs, rhs)):
+            for columns, coefficients in terms:
+                r, c, v = np.broadcast_arrays(rows, columns, coefficients)
+                self._terms.append((r, c, v.astype(float), side))
+
+    def rows(self, fixed, value, layout=None):
+        """ Transforms the constraints into rows.
+
+        The body and bounds of every row are derived like pyomo does it for
+        relational expressions. Terms with a coefficient of zero are dropped
+        (as pyomo does when the expression is created), variables which are
+        fixed are moved into the bounds. Constraints without any variable
+        are skipped.
+
+        Parameters
+        ----------
+        fixed : boolean array
+            Indicates for every column of the model if it is fixed.
+        value : array
+            The values of all columns of the model.
+        layout : :class:`~oemof.solph.cache.Layout` (optional)
+            Stores the permutations sorting the terms, which are reused if
+            the rows and columns of the terms are unchanged.
+
+        Returns
+        -------
+        tuple
+            `(local_rows, row, column, coefficient, sense, bound)`. The first
+            array contains the local index of all rows in the family, the
+            indices in `row` refer to the position in this array.
+        """
+        if self._terms:
+            row = np.concatenate([t[0] for t in self._terms])
+            col = np.concatenate([t[1] for t in self._terms])
+            coef = np.concatenate([t[2] for t in self._terms])
+            side = np.concatenate([np.full(len(t[0]), t[3], dtype=int)
+                                   for t in self._terms])
+            order = lookup(layout, self.name + ':order',
+                           lambda: digest(row),
+                           lambda: np.argsort(row, kind='mergesort'))
+            row, col, coef, side = row[order], col[order], coef[order], (
+                side[order])
+            nonzero = coef != 0
+            row, col, coef, side = (row[nonzero], col[nonzero],
+                                    coef[nonzero], side[nonzero])
+        else:
+            row = col = side = np.zeros(0, dtype=int)
+            coef = np.zeros(0)
+
+        lhs_constant, rhs_constant = self.constants
+        if self.sense == '>=':
+            # a >= b is expressed as b <= a
+            side = 1 - side
+            lhs_constant, rhs_constant = rhs_constant, lhs_constant
+
+        variable = np.zeros((2, self.size), dtype=bool)
+        variable[side, row] = True
+        lhs_variable, rhs_variable = variable
+        both = lhs_variable & rhs_variable
+
+        # body and bound of the constraint depending on the variable sides
+        # lhs only: lhs <= rhs_constant, rhs only: lhs_constant <= rhs,
+        # both: lhs - rhs <= 0
+        offset = np.where(both, lhs_constant - rhs_constant,
+                          np.where(rhs_variable, rhs_constant, lhs_constant))
+        bound = np.where(both, 0,
+                         np.where(rhs_variable, lhs_constant, rhs_constant))
+        coef = np.where(both[row] & (side == 1), -coef, coef)
+        if self.sense == '==':
+            sense = np.full(self.size, 'E')
+        else:
+            sense = np.where(rhs_variable & ~lhs_variable, 'G', 'L')
+
+        # move fixed variables into the constant offset of the body. Like
+        # pyomo, the fixed terms are added to the constant one by one if the
+        # body contains other variables, else the constant is added to the
+        # sum of the fixed terms.
+        is_fixed = fixed[col]
+        constant = offset.copy()
+        fixed_terms = np.zeros(self.size)
+        np.add.at(fixed_terms, row[is_fixed],
+                  coef[is_fixed] * value[col[is_fixed]])
+        np.add.at(offset, row[is_fixed], coef[is_fixed] * value[col[is_fixed]])
+        free = np.zeros(self.size, dtype=bool)
+        free[row[~is_fixed]] = True
+        offset = np.where(free, offset, fixed_terms + constant)
+        row, col, coef = row[~is_fixed], col[~is_fixed], coef[~is_fixed]
+
+        # merge duplicate terms
+        order = lookup(layout, self.name + ':merge',
+                       lambda: digest(row, col),
+                       lambda: np.lexsort((col, row)))
+        row, col, coef = row[order], col[order], coef[order]
+        if len(row):
+            start = np.concatenate(
+                ([True], (row[1:] != row[:-1]) | (col[1:] != col[:-1])))
+            coef = np.add.reduceat(coef, np.flatnonzero(start))
+            row, col = row[start], col[start]
+
+        keep = self.added & (lhs_variable | rhs_variable)
+        local_rows = np.flatnonzero(keep)
+        renumber = np.cumsum(keep) - 1
+        entries = keep[row]
+        return (local_rows, renumber[row[entries]], col[entries],
+                coef[entries], sense[keep], (bound - offset)[keep])
+
+    def names(self, local_rows, layout=None):
+        """ Returns the LP file symbols of the rows `local_rows`.
+        """
+        if layout is None and self.timesteps is None:
+            return [_symbol(self.name, self.keys[r]) for r in local_rows]
+        symbols = lookup(layout, self.name + ':names',
+                         lambda: _structure(self), self.symbols)
+        return [symbols[r] for r in local_rows]
+
+    def symbols(self):
+        """ Returns the LP file symbols of all rows of the family.
+        """
+        if self.timesteps is None:
+            return [_symbol(self.name, k) for k in self.keys]
+        return _timestep_symbols(self.name, self.keys, self.timesteps)
+
+
+class MatrixModel:
+    """ An energy system model for operational simulation with optimized
+    dispatch which is built directly as a sparse matrix.
+
+    The model contains the same variables, constraints and objective function
+    as the :class:`~oemof.solph.models.OperationalModel`, but the constraints
+    of every block are created from arrays for all timesteps at once (see
+    :const:`BUILDERS`) instead of creating pyomo expressions. This makes the
+    creation of large models and writing them to a file a lot faster.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Object that holds the nodes of an oemof energy system graph
+    constraint_groups : list
+        Additional constraint groups. For every group a builder has to be
+        registered in :const:`BUILDERS`.
+    timeindex : pandas DatetimeIndex
+        The time index will be used to calculate the timesteps and the
+        time increment for the optimization model.
+    timesteps : sequence (optional)
+        Timesteps used in the optimization model.
+    timeincrement : float or list of floats (optional)
+        Time increment used in constraints and objective expressions.
+    cache : :class:`~oemof.solph.cache.ModelCache` (optional)
+        If given, the layout of the model (see :mod:`oemof.solph.cache`) is
+        loaded from the cache before the model is built and stored after the
+        model is built or written. The blocks are built in any case, only
+        sorting the matrix and naming the rows and columns is skipped.
+
+    Attributes
+    ----------
+    row, column, coefficient : numpy.array
+        The constraint matrix in coordinate format, sorted by row and column.
+    sense : numpy.array
+        The sense of each row: 'E' (equal), 'L' (less or equal) or 'G'
+        (greater or equal).
+    bound : numpy.array
+        The right hand side of each row.
+    objective : numpy.array
+        The objective coefficient of each column.
+    objective_constant : float
+        The constant part of the objective function.
+    lower_bounds, upper_bounds : numpy.array
+        The bounds of all columns. Fixed columns are bounded by their value.
+    integrality : numpy.array
+        0 for continuous, 1 for integer and 2 for binary columns.
+    variables : OrderedDict
+        All families of variables by name. Use :meth:`columns` to get the
+        column indices of a variable.
+    fingerprint : str or None
+        The fingerprint of the structure of the energy system if a cache is
+        used.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof import solph
+    >>> es = solph.EnergySystem(
+    ...     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+    >>> bel = solph.Bus(label='electricity')
+    >>> pp = solph.Source(label='pp', outputs={
+    ...     bel: solph.Flow(nominal_value=10, variable_costs=2)})
+    >>> demand = solph.Sink(label='demand', inputs={bel: solph.Flow(
+    ...     nominal_value=5, actual_value=[1, 0.5, 0.2], fixed=True)})
+    >>> mm = MatrixModel(es)
+    >>> mm.bound.tolist()
+    [5.0, 2.5, 1.0]
+    >>> mm.objective[mm.columns('flow', (pp, bel))].tolist()
+    [2.0, 2.0, 2.0]
+    """
+    CONSTRAINT_GROUPS = OperationalModel.CONSTRAINT_GROUPS
+
+    def __init__(self, es, **kwargs):
+        self.name = kwargs.get('name', 'OperationalModel')
+        self.es = es
+        self.timeindex = kwargs.get('timeindex', es.timeindex)
+        self.timesteps = list(kwargs.get('timesteps',
+                                         range(len(self.timeindex))))
+        self.timeincrement = kwargs.get('timeincrement')
+        if self.timeincrement is None:
+            self.timeincrement = timestep_lengths(self.timeindex,
+                                                  self.timesteps)
+        self.timeincrement = sequence(self.timeincrement)
+        self._constraint_groups = (MatrixModel.CONSTRAINT_GROUPS +
+                                   kwargs.get('constraint_groups', []))
+
+        self.cache = kwargs.get('cache')
+        self.fingerprint = self.layout = None
+        if self.cache is not None:
+            self.fingerprint = fingerprint(es, self.timesteps,
+                                           self._constraint_groups)
+            self.layout = self.cache.load(self.fingerprint)
+
+        self.flows = es.flows()
+        self.length = max(self.timesteps) + 1
+        self.position = {t: p for p, t in enumerate(self.timesteps)}
+
+        # position of the previous timestep (the last for the first timestep)
+        self.previous = np.roll(np.arange(len(self.timesteps)), 1)
+
+        self.variables = OrderedDict()
+        self.constraints = []
+        self._objective = []
+        self.objective_constant = 0
+
+        # ######################### Variables #################################
+        self.flow = self.add_variables('flow', self.flows.keys())
+        self._set_flow_bounds()
+
+        self.positive_flow_gradient = self.add_variables(
+            'positive_flow_gradient',
+            [k for k, f in self.flows.items()
+             if f.positive_gradient[0] is not None])
+        self.negative_flow_gradient = self.add_variables(
+            'negative_flow_gradient',
+            [k for k, f in self.flows.items()
+             if f.negative_gradient[0] is not None])
+
+        # ######################### Blocks ####################################
+        for group in self._constraint_groups:
+            if group not in BUILDERS:
+                raise ValueError("No matrix builder for constraint group "
+                                 "{0}.".format(group))
+            BUILDERS[group](self, self.es.groups.get(group))
+
+        self._build()
+        self._save_layout()
+
+    def array(self, sequence):
+        """ Returns the values of a sequence for all timesteps of the model.
+        """
+        return to_array(sequence, self.length)[self.timesteps]
+
+    def add_variables(self, name, keys, timesteps=True, **kwargs):
+        """ Adds a family of variables to the model (see :class:`_Variables`)
+        and returns it.
+        """
+        offset = sum(v.size for v in self.variables.values())
+        variables = _Variables(name, keys,
+                               self.timesteps if timesteps else None,
+                               offset, **kwargs)
+        self.variables[name] = variables
+        return variables
+
+    def add_constraints(self, name, keys, sense, timesteps=True):
+        """ Adds a family of constraints to the model (see
+        :class:`_Constraints`) and returns it.
+        """
+        constraints = _Constraints(name, keys,
+                                   self.timesteps if timesteps else None,
+                                   sense)
+        self.constraints.append(constraints)
+        return constraints
+
+    def add_objective(self, columns, coefficients):
+        """ Adds linear terms to the objective function.
+        """
+        c, v = np.broadcast_arrays(np.atleast_1d(columns), coefficients)
+        self._objective.append((c, v.astype(float)))
+
+    def columns(self, name, key):
+        """ Returns the column indices of the variable `name` with the index
+        `key` (without the timestep).
+        """
+        return self.variables[name].columns(key)
+
+    def _set_flow_bounds(self):
+        """ Sets the bounds and (fixed) values of the flow variable using
+        :func:`~oemof.solph.models.flow_bounds`.
+        """
+        flows = [self.flows[k] for k in self.flow.keys]
+        if not flows:
+            return
+        values, has_value, lower_bounds, upper_bounds, bounded = (
+            flow_bounds(flows, self.timesteps))
+        self.flow.value[:] = values.ravel()
+        fixed = np.array([f.fixed for f in flows], dtype=bool)
+        self.flow.fixed[:] = (has_value & fixed[:, np.newaxis]).ravel()
+        self.flow.lb[:] = np.where(bounded[:, np.newaxis], lower_bounds,
+                                   -np.inf).ravel()
+        self.flow.ub[:] = np.where(bounded[:, np.newaxis], upper_bounds,
+                                   np.inf).ravel()
+
+    def _build(self):
+        """ Assembles the constraint matrix, bounds and objective from the
+        families of variables and constraints.
+        """
+        variables = list(self.variables.values())
+        self.fixed = np.concatenate([v.fixed for v in variables] +
+                                    [np.zeros(0, dtype=bool)])
+        self.values = np.concatenate([v.value for v in variables] +
+                                     [np.zeros(0)])
+        bounds = [v.bounds() for v in variables]
+        self.lower_bounds = np.concatenate([b[0] for b in bounds] +
+                                           [np.zeros(0)])
+        self.upper_bounds = np.concatenate([b[1] for b in bounds] +
+                                           [np.zeros(0)])
+        self.lower_bounds[self.fixed] = self.values[self.fixed]
+        self.upper_bounds[self.fixed] = self.values[self.fixed]
+        self.integrality = np.concatenate(
+            [np.full(v.size, v.domain, dtype=int) for v in variables] +
+            [np.zeros(0, dtype=int)])
+
+        rows, cols, coefs, senses, bounds = [], [], [], [], []
+        self._row_families = []
+        offset = 0
+        for constraints in self.constraints:
+            local, row, col, coef, sense, bound = constraints.rows(
+                self.fixed, self.values, self.layout)
+            self._row_families.append((constraints, local))
+            rows.append(row + offset)
+            cols.append(col)
+            coefs.append(coef)
+            senses.append(sense)
+            bounds.append(bound)
+            offset += len(local)
+        self.row = np.concatenate(rows + [np.zeros(0, dtype=int)])
+        self.column = np.concatenate(cols + [np.zeros(0, dtype=int)])
+        self.coefficient = np.concatenate(coefs + [np.zeros(0)])
+        self.sense = np.concatenate(senses + [np.zeros(0, dtype='<U1')])
+        self.bound = np.concatenate(bounds + [np.zeros(0)])
+
+        # objective function
+        if self._objective:
+            col = np.concatenate([o[0] for o in self._objective])
+            coef = np.concatenate([o[1] for o in self._objective])
+        else:
+            col, coef = np.zeros(0, dtype=int), np.zeros(0)
+        col, coef = col[coef != 0], coef[coef != 0]
+        is_fixed = self.fixed[col]
+        terms = [c * v for c, v in zip(coef[is_fixed].tolist(),
+                                       self.values[col[is_fixed]].tolist())]
+        if is_fixed.all():
+            self.objective_constant = sum(terms) + self.objective_constant
+        else:
+            for term in terms:
+                self.objective_constant += term
+        col, coef = col[~is_fixed], coef[~is_fixed]
+        self.objective = np.zeros(len(self.fixed))
+        np.add.at(self.objective, col, coef)
+        self._objective_columns = np.unique(col)
+
+    def presolve(self, tolerance=1e-9):
+        """ Removes fixed columns, trivial rows and singleton columns from
+        the constraint matrix (see :mod:`oemof.solph.presolve`).
+
+        Returns
+        -------
+        :class:`~oemof.solph.presolve.Presolve`
+            The record of the reductions, which recovers the values of all
+            columns from a solution of the reduced problem.
+        """
+        return _presolve.presolve(self, tolerance)
+
+    def _save_layout(self):
+        """ Stores the layout in the cache if it has been changed.
+        """
+        if self.cache is not None:
+            self.cache.save(self.fingerprint, self.layout)
+
+    @property
+    def shape(self):
+        """ Number of rows and columns of the constraint matrix.
+        """
+        return len(self.bound), len(self.fixed)
+
+    def referenced(self):
+        """ Returns a boolean array indicating the columns which appear in the
+        constraint matrix or the objective function.
+        """
+        referenced = np.zeros(len(self.fixed), dtype=bool)
+        referenced[self.column] = True
+        referenced[self._objective_columns] = True
+        return referenced
+
+    def to_csr(self):
+        """ Returns the constraint matrix in compressed sparse row format as
+        `(indptr, indices, data)`.
+        """
+        indptr = np.zeros(len(self.bound) + 1, dtype=int)
+        np.cumsum(np.bincount(self.row, minlength=len(self.bound)),
+                  out=indptr[1:])
+        return indptr, self.column, self.coefficient
+
+    def column_names(self):
+        """ Returns the LP file symbols of all columns.
+        """
+        variables = list(self.variables.values())
+        return lookup(self.layout, 'column_names',
+                      lambda: digest([_structure(v) for v in variables]),
+                      lambda: [n for v in variables for n in v.names()])
+
+    def row_names(self):
+        """ Returns the LP file symbols of all rows (without the prefix
+        indicating the sense).
+        """
+        return [n for c, local in self._row_families
+                for n in c.names(local, self.layout)]
+
+    def write(self, filename, io_options=None, format=None, symbolic=True,
+              labels=None, workers=None):
+        """ Writes the model to a LP or MPS file.
+
+        Parameters
+        ----------
+        filename : str
+            The file is compressed with gzip if the name ends with '.gz'.
+        io_options : dict
+            Ignored, only accepted for compatibility with
+            :meth:`pyomo.core.base.PyomoModel.write`.
+        format : str
+            'lp' or 'mps'. Determined from the file extension (without '.gz')
+            by default.
+        symbolic : boolean
+            If True, the symbols of pyomo's LP writer with
+            `symbolic_solver_labels` are used as names of the rows and
+            columns. Otherwise compact names (`x<column>` and `r<row>`) are
+            used and a label map is written to `labels`.
+        labels : str (optional)
+            File of the label map, which has one line with the compact name
+            and the symbol (separated by a tab) for every column and row.
+            Defaults to `filename` (without '.gz') followed by '.labels'.
+            Only written if `symbolic` is False.
+        workers : int (optional)
+            Number of processes serializing the rows (LP) or columns (MPS)
+            of the matrix. By default (or if processes cannot be forked on
+            the platform) the file is written by the calling process.
+        """
+        compressed = filename.endswith('.gz')
+        base = filename[:-3] if compressed else filename
+        if format is None:
+            format = base.rsplit('.', 1)[-1]
+        if format not in _WRITERS:
+            raise ValueError("Unknown file format: {0}".format(format))
+        names = _Names(self, symbolic)
+        opener = gzip.open if compressed else open
+        with opener(filename, 'wt') as f:
+            _WRITERS[format](self, f, names=names, workers=workers)
+        if not symbolic:
+            if labels is None:
+                labels = base + '.labels'
+            with open(labels, 'w') as f:
+                names.write_labels(f)
+        self._save_layout()
+
+
+# #############################################################################
+#
+# Writers
+#
+# #############################################################################
+
+_PREFIXES = {'E': 'c_e_', 'L': 'c_u_', 'G': 'c_l_'}
+
+
+class _Names:
+    """ The names of the columns and rows of a model in a file.
+
+    With `symbolic` names, the columns and rows are named by their LP file
+    symbols (the rows prefixed by their sense like pyomo does), otherwise by
+    their index.
+    """
+    def __init__(self, model, symbolic=True):
+        self.model = model
+        self.symbolic = symbolic
+        if symbolic:
+            self.columns = model.column_names()
+            self.rows = [_PREFIXES[s] + n + '_' for s, n in
+                         zip(model.sense.tolist(), model.row_names())]
+        else:
+            self.columns = ['x%d' % i for i in range(len(model.fixed))]
+            self.rows = ['r%d' % r for r in range(len(model.bound))]
+
+    def rank(self):
+        """ Returns the position of every column in the order of its name.
+        """
+        if not self.symbolic:
+            return np.arange(len(self.columns))
+        names = self.columns
+
+        def ranks():
+            rank = np.empty(len(names), dtype=int)
+            rank[sorted(range(len(names)), key=names.__getitem__)] = (
+                np.arange(len(names)))
+            return rank
+        return lookup(self.model.layout, 'rank', self._structure, ranks)
+
+    def _structure(self):
+        return digest([_structure(v) for v in self.model.variables.values()])
+
+    def write_labels(self, f):
+        """ Writes the compact name and the symbol of every column and row to
+        the file object `f`.
+        """
+        model = self.model
+        symbolic = _Names(model)
+        for names, symbols in ((self.columns, symbolic.columns),
+                               (self.rows, symbolic.rows)):
+            f.write("".join(["%s\t%s\n" % (n, s)
+                             for n, s in zip(names, symbols)]))
+
+
+def _sorted_rows(model, names):
+    """ Yields the terms of every row sorted by the names of the columns.
+    """
+    rank = names.rank()
+    if names.symbolic:
+        order = lookup(model.layout, 'order',
+                       lambda: digest(names._structure(), model.row,
+                                      model.column),
+                       lambda: np.lexsort((rank[model.column], model.row)))
+        column, coefficient = model.column[order], model.coefficient[order]
+    else:
+        # the terms are sorted by row and column already
+        column, coefficient = model.column, model.coefficient
+    indptr, _, _ = model.to_csr()
+    return rank, indptr, column, coefficient
+
+
+def _chunks(size, chunksize):
+    return [(start, min(start + chunksize, size))
+            for start in range(0, size, chunksize)]
+
+
+# the serializer of the chunks in the worker processes (see _serialize)
+_serializer = None
+
+
+def _set_serializer(serializer):
+    global _serializer
+    _serializer = serializer
+
+
+def _serialize_chunk(chunk):
+    return _serializer(*chunk)
+
+
+def _serialize(serializer, chunks, workers=None):
+    """ Yields `serializer(start, stop)` for all `chunks`, in the order of
+    the chunks.
+
+    The chunks are serialized in `workers` forked processes, which inherit
+    the serializer (and the arrays it refers to) from the calling process,
+    hence only the chunk bounds and the text are passed between processes.
+    """
+    if workers is not None and workers > 1 and len(chunks) > 1:
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            context = None
+        if context is not None:
+            with context.Pool(workers, initializer=_set_serializer,
+                              initargs=(serializer,)) as pool:
+                for text in pool.imap(_serialize_chunk, chunks):
+                    yield text
+            return
+    for start, stop in chunks:
+        yield serializer(start, stop)
+
+
+class _LPRows:
+    """ Serializes the rows `start` to `stop` of a model in LP format.
+    """
+    def __init__(self, model, names):
+        self.columns = names.columns
+        self.rows = names.rows
+        rank, indptr, column, coefficient = _sorted_rows(model, names)
+        self.rank = rank
+        self.indptr = indptr.tolist()
+        self.column = column.tolist()
+        self.coefficient = coefficient.tolist()
+        self.sense = model.sense.tolist()
+        self.bound = model.bound.tolist()
+
+    def __call__(self, start, stop):
+        relations = {'E': '= %.17g\n\n', 'L': '<= %.17g\n\n',
+                     'G': '>= %.17g\n\n'}
+        names, indptr, column, coefficient = (
+            self.columns, self.indptr, self.column, self.coefficient)
+        lines = []
+        for r in range(start, stop):
+            lines.append(self.rows[r] + ':\n')
+            a, b = indptr[r], indptr[r + 1]
+            if a == b:
+                # a row without variables (all of them are fixed)
+                lines.append('+0 ONE_VAR_CONSTANT\n')
+            lines.extend(['%+.17g %s\n' % (c, names[i]) for c, i in
+                          zip(coefficient[a:b], column[a:b])])
+            lines.append(relations[self.sense[r]] %
+                         _no_negative_zero(self.bound[r]))
+        return "".join(lines)
+
+
+def write_lp(model, f, chunksize=10000, names=None, workers=None):
+    """ Writes the model in CPLEX LP format to the file object `f`, in the
+    format of pyomo's LP writer with `symbolic_solver_labels` (unless compact
+    `names` are given).
+
+    The rows are serialized in chunks of `chunksize` rows, by `workers`
+    processes if given (see :meth:`MatrixModel.write`).
+    """
+    if names is None:
+        names = _Names(model)
+    rows = _LPRows(model, names)
+    columns, rank = names.columns, rows.rank
+
+    # the name is kept for compatibility with pyomo's LP files
+    f.write("\\* Source Pyomo model name={0} *\\\n\n".format(model.name))
+    f.write("min \nobjective:\n")
+    objective = model._objective_columns[
+        np.argsort(rank[model._objective_columns])]
+    f.write("".join(['%+.17g %s\n' % (c, columns[i]) for c, i in
+                     zip(model.objective[objective].tolist(),
+                         objective.tolist())]))
+    if model.objective_constant != 0 or not len(objective):
+        f.write('%+.17g ONE_VAR_CONSTANT\n' % model.objective_constant)
+    f.write("\ns.t.\n\n")
+
+    for text in _serialize(rows, _chunks(len(rows.bound), chunksize),
+                           workers):
+        f.write(text)
+
+    f.write("c_e_ONE_VAR_CONSTANT: \nONE_VAR_CONSTANT = 1.0\n\n")
+
+    f.write("bounds\n")
+    referenced = np.flatnonzero(model.referenced()).tolist()
+    lower = model.lower_bounds.tolist()
+    upper = model.upper_bounds.tolist()
+    lines = []
+    for i in referenced:
+        lines.append("   " + ("%.17g <= " % _no_negative_zero(lower[i])
+                              if lower[i] != -np.inf else " -inf <= ") +
+                     columns[i] +
+                     (" <= %.17g\n" % _no_negative_zero(upper[i])
+                      if upper[i] != np.inf else " <= +inf\n"))
+    f.write("".join(lines))
+    integrality = model.integrality.tolist()
+    for domain, section in ((_INTEGER, "general"), (_BINARY, "binary")):
+        selected = [i for i in referenced if integrality[i] == domain]
+        if selected:
+            f.write(section + "\n")
+            f.write("".join("  %s\n" % columns[i] for i in selected))
+    f.write("end\n")
+
+
+class _MPSColumns:
+    """ Serializes the entries of the columns `start` to `stop` of a model
+    in the COLUMNS section of a MPS file.
+    """
+    def __init__(self, model, names):
+        self.columns = names.columns
+        self.rows = names.rows
+        # column major order of the matrix entries
+        order = np.lexsort((model.row, model.column))
+        column = model.column[order]
+        indptr = np.zeros(len(self.columns) + 1, dtype=int)
+        np.cumsum(np.bincount(column, minlength=len(self.columns)),
+                  out=indptr[1:])
+        self.indptr = indptr.tolist()
+        self.row = model.row[order].tolist()
+        self.coefficient = model.coefficient[order].tolist()
+        self.objective = model.objective.tolist()
+        self.integrality = model.integrality.tolist()
+        self.referenced = model.referenced()
+        # the integer marker is kept open across the chunks: it is open at
+        # the start of column i if the last referenced column before i is
+        # not continuous
+        last = np.maximum.accumulate(np.where(
+            self.referenced, np.arange(len(self.columns)), -1))
+        self.open_marker = np.zeros(len(self.columns) + 1, dtype=bool)
+        self.open_marker[1:] = (last >= 0) & (
+            model.integrality[np.maximum(last, 0)] != _CONTINUOUS)
+
+    def __call__(self, start, stop):
+        names, rows, row, coefficient, indptr = (
+            self.columns, self.rows, self.row, self.coefficient, self.indptr)
+        integer = bool(self.open_marker[start])
+        lines = []
+        for i in (np.flatnonzero(self.referenced[start:stop]) +
+                  start).tolist():
+            if (self.integrality[i] != _CONTINUOUS) != integer:
+                integer = not integer
+                lines.append("    MARKER 'MARKER' '{0}'\n".format(
+                    'INTORG' if integer else 'INTEND'))
+            if self.objective[i] != 0:
+                lines.append("    %s objective %.17g\n" % (
+                    names[i], self.objective[i]))
+            lines.extend(["    %s %s %.17g\n" % (names[i], rows[r], c)
+                          for r, c in zip(row[indptr[i]:indptr[i + 1]],
+                                          coefficient[indptr[i]:
+                                                      indptr[i + 1]])])
+        if integer and stop == len(names):
+            lines.append("    MARKER 'MARKER' 'INTEND'\n")
+        return "".join(lines)
+
+
+def write_mps(model, f, chunksize=10000, names=None, workers=None):
+    """ Writes the model in (free) MPS format to the file object `f`.
+
+    Like in the LP files, the constant of the objective function is added as
+    the variable `ONE_VAR_CONSTANT` which is fixed to one. The columns are
+    serialized in chunks of `chunksize` columns, by `workers` processes if
+    given (see :meth:`MatrixModel.write`).
+    """
+    if names is None:
+        names = _Names(model)
+    columns = _MPSColumns(model, names)
+    row_names = names.rows
+
+    f.write("NAME {0}\n".format(model.name))
+    f.write("ROWS\n N  objective\n")
+    f.write("".join(" {0}  {1}\n".format(s, n)
+                    for s, n in zip(model.sense.tolist(), row_names)))
+    f.write(" E  c_e_ONE_VAR_CONSTANT\n")
+
+    f.write("COLUMNS\n")
+    for text in _serialize(columns, _chunks(len(names.columns), chunksize),
+                           workers):
+        f.write(text)
+    f.write("    ONE_VAR_CONSTANT objective %.17g\n" %
+            model.objective_constant)
+    f.write("    ONE_VAR_CONSTANT c_e_ONE_VAR_CONSTANT 1\n")
+
+    f.write("RHS\n")
+    f.write("".join("    RHS %s %.17g\n" % (n, _no_negative_zero(b))
+                    for n, b in zip(row_names, model.bound.tolist())
+                    if b != 0))
+    f.write("    RHS c_e_ONE_VAR_CONSTANT 1\n")
+
+    f.write("BOUNDS\n")
+    names = names.columns
+    integrality = columns.integrality
+    lower = model.lower_bounds.tolist()
+    upper = model.upper_bounds.tolist()
+    lines = []
+    for i in np.flatnonzero(columns.referenced).tolist():
+        if lower[i] == upper[i]:
+            lines.append(" FX BOUND %s %.17g\n" % (names[i], lower[i]))
+            continue
+        if lower[i] == -np.inf and upper[i] == np.inf:
+            lines.append(" FR BOUND %s\n" % names[i])
+            continue
+        if lower[i] == -np.inf:
+            lines.append(" MI BOUND %s\n" % names[i])
+        elif lower[i] != 0:
+            lines.append(" LO BOUND %s %.17g\n" % (names[i], lower[i]))
+        if upper[i] != np.inf:
+            lines.append(" UP BOUND %s %.17g\n" % (names[i], upper[i]))
+        elif integrality[i] != _CONTINUOUS:
+            lines.append(" PL BOUND %s\n" % names[i])
+    f.write("".join(lines))
+    f.write("ENDATA\n")
+
+
+_WRITERS = {'lp': write_lp, 'mps': write_mps}
+
+
+# #############################################################################
+#
+# Builders for the constraint groups
+#
+# #############################################################################
+
+def _balance(model, constraints, capacity, n, inflow, outflow):
+    """ Adds the balance of storage `n` to `constraints` (used by the storage
+    builders).
+    """
+    capacity = capacity.columns((n,))
+    ti = model.array(model.timeincrement)
+    constraints.add((n,), lhs=[
+        (capacity, 1),
+        (capacity[model.previous], -(1 - model.array(n.capacity_loss))),
+        (model.flow.columns((inflow, n)),
+         -model.array(n.inflow_conversion_factor) * ti),
+        (model.flow.columns((n, outflow)),
+         (1 / model.array(n.outflow_conversion_factor)) * ti)])
+
+
+def _storage(model, group):
+    """ Builder for :class:`oemof.solph.blocks.Storage`.
+    """
+    if group is None:
+        return
+    capacity = model.add_variables('Storage.capacity', [(n,) for n in group],
+                                   nonnegative=False)
+    for n in group:
+        capacity.set_bounds((n,),
+                            n.nominal_capacity * model.array(n.capacity_min),
+                            n.nominal_capacity * model.array(n.capacity_max))
+        if n.initial_capacity is not None:
+            last = capacity.local((n,))[-1]
+            capacity.value[last] = n.initial_capacity * n.nominal_capacity
+            capacity.fixed[last] = True
+
+    balance = model.add_constraints('Storage.balance', [(n,) for n in group],
+                                    '==')
+    for n in group:
+        _balance(model, balance, capacity, n, list(n.inputs)[0],
+                 list(n.outputs)[0])
+
+    fixed_costs = 0
+    for n in sorted(group):
+        if n.fixed_costs is not None:
+            fixed_costs += n.nominal_capacity * n.fixed_costs
+    model.objective_constant += fixed_costs
+
+
+def _investment_storage(model, group):
+    """ Builder for :class:`oemof.solph.blocks.InvestmentStorage`.
+    """
+    if group is None:
+        return
+    keys = [(n,) for n in group]
+    capacity = model.add_variables('InvestmentStorage.capacity', keys)
+    invest = model.add_variables('InvestmentStorage.invest', keys,
+                                 timesteps=False)
+    for n in group:
+        invest.set_bounds((n,), 0, n.investment.maximum)
+
+    inputs = {n: list(n.inputs)[0] for n in group}
+    outputs = {n: list(n.outputs)[0] for n in group}
+    investment_flow = model.variables['InvestmentFlow.invest']
+
+    balance = model.add_constraints('InvestmentStorage.balance', keys, '==')
+    initial_capacity = model.add_constraints(
+        'InvestmentStorage.initial_capacity',
+        [(n,) for n in group if n.initial_capacity is not None], '==',
+        timesteps=False)
+    inflow = model.add_constraints('InvestmentStorage.storage_capacity_inflow',
+                                   keys, '==', timesteps=False)
+    outflow = model.add_constraints(
+        'InvestmentStorage.storage_capacity_outflow', keys, '==',
+        timesteps=False)
+    max_capacity = model.add_constraints('InvestmentStorage.max_capacity',
+                                         keys, '<=')
+    min_capacity = model.add_constraints(
+        'InvestmentStorage.min_capacity',
+        [(n,) for n in group if model.array(n.capacity_min).sum() > 0], '>=')
+
+    for n in group:
+        column = invest.column((n,))
+        _balance(model, balance, capacity, n, inputs[n], outputs[n])
+        if n.initial_capacity is not None:
+            initial_capacity.add((n,), lhs=[
+                (capacity.columns((n,))[-1], 1)],
+                rhs=[(column, n.initial_capacity)])
+        inflow.add((n,), lhs=[
+            (investment_flow.column((inputs[n], n)), 1)],
+            rhs=[(column, n.nominal_input_capacity_ratio)])
+        outflow.add((n,), lhs=[
+            (investment_flow.column((n, outputs[n])), 1)],
+            rhs=[(column, n.nominal_output_capacity_ratio)])
+        max_capacity.add((n,), lhs=[(capacity.columns((n,)), 1)],
+                         rhs=[(column, model.array(n.capacity_max))])
+        if (n,) in min_capacity.position:
+            min_capacity.add((n,), lhs=[(capacity.columns((n,)), 1)],
+                             rhs=[(column, model.array(n.capacity_min))])
+
+    for n in sorted(group):
+        if n.investment.ep_costs is None:
+            raise ValueError("Missing value for investment costs!")
+        if n.fixed_costs is not None:
+            model.add_objective(invest.column((n,)), n.fixed_costs)
+        model.add_objective(invest.column((n,)), n.investment.ep_costs)
+
+
+def _flow(model, group):
+    """ Builder for :class:`oemof.solph.blocks.Flow`.
+    """
+    ti = model.array(model.timeincrement)
+    if group is not None:
+        for i, o, f in group:
+            for gradient, variables in (
+                    (f.positive_gradient, model.positive_flow_gradient),
+                    (f.negative_gradient, model.negative_flow_gradient)):
+                if gradient[0] is not None:
+                    variables.set_bounds(
+                        (i, o), ub=model.array(gradient) * f.nominal_value)
+
+        summed_max = model.add_constraints(
+            'Flow.summed_max', [(i, o) for i, o, f in group
+                                if f.summed_max is not None and
+                                f.nominal_value is not None],
+            '<=', timesteps=False)
+        summed_min = model.add_constraints(
+            'Flow.summed_min', [(i, o) for i, o, f in group
+                                if f.summed_min is not None and
+                                f.nominal_value is not None],
+            '>=', timesteps=False)
+        for constraints, attribute in ((summed_max, 'summed_max'),
+                                       (summed_min, 'summed_min')):
+            for i, o in constraints.keys:
+                f = model.flows[i, o]
+                constraints.add((i, o), lhs=[(model.flow.columns((i, o)), ti)],
+                                rhs_constant=(getattr(f, attribute) *
+                                              f.nominal_value))
+
+        # flow(t) - flow(t-1) <= positive_flow_gradient(t) and
+        # flow(t-1) - flow(t) <= negative_flow_gradient(t) for t > 0
+        positions = np.arange(1, len(model.timesteps))
+        previous = [model.position[t - 1] for t in model.timesteps[1:]]
+        for name, variables, sign in (
+                ('Flow.positive_gradient_constr',
+                 model.positive_flow_gradient, 1),
+                ('Flow.negative_gradient_constr',
+                 model.negative_flow_gradient, -1)):
+            gradients = model.add_constraints(name, variables.keys, '<=')
+            for key in variables.keys:
+                flow = model.flow.columns(key)
+                gradients.add(key, positions=positions, lhs=[
+                    (flow[positions], sign), (flow[previous], -sign)],
+                    rhs=[(variables.columns(key)[positions], 1)])
+
+    fixed_costs = 0
+    for (i, o), f in model.flows.items():
+        if f.variable_costs[0] is not None:
+            model.add_objective(model.flow.columns((i, o)),
+                                ti * model.array(f.variable_costs))
+        if f.fixed_costs and f.nominal_value is not None:
+            fixed_costs += f.nominal_value * f.fixed_costs
+    model.objective_constant += fixed_costs
+
+
+def _investment_flow(model, group):
+    """ Builder for :class:`oemof.solph.blocks.InvestmentFlow`.
+    """
+    if group is None:
+        return
+    invest = model.add_variables('InvestmentFlow.invest',
+                                 [(i, o) for i, o, f in group],
+                                 timesteps=False)
+    flows = {(i, o): f for i, o, f in group}
+    for key, f in flows.items():
+        invest.set_bounds(key, f.investment.minimum, f.investment.maximum)
+
+    fixed = model.add_constraints(
+        'InvestmentFlow.fixed', [k for k, f in flows.items() if f.fixed],
+        '==')
+    maximum = model.add_constraints('InvestmentFlow.max', flows, '<=')
+    minimum = model.add_constraints(
+        'InvestmentFlow.min',
+        [k for k, f in flows.items() if model.array(f.min).sum() > 0], '>=')
+    summed_max = model.add_constraints(
+        'InvestmentFlow.summed_max',
+        [k for k, f in flows.items() if f.summed_max is not None], '<=',
+        timesteps=False)
+    summed_min = model.add_constraints(
+        'InvestmentFlow.summed_min',
+        [k for k, f in flows.items() if f.summed_min is not None], '>=',
+        timesteps=False)
+
+    ti = model.array(model.timeincrement)
+    for constraints, attribute in ((fixed, 'actual_value'),
+                                   (maximum, 'max'), (minimum, 'min')):
+        for key in constraints.keys:
+            constraints.add(key, lhs=[(model.flow.columns(key), 1)], rhs=[
+                (invest.column(key),
+                 model.array(getattr(flows[key], attribute)))])
+    for constraints, attribute in ((summed_max, 'summed_max'),
+                                   (summed_min, 'summed_min')):
+        for key in constraints.keys:
+            constraints.add(key, lhs=[(model.flow.columns(key), ti)], rhs=[
+                (invest.column(key), getattr(flows[key], attribute))])
+
+    for key in invest.keys:
+        f = flows[key]
+        if f.fixed_costs is not None:
+            model.add_objective(invest.column(key), f.fixed_costs)
+        if f.investment.ep_costs is None:
+            raise ValueError("Missing value for investment costs!")
+        model.add_objective(invest.column(key), f.investment.ep_costs)
+
+
+def _bus(model, group):
+    """ Builder for :class:`oemof.solph.blocks.Bus`.
+    """
+    if group is None:
+        return
+    balance = model.add_constraints('Bus.balance', [(n,) for n in group],
+                                    '==')
+    for n in group:
+        balance.add((n,),
+                    lhs=[(model.flow.columns((i, n)), 1) for i in n.inputs],
+                    rhs=[(model.flow.columns((n, o)), 1) for o in n.outputs])
+
+
+def _linear_transformer(model, group):
+    """ Builder for :class:`oemof.solph.blocks.LinearTransformer`.
+    """
+    if group is None:
+        return
+    relation = model.add_constraints(
+        'LinearTransformer.relation',
+        [(n, o) for n in group for o in n.outputs], '==')
+    for n in group:
+        i = list(n.inputs)[0]
+        for o in n.outputs:
+            try:
+                conversion_factor = model.array(n.conversion_factors[o])
+            except:
+                raise ValueError("Error in constraint creation",
+                                 "source: {0}, target: {1}".format(
+                                     n.label, o.label))
+            relation.add((n, o),
+                         lhs=[(model.flow.columns((i, n)), conversion_factor)],
+                         rhs=[(model.flow.columns((n, o)), 1)])
+
+
+def _linear_n1_transformer(model, group):
+    """ Builder for :class:`oemof.solph.blocks.LinearN1Transformer`.
+    """
+    if group is None:
+        return
+    relation = model.add_constraints(
+        'LinearN1Transformer.relation',
+        [(n, i) for n in group for i in n.inputs], '==')
+    for n in group:
+        o = list(n.outputs)[0]
+        for i in n.inputs:
+            try:
+                conversion_factor = model.array(n.conversion_factors[i])
+            except:
+                raise ValueError("Error in constraint creation",
+                                 "source: {0}, target: {1}".format(
+                                     i.label, n.label))
+            relation.add((n, i), lhs=[(model.flow.columns((n, o)), 1)],
+                         rhs=[(model.flow.columns((i, n)), conversion_factor)])
+
+
+def _variable_fraction_transformer(model, group):
+    """ Builder for :class:`oemof.solph.blocks.VariableFractionTransformer`.
+    """
+    if group is None:
+        return
+    input_output = model.add_constraints(
+        'VariableFractionTransformer.input_output_relation',
+        [(n,) for n in group], '==')
+    out_flow = model.add_constraints(
+        'VariableFractionTransformer.out_flow_relation',
+        [(n,) for n in group], '>=')
+    for n in group:
+        inflow = list(n.inputs)[0]
+        label_main_flow = str(list(n.conversion_factor_single_flow)[0])
+        main = [o for o in n.outputs if o.label == label_main_flow][0]
+        tapped = [o for o in n.outputs if o.label != label_main_flow][0]
+        single_flow = model.array(n.conversion_factor_single_flow[
+            model.es.groups[main.label]])
+        main_factor = model.array(
+            n.conversion_factors[model.es.groups[main.label]])
+        tapped_factor = model.array(
+            n.conversion_factors[model.es.groups[tapped.label]])
+        flow_relation_index = main_factor / tapped_factor
+        main_flow_loss_index = (single_flow - main_factor) / tapped_factor
+
+        main_flow = model.flow.columns((n, main))
+        tapped_flow = model.flow.columns((n, tapped))
+        input_output.add((n,), lhs=[(model.flow.columns((inflow, n)), 1)],
+                         rhs=[(main_flow, 1 / single_flow),
+                              (tapped_flow,
+                               main_flow_loss_index * (1 / single_flow))])
+        out_flow.add((n,), lhs=[(main_flow, 1)],
+                     rhs=[(tapped_flow, flow_relation_index)])
+
+
+def _binary_flow(model, group):
+    """ Builder for :class:`oemof.solph.blocks.BinaryFlow`.
+    """
+    if group is None:
+        return
+    flows = {(i, o): f for i, o, f in group}
+    status = model.add_variables('BinaryFlow.status', flows, domain=_BINARY)
+    startup = [k for k, f in flows.items()
+               if f.binary.startup_costs is not None]
+    shutdown = [k for k, f in flows.items()
+                if f.binary.shutdown_costs is not None]
+    if startup:
+        startup = model.add_variables('BinaryFlow.startup', startup,
+                                      domain=_BINARY)
+    if shutdown:
+        shutdown = model.add_variables('BinaryFlow.shutdown', shutdown,
+                                       domain=_BINARY)
+
+    min_flows = [k for k, f in flows.items() if model.array(f.min).sum() > 0]
+    minimum = model.add_constraints('BinaryFlow.min', min_flows, '<=')
+    maximum = model.add_constraints('BinaryFlow.max', min_flows, '>=')
+    for key in min_flows:
+        f = flows[key]
+        for constraints, attribute in ((minimum, f.min), (maximum, f.max)):
+            constraints.add(key, lhs=[
+                (status.columns(key),
+                 model.array(attribute) * f.nominal_value)],
+                rhs=[(model.flow.columns(key), 1)])
+
+    # startup(t) >= status(t) - status(t-1) and
+    # shutdown(t) >= status(t-1) - status(t), the status before the first
+    # timestep is the initial status of the flow
+    positions = np.arange(1, len(model.timesteps))
+    previous = [model.position[t - 1] for t in model.timesteps[1:]]
+    for name, variables, sign in (('BinaryFlow.startup_constr', startup, 1),
+                                  ('BinaryFlow.shutdown_constr', shutdown,
+                                   -1)):
+        constraints = model.add_constraints(
+            name, variables.keys if variables else [], '>=')
+        for key in constraints.keys:
+            columns = status.columns(key)
+            initial_status = flows[key].binary.initial_status
+            constraints.add(key, positions=[0],
+                            lhs=[(variables.columns(key)[:1], 1)],
+                            rhs=[(columns[:1], sign)],
+                            rhs_constant=-sign * initial_status)
+            constraints.add(key, positions=positions,
+                            lhs=[(variables.columns(key)[positions], 1)],
+                            rhs=[(columns[positions], sign),
+                                 (columns[previous], -sign)])
+
+    for variables, attribute in ((startup, 'startup_costs'),
+                                 (shutdown, 'shutdown_costs')):
+        for key in (variables.keys if variables else []):
+            model.add_objective(variables.columns(key),
+                                getattr(flows[key].binary, attribute))
+
+
+def _discrete_flow(model, group):
+    """ Builder for :class:`oemof.solph.blocks.DiscreteFlow`.
+    """
+    if group is None:
+        return
+    keys = [(i, o) for i, o, f in group]
+    discrete_flow = model.add_variables('DiscreteFlow.discrete_flow', keys,
+                                        domain=_INTEGER)
+    integer_flow = model.add_constraints('DiscreteFlow.integer_flow', keys,
+                                         '==')
+    for key in keys:
+        integer_flow.add(key, lhs=[(discrete_flow.columns(key), 1)],
+                         rhs=[(model.flow.columns(key), 1)])
+
+
+#: Builders of the constraint groups of the :class:`MatrixModel`, i.e.
+#: functions adding the variables, constraints and objective terms of a group
+#: to the model. Called with the model and the group.
+BUILDERS = {blocks.Bus: _bus,
+            blocks.LinearTransformer: _linear_transformer,
+            blocks.LinearN1Transformer: _linear_n1_transformer,
+            blocks.VariableFractionTransformer:
+                _variable_fraction_transformer,
+            blocks.Storage: _storage,
+            blocks.InvestmentFlow: _investment_flow,
+            blocks.InvestmentStorage: _investment_storage,
+            blocks.Flow: _flow,
+            blocks.BinaryFlow: _binary_flow,
+            blocks.DiscreteFlow: _discrete_flow}
@@ -3,15 +3,113 @@
 
 """
 
-from collections import UserDict, UserList
-from itertools import groupby
+from functools import partial
+import numpy as np
 import pyomo.environ as po
 from pyomo.opt import SolverFactory
 from pyomo.core.plugins.transform.relax_integrality import RelaxIntegrality
 from oemof.solph import blocks
-from .network import Storage
-from .options import Investment
-from .plumbing import sequence
+from .persistent import PersistentSolver
+from .plumbing import linear_expression, sequence, to_array
+from .profiler import BuildProfile
+from .results import ColumnarResults
+from .warmstart import Solution, set_start_values
+
+
+def flow_bounds(flows, timesteps):
+    """ Computes the bounds and pre-optimized values of flow variables.
+
+    The attributes `min`, `max`, `actual_value` and `nominal_value` of all
+    flows are converted to arrays of shape (flows, timesteps), so that all
+    bounds and values are computed with one array operation.
+
+    Parameters
+    ----------
+    flows : list
+        List of :class:`~oemof.solph.network.Flow` objects.
+    timesteps : sequence of int
+        Timesteps to compute the bounds for.
+
+    Returns
+    -------
+    tuple
+        `(values, has_value, lower_bounds, upper_bounds, bounded)` where the
+        first four are arrays of shape (flows, timesteps) and `bounded` is a
+        boolean array indicating the flows whose bounds have to be set.
+    """
+    timesteps = np.array(timesteps)
+    length = timesteps.max() + 1
+
+    nominal_value = np.array(
+        [np.nan if f.nominal_value is None else f.nominal_value
+         for f in flows], dtype=float)[:, np.newaxis]
+    actual_value = np.array(
+        [to_array(f.actual_value, length)[timesteps] for f in flows])
+    maximum = np.array([to_array(f.max, length)[timesteps] for f in flows])
+    minimum = np.array([to_array(f.min, length)[timesteps] for f in flows])
+
+    # pre-optimized values of the flow variable (nan if not set)
+    values = actual_value * nominal_value
+    has_value = ~np.isnan(values)
+    upper_bounds = maximum * nominal_value
+    lower_bounds = minimum * nominal_value
+
+    # bounds are only set for flows with a nominal value which are not
+    # binary, as the binary flow block handles the bounds itself
+    bounded = np.array([f.nominal_value is not None and f.binary is None
+                        for f in flows], dtype=bool)
+
+    return values, has_value, lower_bounds, upper_bounds, bounded
+
+
+def timestep_lengths(timeindex, timesteps=None):
+    """ Returns the length of the timesteps of a time index in hours.
+
+    The length of all timesteps is the frequency of the time index if it has
+    one. Otherwise every timestep lasts until the next one, and the last
+    timestep is as long as the one before it.
+
+    Parameters
+    ----------
+    timeindex : pandas.DatetimeIndex
+    timesteps : sequence of int (optional)
+        The timesteps of the model belonging to the time index. The returned
+        list is indexed by these timesteps. Defaults to the positions in the
+        time index.
+
+    Returns
+    -------
+    float or list
+        The length of all timesteps or a list with the length of every
+        timestep.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> timestep_lengths(pd.date_range('1/1/2012', periods=3, freq='15min'))
+    0.25
+    >>> timeindex = pd.DatetimeIndex(['2012-01-01 00:00', '2012-01-01 01:00',
+    ...                               '2012-01-01 05:00'])
+    >>> timestep_lengths(timeindex)
+    [1.0, 4.0, 4.0]
+    >>> timestep_lengths(timeindex, timesteps=[1, 2])
+    [nan, 4.0, 4.0]
+    """
+    if timeindex.freq is not None:
+        return timeindex.freq.nanos / 3.6e12
+    if len(timeindex) < 2:
+        raise ValueError("The length of the timesteps of a time index with "
+                         "less than two timestamps and without frequency "
+                         "is unknown.")
+    hours = np.diff(timeindex.asi8) / 3.6e12
+    hours = np.append(hours, hours[-1])
+    if timesteps is None:
+        return hours.tolist()
+    timesteps = list(timesteps)
+    lengths = np.full(max(timesteps) + 1, np.nan)
+    lengths[timesteps] = hours[timesteps]
+    return lengths.tolist()
+
 
 # #############################################################################
 #
@@ -54,7 +152,12 @@ class OperationalModel(po.ConcreteModel):
         If type is 'float', will be converted internally to
         solph.plumbing.Sequence() object for time dependent time increment.
         If a list is provided this list will be taken. Default is calculated
-        from timeindex if provided.
+        from timeindex if provided (see :func:`timestep_lengths`), which may
+        have an irregular frequency.
+    profile : boolean
+        If True, statistics of the build of every block are recorded in the
+        :class:`~oemof.solph.profiler.BuildProfile` `build_profile` of the
+        model and logged. Defaults to False.
 
     **The following sets are created:**
 
@@ -107,12 +210,23 @@ class OperationalModel(po.ConcreteModel):
         self.es = es
         self.timeindex = kwargs.get('timeindex', es.timeindex)
         self.timesteps = kwargs.get('timesteps', range(len(self.timeindex)))
-        self.timeincrement = kwargs.get('timeincrement',
-                                        self.timeindex.freq.nanos / 3.6e12)
+        self.timeincrement = kwargs.get('timeincrement')
+        if self.timeincrement is None:
+            self.timeincrement = timestep_lengths(self.timeindex,
+                                                  self.timesteps)
 
         # convert to sequence object for time dependent timeincrement
         self.timeincrement = sequence(self.timeincrement)
 
+        # persistent solver interface, created by the first persistent solve
+        self.persistent = None
+
+        # True if start values were set by warm_start
+        self.warm_started = False
+
+        # statistics of the build (see oemof.solph.profiler.BuildProfile)
+        self.build_profile = BuildProfile() if kwargs.get('profile') else None
+
         if self.timesteps is None:
             raise ValueError("Missing timesteps!")
         self._constraint_groups = (OperationalModel.CONSTRAINT_GROUPS +
@@ -155,32 +269,45 @@ class OperationalModel(po.ConcreteModel):
             ordered=True, dimen=2)
 
         # ######################### FLOW VARIABLE #############################
+        self._build('flow', self._add_flow_variables, block=self)
+
+        # ########################### CONSTRAINTS #############################
+        # loop over all constraint groups to add constraints to the model
+        for group in self._constraint_groups:
+            # create instance for block
+            block = group()
+            # Add block to model
+            self.add_component(str(block), block)
+            # create constraints etc. related with block for all nodes
+            # in the group
+            self._build(str(block), partial(
+                block._create, group=self.es.groups.get(group)), block=block)
+
+        # ########################### Objective ###############################
+        if self.build_profile is None:
+            self.objective_function()
+        else:
+            self.build_profile.measure_objective(self.objective_function)
+            self.build_profile.log()
+
+    def _build(self, name, build, block=None):
+        """ Calls `build` and records its statistics in the build profile if
+        the model is profiled.
+        """
+        if self.build_profile is None:
+            build()
+        else:
+            self.build_profile.measure(name, build, block=block)
 
+    def _add_flow_variables(self):
+        """ Creates the flow variable and the gradient variables.
+        """
         # non-negative pyomo variable for all existing flows in energysystem
         self.flow = po.Var(self.FLOWS, self.TIMESTEPS,
                            within=po.NonNegativeReals)
 
-        # loop over all flows and timesteps to set flow bounds / values
-        for (o, i) in self.FLOWS:
-            for t in self.TIMESTEPS:
-                if self.flows[o, i].actual_value[t] is not None and (
-                        self.flows[o, i].nominal_value is not None):
-                    # pre- optimized value of flow variable
-                    self.flow[o, i, t].value = (
-                        self.flows[o, i].actual_value[t] *
-                        self.flows[o, i].nominal_value)
-                    # fix variable if flow is fixed
-                    if self.flows[o, i].fixed:
-                        self.flow[o, i, t].fix()
-
-                if self.flows[o, i].nominal_value is not None and (
-                        self.flows[o, i].binary is None):
-                    # upper bound of flow variable
-                    self.flow[o, i, t].setub(self.flows[o, i].max[t] *
-                                             self.flows[o, i].nominal_value)
-                    # lower bound of flow variable
-                    self.flow[o, i, t].setlb(self.flows[o, i].min[t] *
-                                             self.flows[o, i].nominal_value)
+        # set flow bounds / values for all flows and timesteps in one batch
+        self._set_flow_bounds()
 
         self.positive_flow_gradient = po.Var(self.POSITIVE_GRADIENT_FLOWS,
                                              self.TIMESTEPS,
@@ -190,32 +317,175 @@ class OperationalModel(po.ConcreteModel):
                                              self.TIMESTEPS,
                                              within=po.NonNegativeReals)
 
-        # ########################### CONSTRAINTS #############################
-        # loop over all constraint groups to add constraints to the model
-        for group in self._constraint_groups:
-            # create instance for block
-            block = group()
-            # Add block to model
-            self.add_component(str(block), block)
-            # create constraints etc. related with block for all nodes
-            # in the group
-            block._create(group=self.es.groups.get(group))
+    def _set_flow_bounds(self):
+        """ Sets the bounds and (fixed) values of the flow variable.
 
-        # ########################### Objective ###############################
-        self.objective_function()
+        The bounds and values of all flows and timesteps are computed by
+        :func:`flow_bounds` in one array operation and written to the
+        variable afterwards, which avoids indexing the sequences of the flows
+        for every single timestep.
+        """
+        flows = [self.flows[o, i] for (o, i) in self.FLOWS]
+        # variables of all flows and timesteps in flow major order
+        self._flow_variables = []
+        if not flows:
+            return
+
+        values, has_value, lower_bounds, upper_bounds, bounded = (
+            flow_bounds(flows, self.timesteps))
+
+        for k, (o, i) in enumerate(self.FLOWS):
+            variables = [self.flow[o, i, t] for t in self.TIMESTEPS]
+            self._flow_variables.extend(variables)
+            if has_value[k].any():
+                fixed = flows[k].fixed
+                for var, value, set_value in zip(
+                        variables, values[k].tolist(), has_value[k]):
+                    if set_value:
+                        var.value = value
+                        if fixed:
+                            var.fix()
+            if bounded[k]:
+                for var, lb, ub in zip(variables,
+                                       lower_bounds[k].tolist(),
+                                       upper_bounds[k].tolist()):
+                    var.setlb(lb)
+                    var.setub(ub)
+
+    def update(self):
+        """ Updates the model after attributes of the flows have been changed,
+        e.g. to solve a sequence of scenarios without building a new model.
+
+        The bounds and fixed values of the flow variable are set again from
+        the attributes `nominal_value`, `min`, `max`, `actual_value` and
+        `fixed` of the flows and the objective function is recreated from
+        their cost attributes (e.g. `variable_costs`). Sets, variables and
+        constraints of the model are reused, hence changes of attributes
+        which are only used in constraints (e.g. conversion factors or the
+        `min` and `max` of binary flows) are not taken into account.
+
+        If the model has been solved with a persistent solver interface (see
+        :meth:`solve`), the changes are pushed to the solver as well.
+
+        Examples
+        --------
+        >>> import pandas as pd
+        >>> from oemof import solph
+        >>> es = solph.EnergySystem(
+        ...     timeindex=pd.date_range('1/1/2012', periods=2, freq='H'))
+        >>> bel = solph.Bus(label='electricity')
+        >>> demand = solph.Sink(label='demand', inputs={bel: solph.Flow(
+        ...     nominal_value=5, actual_value=[1, 0.5], fixed=True)})
+        >>> om = OperationalModel(es)
+        >>> demand.inputs[bel].actual_value = [0.2, 0.4]
+        >>> om.update()
+        >>> [om.flow[bel, demand, t].value for t in om.TIMESTEPS]
+        [1.0, 2.0]
+        """
+        for var in self.flow.values():
+            var.fixed = False
+            var.setlb(None)
+            var.setub(None)
+        self._set_flow_bounds()
+        self.objective_function(update=True)
+        if self.persistent is not None:
+            self.persistent.update()
+
+    def warm_start(self, solution, timeindex=None):
+        """ Sets the values of the variables to a previous solution, which is
+        passed to the solver as start values by :meth:`solve` (if the solver
+        supports warm starts).
+
+        The values are mapped onto the variables by the labels of the nodes
+        and the timestamps of the timesteps (see
+        :mod:`oemof.solph.warmstart`), so the solution may stem from a model
+        of a changed energy system or of an overlapping time index.
 
-    def objective_function(self, sense=po.minimize, update=False):
+        Parameters
+        ----------
+        solution : :class:`~oemof.solph.warmstart.Solution` or dict
+            A solution (e.g. of another model, see
+            :meth:`Solution.from_model()
+            <oemof.solph.warmstart.Solution.from_model>`) or a results
+            dictionary like `es.results` (see
+            :meth:`Solution.from_results()
+            <oemof.solph.warmstart.Solution.from_results>`). Only the flows,
+            storage capacities and invested capacities are contained in a
+            results dictionary, a solution holds all variables (e.g. the
+            status of binary flows).
+        timeindex : pandas.DatetimeIndex (optional)
+            The time index of a results dictionary. Defaults to the time
+            index of the model.
+
+        Returns
+        -------
+        int
+            The number of variables whose value was set.
+
+        Examples
+        --------
+        >>> import pandas as pd
+        >>> from oemof import solph
+        >>> es = solph.EnergySystem(
+        ...     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        >>> bel = solph.Bus(label='electricity')
+        >>> pp = solph.Source(label='pp', outputs={bel: solph.Flow(
+        ...     nominal_value=10, variable_costs=2)})
+        >>> om = OperationalModel(es)
+        >>> om.warm_start({pp: {bel: [1, 2, 3]}}, es.timeindex.shift(1))
+        2
+        >>> [om.flow[pp, bel, t].value for t in om.TIMESTEPS]
+        [None, 1.0, 2.0]
         """
+        if not isinstance(solution, Solution):
+            if timeindex is None:
+                timeindex = self.timeindex
+            solution = Solution.from_results(solution, timeindex)
+        count = set_start_values(self, solution)
+        self.warm_started = True
+        return count
+
+    def objective_function(self, sense=po.minimize, update=False):
+        """ Creates the objective function from the costs of all blocks.
+
+        The variables and coefficients of the costs of all blocks are
+        collected as arrays and the objective function is created as one
+        flat linear expression, terms with a coefficient of zero are skipped.
+
+        Parameters
+        ----------
+        sense : pyomo sense
+            Defaults to :attr:`pyomo.environ.minimize`.
+        update : boolean
+            If True, the existing objective function and the cost expressions
+            of the blocks are replaced.
         """
         if update:
             self.del_component('objective')
-
-        expr = 0
-
-        # Expression for investment flows
-        for block in self.component_data_objects():
-            if hasattr(block, '_objective_expression'):
-                expr += block._objective_expression()
+            for block in list(self.component_data_objects(po.Block)):
+                if hasattr(block, '_objective_expression'):
+                    for expression in list(block.component_objects(
+                            po.Expression, descend_into=False)):
+                        block.del_component(expression)
+
+        # the costs of all blocks are collected as arrays and added as one
+        # flat linear expression
+        variables, coefficients, constant = [], [], 0
+        others = []
+        for block in self.component_data_objects(po.Block):
+            if hasattr(block, '_objective_terms'):
+                v, c, k = blocks.cost_expressions(block,
+                                                  block._objective_terms())
+                variables.extend(v)
+                coefficients.append(c)
+                constant += k
+            elif hasattr(block, '_objective_expression'):
+                others.append(block._objective_expression())
+
+        expr = linear_expression(
+            variables, np.concatenate(coefficients + [np.zeros(0)]), constant)
+        for other in others:
+            expr = expr + other
 
         self.objective = po.Objective(sense=sense, expr=expr)
 
@@ -269,49 +539,21 @@ class OperationalModel(po.ConcreteModel):
 
         Note that the optimization model has to be solved prior to invoking
         this method.
+
+        The dictionary is created on first access from the
+        :class:`~oemof.solph.results.ColumnarResults` of the model, which are
+        available as its attribute `columnar`.
         """
-        # TODO: Make the results dictionary a proper object?
-        result = UserDict()
-        result.objective = self.objective()
-        investment = UserDict()
-        for i, o in self.flows:
-
-            result[i] = result.get(i, UserDict())
-            result[i][o] = UserList([self.flow[i, o, t].value
-                                     for t in self.TIMESTEPS])
-
-            if isinstance(i, Storage):
-                if i.investment is None:
-                    result[i][i] = UserList(
-                        [self.Storage.capacity[i, t].value
-                         for t in self.TIMESTEPS])
-                else:
-                    result[i][i] = UserList(
-                        [self.InvestmentStorage.capacity[i, t].value
-                         for t in self.TIMESTEPS])
-
-            if isinstance(self.flows[i, o].investment, Investment):
-                setattr(result[i][o], 'invest',
-                        self.InvestmentFlow.invest[i, o].value)
-                investment[(i, o)] = self.InvestmentFlow.invest[i, o].value
-                if isinstance(i, Storage):
-                    setattr(result[i][i], 'invest',
-                            self.InvestmentStorage.invest[i].value)
-                    investment[(i, i)] = self.InvestmentStorage.invest[i].value
-        # add results of dual variables for balanced buses
-        if hasattr(self, "dual"):
-            # grouped = [(b1, [(b1, 0), (b1, 1)]), (b2, [(b2, 0), (b2, 1)])]
-            grouped = groupby(sorted(self.Bus.balance.iterkeys()),
-                              lambda pair: pair[0])
-
-            for bus, timesteps in grouped:
-                result[bus] = result.get(bus, UserDict())
-                result[bus][bus] = [self.dual[self.Bus.balance[bus, t]]
-                                    for _, t in timesteps]
-
-        result.investment = investment
-
-        return result
+        return self.columnar_results().to_dict()
+
+    def columnar_results(self):
+        """ Returns the results of this optimization model stored in arrays
+        (see :class:`~oemof.solph.results.ColumnarResults`).
+
+        Note that the optimization model has to be solved prior to invoking
+        this method.
+        """
+        return ColumnarResults(self)
 
     def solve(self, solver='glpk', solver_io='lp', **kwargs):
         r""" Takes care of communication with solver to solve the model.
@@ -322,6 +564,10 @@ class OperationalModel(po.ConcreteModel):
             solver to be used e.g. "glpk","gurobi","cplex"
         solver_io : string
             pyomo solver interface file format: "lp","python","nl", etc.
+            With "persistent" the model is loaded into the persistent
+            interface of the solver on the first call and only the changes
+            made by :meth:`update` are passed to the solver on subsequent
+            calls (see :class:`~oemof.solph.persistent.PersistentSolver`).
         \**kwargs : keyword arguments
             Possible keys can be set see below:
 
@@ -336,18 +582,34 @@ class OperationalModel(po.ConcreteModel):
             {"interior":" "} results in "--interior"
             Gurobi solver takes numeric parameter values such as
             {"method": 2}
+        warmstart : boolean
+            If True, the values of the variables are passed to the solver as
+            start values if it supports warm starts. Defaults to True if
+            start values were set by :meth:`warm_start`.
 
         """
-        solve_kwargs = kwargs.get('solve_kwargs', {})
+        solve_kwargs = dict(kwargs.get('solve_kwargs', {}))
         solver_cmdline_options = kwargs.get("cmdline_options", {})
-
-        opt = SolverFactory(solver, solver_io=solver_io)
-        # set command line options
-        options = opt.options
-        for k in solver_cmdline_options:
-            options[k] = solver_cmdline_options[k]
-
-        results = opt.solve(self, **solve_kwargs)
+        warmstart = kwargs.get('warmstart', self.warm_started)
+
+        if solver_io == 'persistent':
+            if (self.persistent is None or
+                    self.persistent.solver != solver):
+                self.persistent = PersistentSolver(self, solver=solver)
+            if warmstart and _warm_start_capable(self.persistent.opt):
+                solve_kwargs.setdefault('warmstart', True)
+            results = self.persistent.solve(options=solver_cmdline_options,
+                                            **solve_kwargs)
+        else:
+            opt = SolverFactory(solver, solver_io=solver_io)
+            # set command line options
+            options = opt.options
+            for k in solver_cmdline_options:
+                options[k] = solver_cmdline_options[k]
+            if warmstart and _warm_start_capable(opt):
+                solve_kwargs.setdefault('warmstart', True)
+
+            results = opt.solve(self, **solve_kwargs)
 
         self.solutions.load_from(results)
 
@@ -365,3 +627,10 @@ class OperationalModel(po.ConcreteModel):
         relaxer._apply_to(self)
 
         return self
+
+
+def _warm_start_capable(opt):
+    """ Tests if the solver interface `opt` accepts start values.
+    """
+    capable = getattr(opt, 'warm_start_capable', None)
+    return capable is not None and capable()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Solving an OperationalModel repeatedly with a persistent solver interface.
+"""
+
+from pyomo.opt import SolverFactory
+
+
+class PersistentSolver:
+    r""" Keeps an :class:`~oemof.solph.models.OperationalModel` loaded in the
+    persistent (in-process) interface of a solver.
+
+    The model is passed to the solver once. Changed bounds and fixed values
+    of the flows and a changed objective function (see
+    :meth:`OperationalModel.update()
+    <oemof.solph.models.OperationalModel.update>`) are pushed to the loaded
+    model by :meth:`update`, hence neither a file is written nor a new solver
+    process is started for a re-solve.
+
+    Both the persistent interfaces of Pyomo 5.2 (`compile_instance`) and of
+    later versions of Pyomo (`set_instance`) are supported.
+
+    Usually the interface is created by :meth:`OperationalModel.solve()
+    <oemof.solph.models.OperationalModel.solve>` with
+    `solver_io='persistent'`.
+
+    Parameters
+    ----------
+    om : OperationalModel
+        The model to be loaded.
+    solver : string
+        Name of the solver e.g. "cplex" or "gurobi". The solver needs a
+        persistent interface in the installed version of Pyomo.
+    \**kwargs : keyword arguments
+        Passed to the method loading the model into the solver, e.g.
+        `symbolic_solver_labels`.
+    """
+    def __init__(self, om, solver='cplex', **kwargs):
+        self.om = om
+        self.solver = solver
+        self.opt = _persistent_solver_factory(solver)
+        self._load(**kwargs)
+
+    def _load(self, **kwargs):
+        """ Loads the whole model into the solver.
+        """
+        self._kwargs = kwargs
+        if hasattr(self.opt, 'set_instance'):
+            self.opt.set_instance(self.om, **kwargs)
+        else:
+            # fixed variables have to be written as bounds, otherwise they
+            # are compiled out of the constraints and cannot be released
+            kwargs.setdefault('output_fixed_variable_bounds', True)
+            self.opt.compile_instance(self.om, **kwargs)
+
+    def update(self, variables=None, objective=True):
+        """ Pushes the bounds and fixed values of variables and the objective
+        function of the model to the solver.
+
+        Parameters
+        ----------
+        variables : iterable of pyomo variables (optional)
+            The variables to be updated. Defaults to all flow variables.
+        objective : boolean
+            If True, the objective function is updated.
+        """
+        if variables is None:
+            variables = self.om.flow.values()
+        if hasattr(self.opt, 'update_var'):
+            for var in variables:
+                self.opt.update_var(var)
+        else:
+            # the old interface updates the bounds of all variables at once
+            self.opt.compile_variable_bounds(self.om, [])
+        if objective:
+            if hasattr(self.opt, 'set_objective'):
+                self.opt.set_objective(self.om.objective)
+            else:
+                self.opt.compile_objective(self.om)
+
+    def update_constraints(self, constraints):
+        """ Replaces changed constraints of the model in the solver.
+
+        Parameters
+        ----------
+        constraints : iterable of pyomo constraints
+            The changed constraints (e.g. changed by `set_value`).
+
+        The interface of Pyomo 5.2 cannot replace single constraints, hence
+        the whole model is loaded again, which still avoids any file I/O.
+        """
+        if hasattr(self.opt, 'add_constraint'):
+            for constraint in constraints:
+                self.opt.remove_constraint(constraint)
+                self.opt.add_constraint(constraint)
+        else:
+            self._load(**self._kwargs)
+
+    def solve(self, options=None, **kwargs):
+        r""" Solves the loaded model.
+
+        Parameters
+        ----------
+        options : dict (optional)
+            Options of the solver, e.g. {"mipgap": 0.01}.
+        \**kwargs : keyword arguments
+            Passed to the `solve` method of the solver, e.g. `tee`.
+
+        Returns
+        -------
+        The results of the solver. The solution is not loaded into the model.
+        """
+        for k, v in (options or {}).items():
+            self.opt.options[k] = v
+        kwargs['load_solutions'] = False
+        if hasattr(self.opt, 'set_instance'):
+            return self.opt.solve(**kwargs)
+        return self.opt.solve(self.om, **kwargs)
+
+
+def _persistent_solver_factory(solver):
+    """ Returns the persistent interface of `solver`. Raises a ValueError if
+    there is none or the solver is not available.
+    """
+    try:
+        known = set(SolverFactory.services())
+    except (AttributeError, RuntimeError):
+        # Pyomo >= 5.5 registers the solvers in an iterable factory
+        known = set(SolverFactory)
+    for name in ('{0}_persistent', '_{0}_persistent'):
+        name = name.format(solver)
+        if name in known:
+            opt = SolverFactory(name)
+            if opt is not None and opt.available(exception_flag=False):
+                return opt
+            raise ValueError("The persistent interface of solver '{0}' is "
+                             "not available.".format(solver))
+    raise ValueError("There is no persistent interface of solver '{0}' in "
+                     "this version of Pyomo.".format(solver))
@@ -2,7 +2,13 @@
 """
 
 """
-from collections import abc, UserList
+from collections import abc
+import numpy as np
+from pyomo.version import version_info
+try:
+    from pyomo.core.expr.current import LinearExpression
+except ImportError:
+    LinearExpression = None
 
 
 def sequence(sequence_or_scalar):
@@ -36,13 +42,121 @@ def sequence(sequence_or_scalar):
         return _Sequence(default=sequence_or_scalar)
 
 
-class _Sequence(UserList):
+def to_array(sequence, length):
+    """ Returns the first `length` elements of a sequence (as returned by
+    :func:`sequence`) as a float array. Entries which are `None` are
+    converted to `nan`.
+
+    Parameters
+    ----------
+    sequence : array-like or _Sequence
+    length : int
+        Number of elements of the returned array.
+
+    Examples
+    --------
+    >>> to_array(sequence(0.5), 3).tolist()
+    [0.5, 0.5, 0.5]
+
+    >>> to_array(sequence([1, None, 3, 4]), 3).tolist()
+    [1.0, nan, 3.0]
+
+    """
+    if isinstance(sequence, _Sequence):
+        return sequence.to_array(length)
+    array = np.array(sequence[:length], dtype=float)
+    if len(array) < length:
+        raise IndexError("Sequence of length {0} is shorter than the "
+                         "required length {1}.".format(len(array), length))
+    return array
+
+
+def linear_expression(variables, coefficients, constant=0, skip_zeros=True):
+    """ Returns the sum of the `variables` weighted by the `coefficients`
+    plus the `constant` as one flat pyomo expression.
+
+    Unlike adding the terms one by one, no intermediate expression is
+    created, hence this is the way to create long sums like the objective
+    function or many small sums like the rows of a constraint.
+
+    Parameters
+    ----------
+    variables : list of pyomo variables
+    coefficients : array-like
+        Coefficient of every variable.
+    constant : numeric
+    skip_zeros : boolean
+        If True, terms with a coefficient of zero are skipped. Otherwise
+        `variables` and `coefficients` have to be lists, which are used as
+        they are.
+
+    Examples
+    --------
+    >>> from pyomo.environ import ConcreteModel, Var
+    >>> m = ConcreteModel()
+    >>> m.x = Var([0, 1, 2], initialize=2)
+    >>> expr = linear_expression([m.x[0], m.x[1], m.x[2]], [1, 0, 3], 4)
+    >>> expr()
+    12.0
+    >>> linear_expression([m.x[0]], [0], 4)
+    4
+    """
+    if skip_zeros:
+        coefficients = np.asarray(coefficients, dtype=float)
+        nonzero = np.flatnonzero(coefficients)
+        if len(nonzero) < len(coefficients):
+            variables = [variables[k] for k in nonzero.tolist()]
+            coefficients = coefficients[nonzero]
+        coefficients = coefficients.tolist()
+    if not coefficients:
+        return constant
+    if LinearExpression is not None:
+        return LinearExpression(constant=constant, linear_coefs=coefficients,
+                                linear_vars=list(variables))
+    if _coopr3_trees():
+        # Pyomo < 5.5 has no public constructor of a flat linear sum
+        from pyomo.core.base.expr_coopr3 import _SumExpression
+        expr = _SumExpression()
+        expr._args = list(variables)
+        expr._coef = coefficients
+        expr._const = constant
+        return expr
+    return sum(c * v for c, v in zip(coefficients, variables)) + constant
+
+
+def _coopr3_trees():
+    """ Returns True if pyomo builds its expressions as coopr3 trees, whose
+    sums are created by :func:`linear_expression` directly.
+    """
+    if version_info[:2] >= (5, 5):
+        return False
+    from pyomo.core.base import expr_common
+    return expr_common.mode is expr_common.Mode.coopr3_trees
+
+
+def _values(values):
+    """ Returns `values` as an array with a numeric dtype if possible, else
+    with dtype `object` (e.g. if `values` contains `None`).
+    """
+    array = np.array(values)
+    if array.dtype.kind not in 'biuf':
+        array = np.array(values, dtype=object)
+    return array
+
+
+class _Sequence(abc.Sequence):
     """ Emulates a list whose length is not known in advance.
 
+    The values which are set explicitly are stored in an array, all other
+    elements are represented by the scalar `default`. Reading past the end of
+    the sequence extends its length but does not allocate any memory.
+
     Parameters
     ----------
-    source:
+    source: iterable (optional)
+        Initial values of the sequence.
     default:
+        Value of all elements which are not set explicitly.
 
 
     Examples
@@ -57,22 +171,77 @@ class _Sequence(UserList):
     >>> s[0] = 23
     >>> s
     [23, 42, 42]
+    >>> s.to_array(5).tolist()
+    [23.0, 42.0, 42.0, 42.0, 42.0]
 
     """
     def __init__(self, *args, **kwargs):
         self.default = kwargs["default"]
-        super().__init__(*args)
+        source = list(args[0]) if args else []
+        self._values = _values(source if source else [self.default])[
+            :len(source)]
+        self._size = self._length = len(source)
+
+    def __len__(self):
+        return self._length
 
     def __getitem__(self, key):
-        try:
-            return self.data[key]
-        except IndexError:
-            self.data.extend([self.default] * (key - len(self.data) + 1))
-            return self.data[key]
+        if isinstance(key, slice):
+            return self.tolist()[key]
+        if key < 0:
+            key += self._length
+            if key < 0:
+                raise IndexError("_Sequence index out of range")
+        elif key >= self._length:
+            self._length = key + 1
+        if key < self._size:
+            return self._values.item(key)
+        return self.default
 
     def __setitem__(self, key, value):
-        try:
-            self.data[key] = value
-        except IndexError:
-            self.data.extend([self.default] * (key - len(self.data) + 1))
-            self.data[key] = value
+        if key < 0:
+            key += self._length
+            if key < 0:
+                raise IndexError("_Sequence assignment index out of range")
+        if key >= self._size:
+            extension = _values([self.default])
+            self._values = np.concatenate(
+                [self._values, np.full(key + 1 - self._size, self.default,
+                                       dtype=extension.dtype)])
+            self._size = key + 1
+        dtype = np.promote_types(self._values.dtype, _values([value]).dtype)
+        if dtype != self._values.dtype:
+            self._values = self._values.astype(dtype)
+        self._values[key] = value
+        self._length = max(self._length, key + 1)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other):
+        if isinstance(other, _Sequence):
+            other = other.tolist()
+        return self.tolist() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def tolist(self):
+        """ Returns the elements of the sequence (up to its current length)
+        as a list.
+        """
+        return (self._values.tolist() +
+                [self.default] * (self._length - self._size))
+
+    def to_array(self, length):
+        """ Returns the first `length` elements as a float array without
+        changing the length of the sequence. Entries which are `None` are
+        converted to `nan`.
+        """
+        array = np.full(length, np.nan if self.default is None
+                        else self.default, dtype=float)
+        values = self._values[:length]
+        array[:len(values)] = values.astype(float)
+        return array
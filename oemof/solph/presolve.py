@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""Reducing the constraint matrix of a :class:`~oemof.solph.matrix.MatrixModel`
+before it is written to a file.
+
+The presolve works on the arrays of the model and repeats the following
+reductions until none of them applies any more:
+
+* Columns with equal lower and upper bounds (e.g. flows with a
+  `nominal_value` and `min == max`) are fixed. Fixed columns (e.g. flows
+  with `fixed=True`) are substituted as constants into the rows and the
+  objective function.
+* Rows without any column are dropped if they are satisfied (e.g. the
+  balance of a bus whose flows are all fixed) and raise a ValueError
+  otherwise.
+* Continuous columns which appear in one row only and do not have any costs
+  (e.g. the flow into an excess sink) are removed. The row is relaxed to
+  the inequality implied by the bounds of the column or dropped if the
+  column can absorb any value. The presolve is skipped for a column if the
+  row would become a ranged row.
+
+The values of the removed columns are recovered from a solution of the
+reduced problem by :meth:`Presolve.postsolve`.
+"""
+
+import numpy as np
+
+
+class Presolve:
+    """ Record of the reductions of a model by :func:`presolve`.
+
+    Attributes
+    ----------
+    fixed_columns : numpy.array
+        Columns fixed by the presolve (because their bounds are equal).
+    substituted : int
+        Number of matrix entries of fixed columns substituted as constants.
+    removed_rows : int
+        Number of rows dropped.
+    removed_columns : list
+        The singleton columns removed from the matrix in the order of their
+        removal.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.fixed_columns = np.zeros(0, dtype=int)
+        self.substituted = 0
+        self.removed_rows = 0
+        self.removed_columns = []
+        # (column, coefficient, bound, other columns, their coefficients)
+        self._eliminations = []
+
+    def __repr__(self):
+        return ("<Presolve: {0} columns fixed, {1} entries substituted, {2} "
+                "rows and {3} columns removed>").format(
+                    len(self.fixed_columns), self.substituted,
+                    self.removed_rows, len(self.removed_columns))
+
+    def postsolve(self, values):
+        """ Returns the values of all columns of the model given the values
+        of the columns of the reduced problem.
+
+        Parameters
+        ----------
+        values : array
+            Values of all columns. The values of fixed and removed columns
+            are ignored.
+        """
+        model = self.model
+        values = np.array(values, dtype=float)
+        values[model.fixed] = model.values[model.fixed]
+        for column, coefficient, bound, others, factors in reversed(
+                self._eliminations):
+            value = (bound - np.dot(factors, values[others])) / coefficient
+            values[column] = np.clip(value, model.lower_bounds[column],
+                                     model.upper_bounds[column])
+        return values
+
+
+def presolve(model, tolerance=1e-9):
+    """ Reduces the constraint matrix of `model` in place (see
+    :mod:`oemof.solph.presolve`) and returns the :class:`Presolve` record.
+
+    Parameters
+    ----------
+    model : MatrixModel
+    tolerance : float
+        Absolute tolerance for the right hand side of empty rows.
+    """
+    record = Presolve(model)
+    fixed = _fix_columns(model)
+    record.fixed_columns = fixed
+    while True:
+        substituted = _substitute_fixed(model)
+        removed_rows = _drop_empty_rows(model, tolerance)
+        removed_columns = _remove_singleton_columns(model, record)
+        record.substituted += substituted
+        record.removed_rows += removed_rows
+        if not (substituted or removed_rows or removed_columns):
+            break
+    return record
+
+
+def _fix_columns(model):
+    """ Fixes the columns with equal (finite) lower and upper bounds and
+    returns their indices.
+    """
+    fix = (~model.fixed & (model.lower_bounds == model.upper_bounds) &
+           np.isfinite(model.lower_bounds))
+    model.fixed = model.fixed | fix
+    model.values = np.where(fix, model.lower_bounds, model.values)
+    columns = np.flatnonzero(fix)
+    # costs of the fixed columns become part of the constant
+    costs = model.objective[columns]
+    for term in (costs * model.values[columns])[costs != 0].tolist():
+        model.objective_constant += term
+    model.objective[columns] = 0
+    model._objective_columns = model._objective_columns[
+        ~model.fixed[model._objective_columns]]
+    return columns
+
+
+def _keep_entries(model, keep):
+    model.row = model.row[keep]
+    model.column = model.column[keep]
+    model.coefficient = model.coefficient[keep]
+
+
+def _substitute_fixed(model):
+    """ Moves the entries of fixed columns into the right hand side and
+    returns their number.
+    """
+    is_fixed = model.fixed[model.column]
+    if not is_fixed.any():
+        return 0
+    np.subtract.at(model.bound, model.row[is_fixed],
+                   model.coefficient[is_fixed] *
+                   model.values[model.column[is_fixed]])
+    _keep_entries(model, ~is_fixed)
+    return int(is_fixed.sum())
+
+
+def _drop_rows(model, drop):
+    """ Removes the rows marked in the boolean array `drop` including their
+    entries and names.
+    """
+    keep = ~drop
+    renumber = np.cumsum(keep) - 1
+    entries = keep[model.row]
+    model.row = renumber[model.row[entries]]
+    model.column = model.column[entries]
+    model.coefficient = model.coefficient[entries]
+    model.sense = model.sense[keep]
+    model.bound = model.bound[keep]
+    families = []
+    offset = 0
+    for constraints, local in model._row_families:
+        families.append((constraints,
+                         local[keep[offset:offset + len(local)]]))
+        offset += len(local)
+    model._row_families = families
+
+
+def _drop_empty_rows(model, tolerance):
+    """ Drops the rows without entries and returns their number. Raises a
+    ValueError if such a row is not satisfied.
+    """
+    empty = np.bincount(model.row, minlength=len(model.bound)) == 0
+    if not empty.any():
+        return 0
+    bound = model.bound
+    violated = empty & np.where(
+        model.sense == 'E', np.abs(bound) > tolerance,
+        np.where(model.sense == 'L', bound < -tolerance, bound > tolerance))
+    if violated.any():
+        names = model.row_names()
+        raise ValueError("The constraint {0} cannot be satisfied.".format(
+            names[np.flatnonzero(violated)[0]]))
+    _drop_rows(model, empty)
+    return int(empty.sum())
+
+
+def _remove_singleton_columns(model, record):
+    """ Removes the continuous columns without costs which appear in one row
+    only (at most one per row) and returns their number.
+    """
+    count = np.bincount(model.column, minlength=len(model.fixed))
+    entries = np.flatnonzero(
+        (count[model.column] == 1) & (model.objective[model.column] == 0) &
+        (model.integrality[model.column] == 0))
+    # one column per row
+    entries = entries[np.unique(model.row[entries], return_index=True)[1]]
+    if not len(entries):
+        return 0
+
+    indptr, _, _ = model.to_csr()
+    remove = np.zeros(len(model.row), dtype=bool)
+    drop = np.zeros(len(model.bound), dtype=bool)
+    removed = 0
+    for e in entries.tolist():
+        r, c, a = int(model.row[e]), int(model.column[e]), model.coefficient[e]
+        products = (a * model.lower_bounds[c], a * model.upper_bounds[c])
+        low, high = min(products), max(products)
+        sense, bound = model.sense[r], model.bound[r]
+        # the range of the rest of the row implied by the column
+        upper = bound - low if sense in 'EL' else np.inf
+        lower = bound - high if sense in 'EG' else -np.inf
+        if np.isfinite(upper) and np.isfinite(lower):
+            # a ranged row cannot be written
+            continue
+        others = slice(indptr[r], indptr[r + 1])
+        record._eliminations.append((
+            c, a, bound, model.column[others][model.column[others] != c],
+            model.coefficient[others][model.column[others] != c]))
+        record.removed_columns.append(c)
+        remove[e] = True
+        removed += 1
+        if np.isfinite(upper):
+            model.sense[r], model.bound[r] = 'L', upper
+        elif np.isfinite(lower):
+            model.sense[r], model.bound[r] = 'G', lower
+        else:
+            drop[r] = True
+    _keep_entries(model, ~remove)
+    if drop.any():
+        record.removed_rows += int(drop.sum())
+        _drop_rows(model, drop)
+    return removed
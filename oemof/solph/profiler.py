@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""Profiling the build of an OperationalModel.
+"""
+
+import logging
+import sys
+import time
+import pandas as pd
+from pyomo.core import Constraint, Var
+try:
+    from pyomo.core.expr.current import identify_variables
+except ImportError:
+    from pyomo.core.base.expr import identify_variables
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+    """ Returns the peak resident set size of the process in bytes or None
+    if it cannot be determined on this platform.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # the peak rss is given in kilobytes except on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class BlockProfile:
+    """ Statistics of the build of one part of a model.
+
+    Attributes
+    ----------
+    name : str
+        Name of the block, e.g. 'Bus'.
+    time : float
+        Wall time of the build in seconds.
+    rss : int or None
+        Increase of the peak resident set size of the process during the build
+        in bytes.
+    variables : int
+        Number of variables created.
+    constraints : int
+        Number of constraints created.
+    nonzeros : int
+        Number of coefficients of (not fixed) variables in the constraints.
+    components : list
+        Tuples of the name and the wall time of the construction of every
+        component (e.g. `Constraint` or `BuildAction`) of the block.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.time = 0
+        self.rss = None
+        self.variables = 0
+        self.constraints = 0
+        self.nonzeros = 0
+        self.components = []
+
+    def __repr__(self):
+        return ("<BlockProfile {0}: {1:.3f}s, {2} variables, {3} constraints,"
+                " {4} nonzeros>").format(self.name, self.time, self.variables,
+                                         self.constraints, self.nonzeros)
+
+
+class BuildProfile:
+    r""" Records statistics of the build of an
+    :class:`~oemof.solph.models.OperationalModel`.
+
+    A profile is recorded if the model is created with `profile=True` and is
+    available as attribute `build_profile` of the model.
+
+    Attributes
+    ----------
+    blocks : list
+        The :class:`BlockProfile` of the flow variable ('flow') and of every
+        block in the order of the build.
+    objective_time : float
+        Wall time of :meth:`OperationalModel.objective_function()
+        <oemof.solph.models.OperationalModel.objective_function>` in seconds.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof import solph
+    >>> es = solph.EnergySystem(
+    ...     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+    >>> bel = solph.Bus(label='electricity')
+    >>> pp = solph.Source(label='pp', outputs={
+    ...     bel: solph.Flow(nominal_value=10, variable_costs=2)})
+    >>> demand = solph.Sink(label='demand', inputs={bel: solph.Flow(
+    ...     nominal_value=5, actual_value=[1, 0.5, 0.2], fixed=True)})
+    >>> om = solph.OperationalModel(es, profile=True)
+    >>> om.build_profile['Bus']  # doctest: +ELLIPSIS
+    <BlockProfile Bus: ...s, 0 variables, 3 constraints, 3 nonzeros>
+    >>> om.build_profile.table().loc[['flow', 'Bus', 'Flow'],
+    ...                              'variables'].tolist()
+    [6, 0, 0]
+    """
+    def __init__(self):
+        self.blocks = []
+        self.objective_time = 0
+
+    def __getitem__(self, name):
+        for block in self.blocks:
+            if block.name == name:
+                return block
+        raise KeyError(name)
+
+    def measure(self, name, build, block=None):
+        """ Calls `build` and records its statistics as :class:`BlockProfile`
+        `name`.
+
+        The variables and constraints are counted in the pyomo `block` if
+        given. The construction of every component added to `block` during
+        the build is timed.
+        """
+        profile = BlockProfile(name)
+        if block is not None:
+            add_component = block.__dict__.get('add_component')
+        rss = peak_rss()
+        start = time.perf_counter()
+        try:
+            if block is not None:
+                _time_components(block, profile)
+            build()
+        finally:
+            if block is not None:
+                _restore_add_component(block, add_component)
+        profile.time = time.perf_counter() - start
+        if rss is not None:
+            profile.rss = peak_rss() - rss
+        if block is not None:
+            _count(block, profile)
+        self.blocks.append(profile)
+        return profile
+
+    def measure_objective(self, build):
+        """ Calls `build` and records its wall time as the time spent in the
+        objective function.
+        """
+        start = time.perf_counter()
+        build()
+        self.objective_time = time.perf_counter() - start
+
+    def table(self):
+        """ Returns the statistics of all blocks as pandas.DataFrame with one
+        row per block.
+        """
+        columns = ['time', 'rss', 'variables', 'constraints', 'nonzeros']
+        return pd.DataFrame(
+            [[getattr(b, c) for c in columns] for b in self.blocks],
+            index=pd.Index([b.name for b in self.blocks], name='block'),
+            columns=columns)
+
+    def log(self, level=logging.INFO):
+        """ Logs a summary of the profile.
+        """
+        logging.log(level, "Model build profile:")
+        for b in self.blocks:
+            logging.log(level, "  %-28s %8.3fs %10s rss %8d variables "
+                        "%8d constraints %10d nonzeros", b.name, b.time,
+                        _format_bytes(b.rss), b.variables, b.constraints,
+                        b.nonzeros)
+            for name, seconds in b.components:
+                logging.log(level, "    %-26s %8.3fs", name, seconds)
+        logging.log(level, "  %-28s %8.3fs", 'objective_function',
+                    self.objective_time)
+
+
+def _time_components(block, profile):
+    """ Times the construction of every component added to `block`.
+    """
+    add_component = block.add_component
+
+    def timed_add_component(name, value):
+        start = time.perf_counter()
+        add_component(name, value)
+        profile.components.append((name, time.perf_counter() - start))
+
+    # assignments to the block (`block.x = Constraint(...)`) use the
+    # instance attribute as well
+    block.add_component = timed_add_component
+
+
+def _restore_add_component(block, add_component):
+    """ Restores the instance attribute `add_component` of `block` (None if
+    the block had none) replaced by :func:`_time_components`.
+    """
+    if add_component is None:
+        block.__dict__.pop('add_component', None)
+    else:
+        block.__dict__['add_component'] = add_component
+
+
+def _count(block, profile):
+    """ Counts the variables, constraints and nonzeros of `block`.
+    """
+    profile.variables = sum(1 for v in block.component_data_objects(Var))
+    for c in block.component_data_objects(Constraint):
+        profile.constraints += 1
+        profile.nonzeros += sum(1 for v in identify_variables(
+            c.body, include_fixed=False))
+
+
+def _format_bytes(value):
+    if value is None:
+        return 'n/a'
+    return '{0:.1f}MB'.format(value / 2 ** 20)
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""Reducing the topology of an energy system before the model is built.
+"""
+
+import copy
+import numpy as np
+import oemof.energy_system as oes
+import oemof.network as on
+from oemof.groupings import DEFAULT as BY_UID
+from .models import OperationalModel
+from .network import Bus, LinearTransformer, Sink, Source
+from .plumbing import _Sequence, sequence, to_array
+
+
+class NetworkReduction:
+    r""" Builds and solves an :class:`~oemof.solph.models.OperationalModel`
+    of a reduced copy of an energy system.
+
+    Two reductions are applied, neither of them changes the optimal
+    dispatch:
+
+    * Parallel sources (sinks) with one output (input) flow into (from) the
+      same bus whose flows only differ in their `nominal_value` are merged
+      into one node with the summed `nominal_value`. Fixed flows may differ
+      in their `actual_value` as well, the `actual_value` of the merged flow
+      is the average weighted by the nominal values. Flows with an
+      investment, binary or discrete flows are not merged.
+    * Chains of linear transformers with one input and one output and a
+      scalar conversion factor, which are connected by a bus without other
+      flows, are collapsed into one transformer converting the input of the
+      first transformer into the output of the last one with the product of
+      the conversion factors. The flows into and out of the buses within
+      the chain must not be restricted in any way (no nominal value, costs
+      or other limits).
+
+    The reduced energy system holds copies of the remaining nodes with the
+    same labels, the original energy system is not changed. The results are
+    disaggregated onto the flows of the original energy system (see
+    :meth:`results`).
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Object that holds the nodes of an oemof energy system graph
+    merge : boolean
+        Merge parallel sources and sinks. Defaults to True.
+    chains : boolean
+        Collapse chains of linear transformers. Defaults to True.
+    \**kwargs : keyword arguments
+        Passed to the :class:`~oemof.solph.models.OperationalModel`, e.g.
+        `constraint_groups` or `timeincrement`.
+
+    Attributes
+    ----------
+    reduced : EnergySystem
+        The reduced energy system.
+    nodes : dict
+        The node of the reduced energy system of every original node which is
+        copied, merged or the first transformer of a chain.
+    flows : dict
+        Maps every flow `(source, target)` of the original energy system to
+        the flow of the reduced energy system it is derived from and the
+        factor (an array with a value per timestep) of its value.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof import solph
+    >>> es = solph.EnergySystem(
+    ...     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+    >>> bel = solph.Bus(label='electricity')
+    >>> pv = [solph.Source(label='pv_{0}'.format(k), outputs={
+    ...     bel: solph.Flow(nominal_value=k, max=[0.5, 1, 0.2])})
+    ...     for k in (2, 6)]
+    >>> nr = NetworkReduction(es)
+    >>> len(nr.reduced.nodes), nr.nodes[pv[0]] is nr.nodes[pv[1]]
+    (2, True)
+    >>> nr.nodes[pv[0]].outputs[nr.nodes[bel]].nominal_value
+    8
+    >>> nr.flows[pv[1], bel][1].tolist()
+    [0.75, 0.75, 0.75]
+    """
+    def __init__(self, es, merge=True, chains=True, **kwargs):
+        self.es = es
+        self.model_kwargs = kwargs
+        self.length = len(es.timeindex)
+        self.nodes = {}
+        self.flows = {}
+        self._original = {}
+
+        groups = self._parallel_groups() if merge else []
+        chains = self._chains() if chains else []
+
+        registries = on.Node.registry, on.Entity.registry
+        try:
+            self.reduced = oes.EnergySystem(
+                groupings=[g for g in es._groupings if g is not BY_UID],
+                timeindex=es.timeindex)
+            self._build(groups, chains)
+        finally:
+            on.Node.registry, on.Entity.registry = registries
+
+    def _parallel_groups(self):
+        """ Returns the lists of (at least two) parallel sources or sinks
+        which can be merged.
+        """
+        groups = {}
+        for n in self.es.nodes:
+            key = self._parallel_key(n)
+            if key is not None:
+                groups.setdefault(key, []).append(n)
+        return [g for g in groups.values() if len(g) > 1]
+
+    def _parallel_key(self, n):
+        """ Returns the key of the group of parallel nodes of `n` or None if
+        `n` cannot be merged.
+        """
+        if type(n) is Source and not n.inputs and len(n.outputs) == 1:
+            bus, f = next(iter(n.outputs.items()))
+        elif type(n) is Sink and not n.outputs and len(n.inputs) == 1:
+            bus, f = next(iter(n.inputs.items()))
+        else:
+            return None
+        if f.investment or f.binary or f.discrete:
+            return None
+        if f.nominal_value is None and f.fixed:
+            return None
+        ignored = {'nominal_value'} | ({'actual_value'} if f.fixed else set())
+        attributes = []
+        for name, value in sorted(vars(f).items()):
+            if name in ignored:
+                continue
+            if isinstance(value, (_Sequence, list, tuple, np.ndarray)):
+                value = to_array(value, self.length).tobytes()
+            try:
+                hash(value)
+            except TypeError:
+                return None
+            attributes.append((name, value))
+        return (type(n), id(bus), f.nominal_value is None, tuple(attributes))
+
+    def _chains(self):
+        """ Returns the lists of (at least two) linear transformers forming a
+        chain which can be collapsed, in the order of the chain.
+        """
+        successor = {}
+        for n in self.es.nodes:
+            if not self._chain_link(n):
+                continue
+            (bus, f), = n.outputs.items()
+            if (type(bus) is not Bus or not bus.balanced or
+                    len(bus.inputs) != 1 or len(bus.outputs) != 1):
+                continue
+            (following, g), = bus.outputs.items()
+            if (following is not n and self._chain_link(following) and
+                    _unrestricted(f, self.length) and
+                    _unrestricted(g, self.length)):
+                successor[n] = following
+        predecessors = set(successor.values())
+        chains = []
+        for head in successor:
+            if head in predecessors:
+                continue
+            chain = [head]
+            while chain[-1] in successor:
+                chain.append(successor[chain[-1]])
+            chains.append(chain)
+        return chains
+
+    def _chain_link(self, n):
+        """ Tests if `n` is a linear transformer with one input, one output
+        and a positive scalar conversion factor.
+        """
+        if (type(n) is not LinearTransformer or len(n.inputs) != 1 or
+                len(n.outputs) != 1):
+            return False
+        factor = n.conversion_factors.get(next(iter(n.outputs)))
+        return (isinstance(factor, _Sequence) and factor._size == 0 and
+                factor.default is not None and factor.default > 0)
+
+    def _clone(self, n, label=None):
+        """ Returns a copy of the node `n` in the reduced energy system
+        without flows. Dictionaries keyed by nodes (e.g. the
+        `conversion_factors`) are keyed by the copies of the nodes.
+        """
+        clone = object.__new__(type(n))
+        clone.__setstate__(((), {'label': n.label if label is None
+                                 else label}))
+        for name, value in vars(n).items():
+            if isinstance(value, dict):
+                value = {self.nodes.get(k, k) if isinstance(k, on.Node)
+                         else k: v for k, v in value.items()}
+            setattr(clone, name, value)
+        self.reduced.add(clone)
+        self._original[clone] = n
+        return clone
+
+    def _connect(self, source, target, f, flows=(), factors=()):
+        """ Adds the flow `f` from `source` to `target` to the reduced energy
+        system and maps the original `flows` onto it.
+        """
+        on.flow[source, target] = f
+        for key, factor in zip(flows, factors):
+            self.flows[key] = ((source, target),
+                               np.broadcast_to(factor, self.length))
+
+    def _build(self, groups, chains):
+        """ Creates the nodes and flows of the reduced energy system.
+        """
+        merged = {n: g for g in groups for n in g}
+        heads = {c[0]: c for c in chains}
+        intermediate = {next(iter(n.outputs)) for c in chains for n in c[:-1]}
+        # the buses and transformers replaced by the first transformer
+        intermediate.update(n for c in chains for n in c[1:])
+
+        # buses first, as they are the keys of the attributes of components
+        for n in self.es.nodes:
+            if isinstance(n, on.Bus) and n not in intermediate:
+                self.nodes[n] = self._clone(n)
+        for n in self.es.nodes:
+            if n in self.nodes or n in intermediate:
+                continue
+            if n in merged:
+                self._merge(merged[n])
+            elif n in heads:
+                self._collapse(heads[n])
+            else:
+                self.nodes[n] = self._clone(n)
+
+        for (i, o), f in self.es.flows().items():
+            if (i, o) not in self.flows and i in self.nodes and (
+                    o in self.nodes):
+                self._connect(self.nodes[i], self.nodes[o], f, [(i, o)], [1])
+        for n in self.reduced.nodes:
+            n._state = ((), {'label': n.label,
+                             'inputs': dict(n.inputs.items()),
+                             'outputs': dict(n.outputs.items())})
+
+    def _merge(self, group):
+        """ Merges the parallel sources or sinks of `group` into one node.
+        """
+        first = group[0]
+        source = type(first) is Source
+        keys = [(n, next(iter(n.outputs))) if source else
+                (next(iter(n.inputs)), n) for n in group]
+        flows = [i.outputs[o] for i, o in keys]
+        f = copy.copy(flows[0])
+        bus = self.nodes[keys[0][1] if source else keys[0][0]]
+        clone = self._clone(first, label='{0}_aggregated'.format(first.label))
+        for n in group:
+            self.nodes[n] = clone
+
+        if f.nominal_value is None:
+            # the flow of the merged node is assigned to the first node
+            shares = [1] + [0] * (len(group) - 1)
+        else:
+            f.nominal_value = sum(g.nominal_value for g in flows)
+            nominal = np.array([g.nominal_value for g in flows], dtype=float)
+            shares = nominal[:, np.newaxis] / nominal.sum() * np.ones(
+                self.length)
+            if f.fixed:
+                values = nominal[:, np.newaxis] * np.array(
+                    [to_array(g.actual_value, self.length) for g in flows])
+                total = values.sum(axis=0)
+                f.actual_value = sequence((total / nominal.sum()).tolist())
+                shares = np.where(total != 0,
+                                  values / np.where(total != 0, total, 1),
+                                  shares)
+        if source:
+            self._connect(clone, bus, f, keys, shares)
+        else:
+            self._connect(bus, clone, f, keys, shares)
+
+    def _collapse(self, chain):
+        """ Collapses the chain of linear transformers into one transformer,
+        which is a copy of the first one.
+        """
+        head, tail = chain[0], chain[-1]
+        (source, inflow), = head.inputs.items()
+        (target, outflow), = tail.outputs.items()
+        clone = self._clone(head)
+        self.nodes[head] = clone
+        factor = 1.0
+        keys, factors = [(source, head)], [1.0]
+        for n in chain[:-1]:
+            bus = next(iter(n.outputs))
+            factor *= n.conversion_factors[bus].default
+            keys += [(n, bus), (bus, next(iter(bus.outputs)))]
+            factors += [factor, factor]
+        factor *= tail.conversion_factors[target].default
+        self._connect(self.nodes[source], clone, inflow, keys, factors)
+        self._connect(clone, self.nodes[target], outflow, [(tail, target)],
+                      [1])
+        clone.conversion_factors = {self.nodes[target]: sequence(factor)}
+
+    def model(self):
+        """ Returns the :class:`~oemof.solph.models.OperationalModel` of the
+        reduced energy system.
+        """
+        return OperationalModel(self.reduced, **self.model_kwargs)
+
+    def results(self, om):
+        """ Returns the results of the solved model `om` (see :meth:`model`)
+        for the nodes of the original energy system as nested dictionary like
+        :meth:`OperationalModel.results()
+        <oemof.solph.models.OperationalModel.results>`.
+
+        The value of every original flow is the value of the flow it is
+        derived from (see :attr:`flows`) times its factor. The duals of the
+        buses within collapsed chains are not available.
+        """
+        columnar = om.columnar_results()
+        keys = list(self.flows)
+        original = self._original
+        columnar.flow = np.array(
+            [columnar[self.flows[k][0]] *
+             self.flows[k][1][columnar.timesteps] for k in keys]).reshape(
+                 len(keys), len(columnar.timesteps))
+        investment = {}
+        for k in keys:
+            reduced = self.flows[k][0]
+            if reduced in columnar.investment:
+                investment[k] = columnar.investment[reduced]
+        for n in columnar.storages:
+            if (n, n) in columnar.investment:
+                investment[(original[n], original[n])] = (
+                    columnar.investment[(n, n)])
+        columnar.investment = investment
+        columnar.flows = keys
+        columnar.position = {k: p for p, k in enumerate(keys)}
+        columnar.storages = [original[n] for n in columnar.storages]
+        columnar.buses = [original[n] for n in columnar.buses]
+        return columnar.to_dict()
+
+    def solve(self, solver='glpk', solver_io='lp', **kwargs):
+        r""" Creates and solves the model of the reduced energy system and
+        stores the disaggregated results in :attr:`es.results`.
+
+        Parameters
+        ----------
+        solver : string
+            solver to be used e.g. "glpk","gurobi","cplex"
+        solver_io : string
+            pyomo solver interface file format: "lp","python","nl", etc.
+        \**kwargs : keyword arguments
+            Passed to :meth:`OperationalModel.solve()
+            <oemof.solph.models.OperationalModel.solve>`.
+
+        Returns
+        -------
+        The results of the solver.
+        """
+        om = self.model()
+        results = om.solve(solver=solver, solver_io=solver_io, **kwargs)
+        self.es.results = self.results(om)
+        self.es.results.solver = results
+        return results
+
+
+def _unrestricted(f, length):
+    """ Tests if the flow `f` has no nominal value, costs or limits besides
+    being positive.
+    """
+    def empty(value, default):
+        values = to_array(value, length)
+        return bool(np.all(np.isnan(values) | (values == default)))
+
+    return (f.nominal_value is None and not f.fixed and
+            f.investment is None and f.binary is None and
+            f.discrete is None and f.fixed_costs is None and
+            f.summed_max is None and f.summed_min is None and
+            empty(f.min, 0) and empty(f.max, 1) and
+            empty(f.variable_costs, 0) and
+            empty(f.positive_gradient, np.nan) and
+            empty(f.negative_gradient, np.nan))
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Results of a solved model stored in arrays.
+"""
+
+from collections import UserDict, UserList
+import numpy as np
+from .network import Storage
+from .options import Investment
+
+
+def _values(variables):
+    """ Returns the values of a list of variables as float array. Missing
+    values (`None`) are converted to `nan`.
+    """
+    return np.array([v.value for v in variables], dtype=float)
+
+
+class ColumnarResults:
+    """ Results of a solved :class:`~oemof.solph.models.OperationalModel`
+    stored in arrays.
+
+    The values of all flows are stored in one array with a row per flow and a
+    column per timestep, the capacities of all storages and the duals of all
+    buses (if received) likewise. The nested dictionary returned by
+    :meth:`OperationalModel.results()
+    <oemof.solph.models.OperationalModel.results>` is created from these
+    arrays by :meth:`to_dict`.
+
+    Parameters
+    ----------
+    om : OperationalModel
+        A solved model.
+
+    Attributes
+    ----------
+    flows : list
+        The `(source, target)` tuples of all flows in the order of the rows of
+        :attr:`flow`.
+    timesteps : list
+        The timesteps of the model in the order of the columns of the arrays.
+    flow : numpy.array
+        The values of the flows of shape `(len(flows), len(timesteps))`.
+    storages : list
+        All storages in the order of the rows of :attr:`capacity`.
+    capacity : numpy.array
+        The capacities of the storages.
+    buses : list
+        All balanced buses in the order of the rows of :attr:`duals`.
+    duals : numpy.array or None
+        The duals of the bus balances or None if the model did not receive
+        duals (see :meth:`~oemof.solph.models.OperationalModel.receive_duals`).
+        The balances are not multiplied by the `timeincrement`, hence their
+        duals are divided by it to keep the scale of balances weighted by the
+        length of the timesteps.
+    investment : dict
+        The invested capacities by `(source, target)` for flows and by
+        `(storage, storage)` for storages.
+    objective : float
+        The value of the objective function.
+    """
+    def __init__(self, om):
+        self.flows = list(om.FLOWS)
+        self.timesteps = list(om.TIMESTEPS)
+        self.position = {k: p for p, k in enumerate(self.flows)}
+
+        # read the values of all flow variables at once (flow major)
+        self.flow = _values(om._flow_variables).reshape(
+            len(self.flows), len(self.timesteps))
+
+        self.storages = []
+        capacities = []
+        for block, storages in (('Storage', 'STORAGES'),
+                                ('InvestmentStorage', 'INVESTSTORAGES')):
+            block = getattr(om, block, None)
+            for n in getattr(block, storages, []):
+                self.storages.append(n)
+                capacities.append(_values(
+                    [block.capacity[n, t] for t in self.timesteps]))
+        self.capacity = np.array(capacities).reshape(
+            len(self.storages), len(self.timesteps))
+
+        self.investment = {}
+        for i, o in self.flows:
+            if isinstance(om.flows[i, o].investment, Investment):
+                self.investment[(i, o)] = om.InvestmentFlow.invest[i, o].value
+                if isinstance(i, Storage):
+                    self.investment[(i, i)] = (
+                        om.InvestmentStorage.invest[i].value)
+
+        self.buses = []
+        self.duals = None
+        if hasattr(om, 'dual') and hasattr(om.Bus, 'balance'):
+            keys = list(om.Bus.balance.iterkeys())
+            self.buses = sorted({b for b, t in keys})
+            row = {b: k for k, b in enumerate(self.buses)}
+            column = {t: k for k, t in enumerate(self.timesteps)}
+            self.duals = np.full((len(self.buses), len(self.timesteps)),
+                                 np.nan)
+            for b, t in keys:
+                self.duals[row[b], column[t]] = (
+                    om.dual[om.Bus.balance[b, t]] / om.timeincrement[t])
+
+        self.objective = om.objective()
+
+    def __getitem__(self, key):
+        """ Returns the values of the flow `key = (source, target)`.
+        """
+        return self.flow[self.position[key]]
+
+    def to_dict(self):
+        """ Returns the results as nested dictionary like
+        :meth:`OperationalModel.results()
+        <oemof.solph.models.OperationalModel.results>`. The dictionary is
+        created on first access.
+        """
+        return _ResultsDict(self)
+
+    def _nested(self):
+        """ Creates the nested dictionary of :meth:`to_dict`.
+        """
+        def values(array):
+            # missing values are represented by None in the dictionary
+            if np.isnan(array).any():
+                return UserList([None if np.isnan(v) else v
+                                 for v in array.tolist()])
+            return UserList(array.tolist())
+
+        capacity = dict(zip(self.storages, self.capacity))
+        result = {}
+        for k, (i, o) in enumerate(self.flows):
+            result[i] = result.get(i, UserDict())
+            result[i][o] = values(self.flow[k])
+            if i in capacity:
+                result[i][i] = values(capacity[i])
+            if (i, o) in self.investment:
+                result[i][o].invest = self.investment[(i, o)]
+                if (i, i) in self.investment:
+                    result[i][i].invest = self.investment[(i, i)]
+        for b, duals in zip(self.buses, self.duals if self.buses else []):
+            result[b] = result.get(b, UserDict())
+            result[b][b] = duals.tolist()
+        return result
+
+
+class _ResultsDict(UserDict):
+    """ The nested results dictionary of :class:`ColumnarResults`, which is
+    created on first access.
+    """
+    def __init__(self, results):
+        self.columnar = results
+        self._data = None
+        self.objective = results.objective
+        self.investment = UserDict(results.investment)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.columnar._nested()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Solving the dispatch of an energy system with a rolling horizon, i.e. as a
+sequence of overlapping :class:`~oemof.solph.models.OperationalModel`
+windows.
+"""
+
+from collections import UserDict, UserList
+from oemof.solph import blocks
+from .models import OperationalModel, timestep_lengths
+from .network import Storage
+from .options import Investment
+
+
+class RollingHorizon:
+    r""" Solves the dispatch of an energy system for the time index of the
+    energy system as a sequence of overlapping windows.
+
+    An :class:`~oemof.solph.models.OperationalModel` is created and solved for
+    every window of `window` timesteps. The results of the first
+    `window - overlap` timesteps of a window are kept, the remaining
+    timesteps are only used to look ahead and are optimized again in the
+    next window (which starts at the first timestep which is not kept). Hence
+    the size of a model only depends on the length of a window and not on
+    the length of the whole time horizon.
+
+    The states at the end of the kept timesteps are used as initial
+    conditions of the next window:
+
+    * The capacity of a :class:`~oemof.solph.network.Storage` is the
+      capacity before the first timestep of the next window. The
+      `initial_capacity` of a storage is used as capacity before the first
+      window and, like in a single model, as capacity at the end of the last
+      window. Storages without `initial_capacity` are balanced cyclically in
+      the first window.
+    * The status of a :class:`~oemof.solph.options.BinaryFlow` is used as
+      `initial_status` of the next window.
+
+    Gradient constraints of flows are not applied to the first timestep of a
+    window. Investments and the attributes `summed_max` and `summed_min` of
+    flows cannot be used, as they refer to the whole time horizon.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Object that holds the nodes of an oemof energy system graph
+    window : int
+        Number of timesteps of a window.
+    overlap : int
+        Number of timesteps at the end of a window which are optimized again
+        in the next window. Defaults to 0.
+    \**kwargs : keyword arguments
+        Passed to the :class:`~oemof.solph.models.OperationalModel` of every
+        window, e.g. `constraint_groups` or `timeincrement`.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof import solph
+    >>> es = solph.EnergySystem(
+    ...     timeindex=pd.date_range('1/1/2012', periods=10, freq='H'))
+    >>> rh = RollingHorizon(es, window=4, overlap=1)
+    >>> [(list(timesteps), kept) for timesteps, kept in rh.windows()]
+    [([0, 1, 2, 3], 3), ([3, 4, 5, 6], 3), ([6, 7, 8, 9], 4)]
+    """
+    def __init__(self, es, window, overlap=0, **kwargs):
+        if not 0 <= overlap < window:
+            raise ValueError("The overlap has to be smaller than the window "
+                             "and must not be negative.")
+        self.es = es
+        self.window = window
+        self.overlap = overlap
+        self.timeindex = kwargs.pop('timeindex', es.timeindex)
+        # the timesteps of all windows refer to the whole time index
+        if kwargs.get('timeincrement') is None:
+            kwargs['timeincrement'] = timestep_lengths(self.timeindex)
+        self.model_kwargs = kwargs
+
+    def windows(self):
+        """ Yields the timesteps of every window and the number of timesteps
+        at its beginning whose results are kept.
+        """
+        length = len(self.timeindex)
+        step = self.window - self.overlap
+        start = 0
+        while start < length:
+            end = min(start + self.window, length)
+            yield range(start, end), (end - start if end == length else step)
+            if end == length:
+                break
+            start += step
+
+    def _check(self):
+        """ Raises an error if the energy system contains attributes which
+        cannot be optimized with a rolling horizon.
+        """
+        for (i, o), f in self.es.flows().items():
+            if isinstance(f.investment, Investment):
+                raise ValueError("Investments cannot be optimized with a "
+                                 "rolling horizon: flow ({0}, {1}).".format(
+                                     i, o))
+            if f.summed_max is not None or f.summed_min is not None:
+                raise ValueError("Summed flow limits cannot be used with a "
+                                 "rolling horizon: flow ({0}, {1}).".format(
+                                     i, o))
+        for n in self.es.nodes:
+            if isinstance(n, Storage) and n.investment is not None:
+                raise ValueError("Investments cannot be optimized with a "
+                                 "rolling horizon: storage {0}.".format(n))
+
+    def solve(self, solver='glpk', solver_io='lp', **kwargs):
+        r""" Creates and solves the model of every window and stores the
+        combined results in :attr:`es.results`.
+
+        Parameters
+        ----------
+        solver : string
+            solver to be used e.g. "glpk","gurobi","cplex"
+        solver_io : string
+            pyomo solver interface file format: "lp","python","nl", etc.
+        \**kwargs : keyword arguments
+            Passed to :meth:`OperationalModel.solve()
+            <oemof.solph.models.OperationalModel.solve>`.
+
+        Returns
+        -------
+        list
+            The solver results of all windows.
+
+        Note that :attr:`es.results.objective` is the sum of the objective
+        values of all windows including the overlapping timesteps.
+        """
+        self._check()
+
+        storages = self.es.groups.get(blocks.Storage, [])
+        initial_status = {f: f.binary.initial_status for i, o, f in
+                          self.es.groups.get(blocks.BinaryFlow, [])}
+        capacity = {n: n.initial_capacity * n.nominal_capacity
+                    for n in storages if n.initial_capacity is not None}
+
+        result = UserDict()
+        result.objective = 0
+        result.solver = []
+        try:
+            for timesteps, kept in self.windows():
+                om = OperationalModel(
+                    self.es, timeindex=self.timeindex[timesteps[0]:
+                                                      timesteps[-1] + 1],
+                    timesteps=timesteps, **self.model_kwargs)
+                last = timesteps[-1] == len(self.timeindex) - 1
+                for n, c in capacity.items():
+                    _set_initial_capacity(om, n, c, last)
+
+                result.solver.append(om.solve(solver=solver,
+                                              solver_io=solver_io, **kwargs))
+                _extend(result, self.es.results, kept)
+                result.objective += self.es.results.objective
+
+                # states at the end of the kept timesteps
+                end = timesteps[kept - 1]
+                capacity = {n: om.Storage.capacity[n, end].value
+                            for n in storages}
+                for i, o, f in self.es.groups.get(blocks.BinaryFlow, []):
+                    f.binary.initial_status = round(
+                        om.BinaryFlow.status[i, o, end].value)
+                del om
+        finally:
+            for f, status in initial_status.items():
+                f.binary.initial_status = status
+
+        result.investment = UserDict()
+        self.es.results = result
+        return result.solver
+
+
+def _set_initial_capacity(om, n, capacity, last):
+    """ Sets the capacity of storage `n` before the first timestep of the
+    model `om` to `capacity`.
+
+    The capacity at the last timestep of the model, which precedes the first
+    timestep in the storage balance, is replaced by `capacity` in the balance
+    of the first timestep. The capacity at the last timestep is released if
+    it was fixed by the `initial_capacity` of the storage unless the model is
+    the `last` window.
+    """
+    block = om.Storage
+    first = om.TIMESTEPS[1]
+    i = [i for i in n.inputs][0]
+    o = [o for o in n.outputs][0]
+    if not last:
+        block.capacity[n, om.TIMESTEPS[-1]].unfix()
+    expr = 0
+    expr += block.capacity[n, first]
+    expr += - capacity * (1 - n.capacity_loss[first])
+    expr += (- om.flow[i, n, first] *
+             n.inflow_conversion_factor[first]) * om.timeincrement[first]
+    expr += (om.flow[n, o, first] /
+             n.outflow_conversion_factor[first]) * om.timeincrement[first]
+    block.balance[n, first].set_value(expr == 0)
+
+
+def _extend(result, window_result, kept):
+    """ Appends the first `kept` values of every time series in
+    `window_result` to the corresponding time series in `result`.
+    """
+    for i, series in window_result.items():
+        result[i] = result.get(i, UserDict())
+        for o, values in series.items():
+            result[i][o] = result[i].get(o, UserList())
+            result[i][o].extend(values[:kept])
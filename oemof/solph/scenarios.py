@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Solving batches of scenarios of an energy system in parallel processes.
+"""
+
+from collections import abc
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import oemof.network as on
+from .models import OperationalModel
+from .plumbing import sequence
+
+
+def solve_scenarios(factory, overrides, solver='glpk', solver_io='lp',
+                    max_workers=None, model_kwargs=None, **kwargs):
+    r""" Builds and solves an :class:`~oemof.solph.models.OperationalModel`
+    for every scenario in a pool of processes.
+
+    Every scenario is created in a worker process by calling `factory` and
+    applying the overrides of the scenario (see :func:`apply_overrides`).
+    The global state of :mod:`oemof.network` (the registries of
+    :class:`~oemof.network.Node` and :class:`~oemof.network.Entity`) is reset
+    before a scenario is created, so nodes of different scenarios never get
+    mixed up. Only the results (see
+    :func:`compact_results`) are sent back to the calling process.
+
+    Parameters
+    ----------
+    factory : callable
+        Function without arguments returning a new energy system. It has to
+        be picklable, i.e. defined on module level.
+    overrides : list of dict
+        The overrides of every scenario.
+    solver : string
+        solver to be used e.g. "glpk","gurobi","cplex"
+    solver_io : string
+        pyomo solver interface file format: "lp","python","nl", etc.
+    max_workers : int (optional)
+        Number of worker processes. Defaults to the number of processors.
+    model_kwargs : dict (optional)
+        Keyword arguments of the OperationalModel, e.g. `constraint_groups`.
+    \**kwargs : keyword arguments
+        Passed to :meth:`OperationalModel.solve()
+        <oemof.solph.models.OperationalModel.solve>`.
+
+    Returns
+    -------
+    list
+        The results of all scenarios in the order of `overrides`.
+    """
+    solve = partial(_solve_scenario, factory, solver=solver,
+                    solver_io=solver_io, model_kwargs=model_kwargs or {},
+                    solve_kwargs=kwargs)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(solve, overrides))
+
+
+def _solve_scenario(factory, override, solver, solver_io, model_kwargs,
+                    solve_kwargs):
+    """ Creates, solves and returns the results of one scenario in a worker
+    process.
+    """
+    _isolate()
+    es = factory()
+    apply_overrides(es, override)
+    om = OperationalModel(es, **model_kwargs)
+    om.solve(solver=solver, solver_io=solver_io, **solve_kwargs)
+    return compact_results(es.results)
+
+
+def _isolate():
+    """ Resets the global state of :mod:`oemof.network`.
+
+    Worker processes may inherit the state of the calling process or keep
+    the state of the previous scenario, hence it is reset before a new
+    energy system is created.
+    """
+    on.Node.registry = None
+    on.Entity.registry = None
+
+
+def apply_overrides(es, override):
+    """ Sets attributes of the nodes and flows of an energy system.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+    override : dict
+        Maps the label of a node or a tuple of the labels of the source and
+        the target of a flow to a dictionary of attribute names and values.
+        Values of attributes which are sequences (e.g. `variable_costs` or
+        `actual_value`) are converted by
+        :func:`~oemof.solph.plumbing.sequence`.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof import solph
+    >>> es = solph.EnergySystem(
+    ...     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+    >>> bel = solph.Bus(label='electricity')
+    >>> pp = solph.Source(label='pp', outputs={
+    ...     bel: solph.Flow(nominal_value=10, variable_costs=2)})
+    >>> apply_overrides(es, {('pp', 'electricity'): {'variable_costs': 5}})
+    >>> pp.outputs[bel].variable_costs[2]
+    5
+    """
+    for key, attributes in override.items():
+        if isinstance(key, tuple):
+            source, target = (es.groups[label] for label in key)
+            obj = source.outputs[target]
+        else:
+            obj = es.groups[key]
+        for name, value in attributes.items():
+            current = getattr(obj, name)
+            if (isinstance(current, abc.Iterable) and
+                    not isinstance(current, str)):
+                value = sequence(value)
+            setattr(obj, name, value)
+
+
+def compact_results(results):
+    """ Converts the results dictionary of an energy system into arrays keyed
+    by labels.
+
+    Parameters
+    ----------
+    results : dict
+        The results as returned by :meth:`OperationalModel.results()
+        <oemof.solph.models.OperationalModel.results>`.
+
+    Returns
+    -------
+    dict
+        Maps tuples of the labels of the source and the target of every time
+        series to a float array. The value of the objective function is
+        stored under the key `'objective'` and the invested capacities (if
+        any) are stored as a dictionary under the key `'investment'`.
+    """
+    compact = {(str(i), str(o)): np.array(values, dtype=float)
+               for i, series in results.items()
+               for o, values in series.items()}
+    compact['objective'] = getattr(results, 'objective', None)
+    compact['investment'] = {
+        (str(i), str(o)): value for (i, o), value in
+        getattr(results, 'investment', {}).items()}
+    return compact
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Seeding the variables of a model with the values of a previous solution
+(warm start).
+
+The values of a :class:`Solution` are keyed by the name of the variable
+(without the block, e.g. `'flow'`, `'capacity'`, `'invest'` or `'status'`)
+and the labels of the nodes of its index, and the values of time dependent
+variables are stored per timestamp. A solution is therefore mapped onto a new
+model of a changed energy system or of another time index (e.g. the next day
+of consecutive daily runs) by the labels of the nodes and the timestamps of
+the timesteps. Variables without a value in the solution are not changed.
+"""
+
+from collections import OrderedDict
+import pickle
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+from oemof.network import Node
+
+
+class Solution:
+    """ Values of the variables of a solved model keyed by labels and
+    timestamps.
+
+    Parameters
+    ----------
+    timeindex : pandas.DatetimeIndex
+        The timestamps of the values of time dependent variables.
+    series : dict
+        Maps `(name, labels)` of every time dependent variable to a float
+        array with a value per timestamp (`nan` if there is none).
+    scalars : dict
+        Maps `(name, labels)` of every variable which does not depend on the
+        time (e.g. `invest`) to its value.
+    """
+    def __init__(self, timeindex, series=None, scalars=None):
+        self.timeindex = pd.DatetimeIndex(timeindex)
+        self.series = series if series is not None else {}
+        self.scalars = scalars if scalars is not None else {}
+
+    @classmethod
+    def from_model(cls, om):
+        """ Returns the values of all variables of the solved model `om`.
+        """
+        timestamps = _timestamps(om)
+        timeindex = pd.DatetimeIndex(list(timestamps.values()))
+        position = {t: p for p, t in enumerate(timestamps)}
+        series, scalars = {}, {}
+        for name, key, timestep, var in _variables(om):
+            if var.value is None:
+                continue
+            if timestep is None:
+                scalars[name, key] = var.value
+            elif timestep in position:
+                if (name, key) not in series:
+                    series[name, key] = np.full(len(timeindex), np.nan)
+                series[name, key][position[timestep]] = var.value
+        return cls(timeindex, series, scalars)
+
+    @classmethod
+    def from_results(cls, results, timeindex):
+        """ Returns the values of the flows, storage capacities and invested
+        capacities of a results dictionary.
+
+        Parameters
+        ----------
+        results : dict
+            The results as returned by :meth:`OperationalModel.results()
+            <oemof.solph.models.OperationalModel.results>` (e.g.
+            `es.results`) or by
+            :func:`~oemof.solph.scenarios.compact_results`.
+        timeindex : pandas.DatetimeIndex
+            The time index of the results. Its first timestamps are assigned
+            to the values of the time series.
+        """
+        if any(isinstance(k, str) for k in results):
+            investment = results.get('investment') or {}
+            items = [(k, v) for k, v in results.items()
+                     if isinstance(k, tuple)]
+        else:
+            investment = {(str(i), str(o)): v for (i, o), v in getattr(
+                results, 'investment', {}).items()}
+            items = [((str(i), str(o)), values)
+                     for i, series in results.items()
+                     for o, values in series.items()]
+
+        timeindex = pd.DatetimeIndex(timeindex)
+        series = {}
+        for (i, o), values in items:
+            values = np.array(values, dtype=float)[:len(timeindex)]
+            array = np.full(len(timeindex), np.nan)
+            array[:len(values)] = values
+            # the series of a storage (and the duals of a bus) is keyed by
+            # the node twice
+            key = ('capacity', (i,)) if i == o else ('flow', (i, o))
+            series[key] = array
+        scalars = {('invest', (i,) if i == o else (i, o)): value
+                   for (i, o), value in investment.items()
+                   if value is not None}
+        return cls(timeindex, series, scalars)
+
+    def save(self, filename):
+        """ Stores the solution in the file `filename`.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump((self.timeindex, self.series, self.scalars), f)
+
+    @classmethod
+    def load(cls, filename):
+        """ Returns the solution stored in the file `filename` by
+        :meth:`save`.
+        """
+        with open(filename, 'rb') as f:
+            return cls(*pickle.load(f))
+
+
+def set_start_values(om, solution):
+    """ Sets the values of the variables of the model `om` to the values of
+    the `solution` with the same name, labels and timestamp.
+
+    Fixed variables are not changed, the values of integer and binary
+    variables are rounded.
+
+    Parameters
+    ----------
+    om : OperationalModel
+    solution : :class:`Solution`
+
+    Returns
+    -------
+    int
+        The number of variables whose value was set.
+    """
+    timestamps = _timestamps(om)
+    positions = solution.timeindex.get_indexer(
+        pd.DatetimeIndex(list(timestamps.values())))
+    position = {t: p for t, p in zip(timestamps, positions.tolist())
+                if p >= 0}
+
+    # the variables of every series are collected to set them at once
+    targets = {}
+    count = 0
+    for name, key, timestep, var in _variables(om):
+        if var.fixed:
+            continue
+        if timestep is None:
+            value = solution.scalars.get((name, key))
+            if value is not None and not np.isnan(value):
+                _set_value(var, value)
+                count += 1
+        elif (name, key) in solution.series and timestep in position:
+            targets.setdefault((name, key), ([], []))
+            targets[name, key][0].append(position[timestep])
+            targets[name, key][1].append(var)
+
+    for key, (rows, variables) in targets.items():
+        values = np.asarray(solution.series[key], dtype=float)[rows]
+        for var, value in zip(variables, values.tolist()):
+            if not np.isnan(value):
+                _set_value(var, value)
+                count += 1
+    return count
+
+
+def _set_value(var, value):
+    if var.is_binary() or var.is_integer():
+        value = round(value)
+    var.value = value
+
+
+def _timestamps(om):
+    """ Returns an ordered mapping of the timesteps of the model `om` to
+    their timestamps. The timesteps are positions in the time index, which
+    may be longer than the model.
+    """
+    return OrderedDict((t, om.timeindex[t]) for t in om.TIMESTEPS)
+
+
+def _variables(om):
+    """ Yields the name, the labels of the nodes of the index, the timestep
+    (or None) and the variable of all variables of the model `om`.
+    """
+    for component in om.component_objects(po.Var, active=True):
+        name = component.local_name
+        for index, var in component.iteritems():
+            if index is None:
+                index = ()
+            elif not isinstance(index, tuple):
+                index = (index,)
+            key = tuple(str(k) for k in index if isinstance(k, Node))
+            other = [k for k in index if not isinstance(k, Node)]
+            if len(other) > 1:
+                continue
+            yield name, key, other[0] if other else None, var
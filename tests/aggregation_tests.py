@@ -0,0 +1,153 @@
+from nose.tools import eq_, ok_, raises
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+
+from oemof import solph
+from oemof.solph.aggregation import TypicalPeriods, VariableResolution
+
+
+class TypicalPeriods_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=12, freq='H'))
+        self.bus = solph.Bus(label='bus')
+        self.demand = [1, 2, 3, 1, 2, 3, 6, 5, 4, 1, 2, 3]
+        solph.Sink(label='demand', inputs={self.bus: solph.Flow(
+            nominal_value=1, fixed=True, actual_value=self.demand)})
+        solph.Source(label='source', outputs={self.bus: solph.Flow(
+            variable_costs=2)})
+
+    def test_clustering(self):
+        """Equal periods are represented by the same typical period."""
+        for method in ('hierarchical', 'medoids'):
+            tp = TypicalPeriods(self.es, period_length=3, number_of_periods=2,
+                                method=method, seed=0)
+            tp.cluster()
+            eq_(tp.representatives.tolist(), [0, 2])
+            eq_(tp.assignment.tolist(), [0, 0, 1, 0])
+            eq_(tp.weights.tolist(), [3, 1])
+
+    @raises(ValueError)
+    def test_period_length(self):
+        TypicalPeriods(self.es, period_length=5)
+
+    def test_model(self):
+        """The model covers the typical periods with weighted timesteps and
+        the original time series are kept."""
+        tp = TypicalPeriods(self.es, period_length=3, number_of_periods=2)
+        om = tp.model()
+        eq_(len(om.TIMESTEPS), 6)
+        eq_([om.timeincrement[t] for t in om.TIMESTEPS], [3, 3, 3, 1, 1, 1])
+        demand = self.es.groups['demand']
+        eq_([om.flow[self.bus, demand, t].value for t in om.TIMESTEPS],
+            [1, 2, 3, 6, 5, 4])
+        eq_(list(demand.inputs[self.bus].actual_value), self.demand)
+
+    def test_decoupled_periods(self):
+        """Gradients and start-ups do not link the first timestep of a
+        typical period to the previous, unrelated period."""
+        solph.Source(label='plant', outputs={self.bus: solph.Flow(
+            nominal_value=10, positive_gradient=0.1, negative_gradient=0.1,
+            binary=solph.BinaryFlow(startup_costs=5, shutdown_costs=5))})
+        tp = TypicalPeriods(self.es, period_length=3, number_of_periods=2)
+        om = tp.model()
+        for c in (om.Flow.positive_gradient_constr,
+                  om.Flow.negative_gradient_constr):
+            eq_([t for (i, o, t) in c if c[i, o, t].active], [1, 2, 4, 5])
+        for c in (om.BinaryFlow.startup_constr,
+                  om.BinaryFlow.shutdown_constr):
+            eq_([t for (i, o, t) in c if c[i, o, t].active],
+                [0, 1, 2, 4, 5])
+
+    def test_storage_results(self):
+        """The disaggregated capacity of a storage follows the balance of
+        the original time index."""
+        storage = solph.Storage(
+            label='storage', inputs={self.bus: solph.Flow()},
+            outputs={self.bus: solph.Flow()}, nominal_capacity=10,
+            initial_capacity=0.5, capacity_loss=0.1)
+        tp = TypicalPeriods(self.es, period_length=3, number_of_periods=2)
+        om = tp.model()
+        ok_(not om.Storage.capacity[storage, 5].fixed)
+        for v in om.component_data_objects(po.Var):
+            v.value = 0
+        for t in om.TIMESTEPS:
+            om.flow[self.bus, storage, t].value = t % 2
+            prev = om.Storage.capacity[storage, t - 1].value if t % 3 else 0
+            om.Storage.capacity[storage, t].value = prev * 0.9 + t % 2
+            eq_(po.value(om.Storage.balance[storage, t].body), 0)
+        level = 5
+        for p in range(4):
+            om.StorageLinking.level[storage, p].value = level
+            last = om.Storage.capacity[storage, tp.assignment[p] * 3 + 2]
+            level = level * 0.9 ** 3 + last.value
+        om.StorageLinking.level[storage, 4].value = level
+        for p in range(4):
+            ok_(np.isclose(po.value(
+                om.StorageLinking.transition[storage, p].body), 0))
+
+        results = tp.results(om)
+        capacity = np.array(results[storage][storage])
+        inflow = np.array(results[self.bus][storage])
+        eq_(len(capacity), 12)
+        ok_(np.allclose(capacity,
+                        np.r_[5, capacity[:-1]] * 0.9 + inflow))
+        ok_(np.isclose(capacity[-1], level))
+
+
+class VariableResolution_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=6, freq='H'))
+        self.bus = solph.Bus(label='bus')
+        self.coarse = self.es.timeindex[[0, 1, 3]]
+
+    @raises(ValueError)
+    def test_coarse_timeindex(self):
+        VariableResolution(self.es, self.es.timeindex[1:])
+
+    def test_irregular_timeindex(self):
+        """The time increment is derived from an irregular time index."""
+        om = solph.OperationalModel(self.es, timeindex=self.coarse)
+        eq_([om.timeincrement[t] for t in om.TIMESTEPS], [1, 2, 2])
+
+    def test_aggregation(self):
+        """Time series are averaged, losses compounded and gradients
+        summed."""
+        solph.Source(label='source', outputs={self.bus: solph.Flow(
+            positive_gradient=[1, 2, 3, 4, 5, 6], nominal_value=1)})
+        storage = solph.Storage(
+            label='storage', inputs={self.bus: solph.Flow()},
+            outputs={self.bus: solph.Flow()}, nominal_capacity=10,
+            capacity_loss=[0, 0.5, 0.5, 0.2, 0.2, 0.2])
+        vr = VariableResolution(self.es, self.coarse)
+        eq_(vr.steps.tolist(), [0, 1, 1, 2, 2, 2])
+        eq_(vr.timeincrement.tolist(), [1, 2, 3])
+        eq_(vr.aggregate(storage.capacity_loss, 'capacity_loss'),
+            [0, 0.75, 1 - 0.8 ** 3])
+        eq_(vr.aggregate([1, 2, 4, 3, None, 3], 'max'), [1, 3, None])
+        eq_(vr.aggregate([1, 2, 3, 4, 5, 6], 'positive_gradient'),
+            [1, 5, 15])
+        om = vr.model()
+        eq_([om.positive_flow_gradient[t].ub for t in
+             om.positive_flow_gradient], [1, 5, 15])
+        eq_(list(storage.capacity_loss), [0, 0.5, 0.5, 0.2, 0.2, 0.2])
+
+    def test_results(self):
+        """Flows are repeated and storage capacities are interpolated."""
+        storage = solph.Storage(
+            label='storage', inputs={self.bus: solph.Flow()},
+            outputs={self.bus: solph.Flow()}, nominal_capacity=10)
+        vr = VariableResolution(self.es, self.coarse)
+        om = vr.model()
+        for v in om.component_data_objects(po.Var):
+            v.value = 0
+        for t, (flow, capacity) in enumerate([(1, 3), (2, 6), (3, 0)]):
+            om.flow[self.bus, storage, t].value = flow
+            om.Storage.capacity[storage, t].value = capacity
+        results = vr.results(om)
+        eq_(list(results[self.bus][storage]), [1, 2, 2, 3, 3, 3])
+        eq_(list(results[storage][storage]), [3, 4.5, 6, 4, 2, 0])
@@ -5,8 +5,11 @@ except ImportError:
 
 from nose.tools import ok_, eq_
 
+import numpy as np
 import pandas as pd
 import logging
+import os
+import tempfile
 
 # from oemof.core.network.entities.components import transformers as transformer
 from oemof import energy_system as es
@@ -165,3 +168,77 @@ class EnergySystem_Tests:
         eq_(ES.groups[key], set(((bus, node, flows[0]),
                                  (node, bus, flows[1]))))
 
+    def test_that_groups_are_updated_incrementally(self):
+        ES = es.EnergySystem(groupings=[type])
+        b1 = NewBus(label="B1")
+        buses = ES.groups[NewBus]
+        eq_(buses, {b1})
+        b2 = NewBus(label="B2")
+        ok_(ES.groups[NewBus] is buses)
+        eq_(buses, {b1, b2})
+        ok_(ES.groups["B2"] is b2)
+
+    def test_adding_entities_in_one_batch(self):
+        ES = es.EnergySystem(groupings=[type])
+        Node.registry = None
+        try:
+            nodes = [Node(label="N{}".format(i)) for i in range(5)]
+            nodes[1].outputs[nodes[2]] = "flow"
+        finally:
+            Node.registry = ES
+        ES.add_all(nodes)
+        eq_(ES.nodes, nodes)
+        eq_(ES.groups[Node], set(nodes))
+        ok_(ES.groups["N3"] is nodes[3])
+        # the nodes and their flows are moved into the graph
+        ok_(all(n._graph is ES.graph for n in nodes))
+        eq_(ES.graph.nodes, nodes)
+        eq_(dict(nodes[2].inputs.items()), {nodes[1]: "flow"})
+        eq_(len(ES.graph.values), 1)
+
+    def test_invalidating_one_grouping(self):
+        calls = []
+
+        def flow_count(n):
+            calls.append(n)
+            return len(n.outputs)
+
+        ES = es.EnergySystem(groupings=[type, flow_count])
+        b1, b2 = NewBus(label="B1"), NewBus(label="B2")
+        eq_(ES.groups[0], {b1, b2})
+        eq_(len(calls), 2)
+        b1.outputs[b2] = object()
+        eq_(ES.groups[0], {b1, b2})
+        ES.invalidate(flow_count)
+        eq_(ES.groups[0], {b2})
+        eq_(ES.groups[1], {b1})
+        eq_(ES.groups[NewBus], {b1, b2})
+        eq_(len(calls), 4)
+
+    def test_binary_dump(self):
+        series = pd.Series([1.5, 2.5, 3.5], index=self.timeindex[:3],
+                           name="series")
+        node = Node(label="N", inputs={NewBus(label="B"): None})
+        self.es.timeindex = self.timeindex
+        self.es.results = {"series": series, "list": [0.5, 1.5],
+                           "array": np.arange(4.0), "same": series,
+                           "ints": [1, 2]}
+        dpath = tempfile.mkdtemp()
+        self.es.dump(dpath, "binary", binary=True)
+        ok_(os.path.isfile(os.path.join(dpath, "binary.npy")))
+        eq_(np.load(os.path.join(dpath, "binary.npy")).tolist(),
+            [1.5, 2.5, 3.5, 0.5, 1.5, 0.0, 1.0, 2.0, 3.0])
+
+        restored = es.EnergySystem()
+        restored.restore(dpath, "binary")
+        results = restored.results
+        ok_(results["series"].equals(series))
+        ok_(results["same"] is results["series"])
+        # the restored series are views on the mapped array file
+        ok_(not results["series"].values.flags.owndata)
+        eq_(results["list"].tolist(), [0.5, 1.5])
+        eq_(results["array"].tolist(), [0.0, 1.0, 2.0, 3.0])
+        eq_(results["ints"], [1, 2])
+        ok_(restored.timeindex.equals(self.timeindex))
+        eq_([n.label for n in restored.nodes], ["B", "N"])
+        eq_(list(restored.groups["N"].inputs), [restored.groups["B"]])
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_, ok_
+import pandas as pd
+
+from oemof import solph
+from oemof.solph.cache import Layout, ModelCache, fingerprint
+from oemof.solph.matrix import MatrixModel
+
+
+def energy_system(costs=2, demand=(1, 0.5, 0.2), gradient=None):
+    es = solph.EnergySystem(
+        groupings=solph.GROUPINGS,
+        timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+    bel = solph.Bus(label='electricity')
+    solph.Source(label='pp', outputs={bel: solph.Flow(
+        nominal_value=10, variable_costs=costs, positive_gradient=gradient)})
+    solph.Sink(label='demand', inputs={bel: solph.Flow(
+        nominal_value=5, actual_value=list(demand), fixed=True)})
+    return es
+
+
+def lp_file(model, directory, name):
+    filename = os.path.join(directory, name)
+    model.write(filename)
+    with open(filename) as f:
+        return f.read()
+
+
+class Fingerprint_Tests:
+
+    def test_numbers_are_ignored(self):
+        eq_(fingerprint(energy_system(), range(3)),
+            fingerprint(energy_system(costs=5, demand=(0, 1, 2)), range(3)))
+
+    def test_structure(self):
+        reference = fingerprint(energy_system(), range(3))
+        ok_(fingerprint(energy_system(), range(2)) != reference)
+        ok_(fingerprint(energy_system(gradient=1), range(3)) != reference)
+
+
+class ModelCache_Tests:
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ModelCache(os.path.join(self.directory, 'cache'))
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hit(self):
+        model = MatrixModel(energy_system(), cache=self.cache)
+        expected = lp_file(model, self.directory, 'miss.lp')
+        eq_(len(self.cache.entries()), 1)
+        layout = self.cache.load(model.fingerprint)
+        ok_('column_names' in layout)
+        ok_('order' in layout)
+
+        model = MatrixModel(energy_system(), cache=self.cache)
+        ok_(not model.layout.modified)
+        eq_(lp_file(model, self.directory, 'hit.lp'), expected)
+        ok_(not model.layout.modified)
+
+    def test_new_numbers(self):
+        MatrixModel(energy_system(), cache=self.cache).write(
+            os.path.join(self.directory, 'first.lp'))
+        es = energy_system(costs=0, demand=(0, 1, 2))
+        expected = lp_file(MatrixModel(es), self.directory, 'plain.lp')
+        eq_(lp_file(MatrixModel(es, cache=self.cache), self.directory,
+                    'cached.lp'), expected)
+
+    def test_stale_entry_is_recomputed(self):
+        layout = Layout()
+        layout['column_names'] = ('stale', ['x'])
+        layout.modified = True
+        model = MatrixModel(energy_system(), cache=self.cache)
+        self.cache.save(model.fingerprint, layout)
+        expected = lp_file(MatrixModel(energy_system()), self.directory,
+                           'plain.lp')
+        model = MatrixModel(energy_system(), cache=self.cache)
+        eq_(lp_file(model, self.directory, 'cached.lp'), expected)
+        ok_(self.cache.load(model.fingerprint)['column_names'][0] != 'stale')
+
+    def test_lru_eviction(self):
+        for key, mtime in (('a', 1), ('b', 3), ('c', 2)):
+            layout = Layout(entry=('', 'x' * 1000))
+            layout.modified = True
+            self.cache.save(key, layout)
+            os.utime(self.cache._path(key), (mtime, mtime))
+        size = os.path.getsize(self.cache._path('a'))
+        self.cache.max_size = 2 * size
+        # loading marks 'a' as the most recently used entry
+        self.cache.load('a')
+        self.cache.evict()
+        eq_(sorted(os.path.basename(p)[0] for p in self.cache.entries()),
+            ['a', 'b'])
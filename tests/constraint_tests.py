@@ -7,7 +7,7 @@ from nose.tools import eq_
 import pandas as pd
 
 from oemof.solph.network import Investment
-from oemof.solph import OperationalModel
+from oemof.solph import OperationalModel, MatrixModel
 
 from oemof import energy_system as core_es
 import oemof.solph as solph
@@ -21,6 +21,8 @@ logging.disable(logging.INFO)
 
 class Constraint_Tests:
 
+    model = OperationalModel
+
     @classmethod
     def setup_class(self):
         self.objective_pattern = re.compile("^objective.*(?=s\.t\.)",
@@ -36,8 +38,8 @@ class Constraint_Tests:
                                                  timeindex=self.date_time_index)
 
     def compare_lp_files(self, filename, ignored=None):
-        om = OperationalModel(self.energysystem,
-                              timeindex=self.energysystem.timeindex)
+        om = self.model(self.energysystem,
+                        timeindex=self.energysystem.timeindex)
         tmp_filename = filename.replace('.lp', '') + '_tmp.lp'
         new_filename = ospath.join(self.tmppath, tmp_filename)
         om.write(new_filename, io_options={'symbolic_solver_labels': True})
@@ -288,3 +290,10 @@ class Constraint_Tests:
             conversion_factor_single_flow={bel: 0.5})
 
         self.compare_lp_files('variable_chp.lp')
+
+
+class MatrixModel_Constraint_Tests(Constraint_Tests):
+    """ Runs all constraint tests with the :class:`MatrixModel`, which has
+    to write the same lp files as the :class:`OperationalModel`.
+    """
+    model = MatrixModel
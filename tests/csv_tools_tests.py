@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+from nose.plugins.skip import SkipTest
+from nose.tools import eq_, ok_
+import numpy as np
+
+from oemof import solph
+from oemof.solph.inputlib.csv_tools import NodesFromCSV, _read_sequences
+from oemof.solph.inputlib.parquet_tools import NodesFromParquet, csv_to_parquet
+
+
+class NodesFromCSV_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem()
+        self.path = os.path.join(
+            os.path.dirname(__file__), os.pardir, 'examples', 'solph',
+            'csv_reader', 'dispatch', 'scenarios')
+
+    def test_sequences_are_views_on_one_block(self):
+        nodes = NodesFromCSV(
+            os.path.join(self.path, 'example_energy_system.csv'),
+            os.path.join(self.path, 'example_energy_system_seq.csv'))
+        wind = nodes['R1_wind'].outputs[nodes['R1_bus_el']].actual_value
+        load = nodes['R1_bus_el'].outputs[nodes['R1_load']].actual_value
+        ok_(wind.base is not None and wind.base is load.base)
+        ok_(wind.flags['C_CONTIGUOUS'])
+        eq_(wind[:3].tolist(), [0.315569, 0.311572, 0.304005])
+        eq_(load[0], 0.5590619824)
+
+    def test_reading_sequences(self):
+        fd, filename = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write("class,Source,Sink\nlabel,a,b\nsource,a,bus\n"
+                    "target,bus,b\nattribute,max,actual_value\n"
+                    "2012-01-01,0.5,1\n,,\n2012-01-02,,2\n")
+        block, positions = _read_sequences(filename)
+        os.remove(filename)
+        eq_(positions, {('Source', 'a', 'a', 'bus', 'max'): 0,
+                        ('Sink', 'b', 'bus', 'b', 'actual_value'): 1})
+        eq_(block.shape, (2, 2))
+        ok_(np.isnan(block[1, 0]))
+        eq_(block[:, 1].tolist(), [1.0, 2.0])
+
+    def test_reading_parquet_files(self):
+        try:
+            import pyarrow
+        except ImportError:
+            raise SkipTest("pyarrow is not installed")
+        directory = tempfile.mkdtemp()
+        nodes_flows = os.path.join(directory, 'nodes_flows')
+        sequences = os.path.join(directory, 'sequences.parquet')
+        csv_to_parquet(
+            os.path.join(self.path, 'example_energy_system.csv'),
+            os.path.join(self.path, 'example_energy_system_seq.csv'),
+            nodes_flows, sequences, partition_on=['class'])
+
+        nodes = NodesFromParquet(nodes_flows, sequences,
+                                 classes=['Source', 'Sink'])
+        eq_({type(n).__name__ for n in nodes.values()},
+            {'Source', 'Sink', 'Bus'})
+        expected = NodesFromCSV(
+            os.path.join(self.path, 'example_energy_system.csv'),
+            os.path.join(self.path, 'example_energy_system_seq.csv'))
+        flow = nodes['R1_wind'].outputs[nodes['R1_bus_el']]
+        eq_(flow.actual_value.tolist(), expected['R1_wind'].outputs[
+            expected['R1_bus_el']].actual_value.tolist())
+        eq_(flow.nominal_value, 5000)
+        ok_(flow.fixed)
@@ -0,0 +1,130 @@
+import gzip
+import os
+import re
+import shutil
+import tempfile
+
+from nose.tools import assert_raises, eq_, ok_
+import numpy as np
+import pandas as pd
+
+from oemof import solph
+from oemof.solph.matrix import MatrixModel, write_lp, write_mps
+
+
+class Writer_Tests:
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        es = solph.EnergySystem(
+            groupings=solph.GROUPINGS,
+            timeindex=pd.date_range('1/1/2012', periods=4, freq='H'))
+        bel = solph.Bus(label='electricity')
+        bgas = solph.Bus(label='gas')
+        solph.Source(label='gas_import', outputs={bgas: solph.Flow(
+            variable_costs=30)})
+        solph.LinearTransformer(
+            label='peak', inputs={bgas: solph.Flow()},
+            outputs={bel: solph.Flow(nominal_value=30, min=0.3,
+                                     binary=solph.BinaryFlow())},
+            conversion_factors={bel: 0.4})
+        solph.LinearTransformer(
+            label='pp', inputs={bgas: solph.Flow()},
+            outputs={bel: solph.Flow(nominal_value=20)},
+            conversion_factors={bel: 0.5})
+        solph.Sink(label='demand', inputs={bel: solph.Flow(
+            nominal_value=5, actual_value=[1, 0.5, 0.2, 0.8], fixed=True)})
+        self.model = MatrixModel(es)
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def read(self, name):
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(self.path(name), 'rt') as f:
+            return f.read()
+
+    def test_chunks_and_workers(self):
+        for writer, name in ((write_lp, 'model.lp'), (write_mps, 'model.mps')):
+            self.model.write(self.path(name))
+            for chunksize in (1, 3):
+                with open(self.path('chunked'), 'w') as f:
+                    writer(self.model, f, chunksize=chunksize, workers=2)
+                eq_(self.read('chunked'), self.read(name))
+
+    def test_gzip(self):
+        self.model.write(self.path('model.lp'))
+        self.model.write(self.path('model.lp.gz'))
+        eq_(self.read('model.lp.gz'), self.read('model.lp'))
+
+    def test_compact_names(self):
+        self.model.write(self.path('model.lp'))
+        self.model.write(self.path('compact.lp'), symbolic=False)
+        with open(self.path('compact.lp.labels')) as f:
+            labels = dict(line.rstrip('\n').split('\t') for line in f)
+        eq_(len(labels), sum(self.model.shape))
+        ok_('x0' in labels and 'r0' in labels)
+
+        # the compact file equals the symbolic one if the names are mapped
+        # back to their symbols, apart from the order of the terms of a row
+        # (which are sorted by name)
+        def paragraphs(text):
+            return [sorted(p.split('\n')) for p in text.split('\n\n')]
+        compact = re.sub(r'\b[xr]\d+\b', lambda m: labels[m.group()],
+                         self.read('compact.lp'))
+        eq_(paragraphs(compact), paragraphs(self.read('model.lp')))
+
+
+class Presolve_Tests:
+
+    def setup(self):
+        es = solph.EnergySystem(
+            groupings=solph.GROUPINGS,
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        bel = solph.Bus(label='electricity')
+        bth = solph.Bus(label='heat')
+        pp = solph.Source(label='pp', outputs={bel: solph.Flow(
+            nominal_value=10, variable_costs=2)})
+        must_run = solph.Source(label='must_run', outputs={bel: solph.Flow(
+            nominal_value=3, min=1, max=1, variable_costs=1)})
+        solph.Sink(label='demand', inputs={bel: solph.Flow(
+            nominal_value=5, actual_value=[1, 0.5, 0.2], fixed=True)})
+        excess = solph.Sink(label='excess', inputs={bel: solph.Flow()})
+        solph.Source(label='heat_source', outputs={bth: solph.Flow(
+            nominal_value=2, actual_value=[1, 1, 1], fixed=True)})
+        solph.Sink(label='heat_demand', inputs={bth: solph.Flow(
+            nominal_value=2, actual_value=[1, 1, 1], fixed=True)})
+        self.model = MatrixModel(es)
+        self.pp = self.model.columns('flow', (pp, bel))
+        self.must_run = self.model.columns('flow', (must_run, bel))
+        self.excess = self.model.columns('flow', (bel, excess))
+
+    def test_reductions(self):
+        record = self.model.presolve()
+        # the flows of the must run source are fixed
+        eq_(len(record.fixed_columns), 3)
+        eq_(self.model.objective_constant, 9)
+        # the heat balances are satisfied by the fixed flows and the excess
+        # flow turns the electricity balances into inequalities
+        eq_(self.model.shape[0], 3)
+        eq_(record.removed_columns, self.excess.tolist())
+        eq_(self.model.sense.tolist(), ['G', 'G', 'G'])
+        eq_(self.model.bound.tolist(), [2, -0.5, -2])
+        eq_(self.model.column.tolist(), self.pp.tolist())
+        ok_(self.model.row_names()[0].startswith('Bus_balance(electricity'))
+
+    def test_postsolve(self):
+        record = self.model.presolve()
+        values = np.zeros(self.model.shape[1])
+        values[self.pp] = [2, 1, 0]
+        values = record.postsolve(values)
+        eq_(values[self.excess].tolist(), [0, 1.5, 2])
+        eq_(values[self.must_run].tolist(), [3, 3, 3])
+
+    def test_infeasible_row(self):
+        self.model.upper_bounds[self.pp] = 0
+        self.model.upper_bounds[self.excess] = 0
+        assert_raises(ValueError, self.model.presolve)
@@ -0,0 +1,56 @@
+from collections import UserDict, UserList
+
+from nose.tools import eq_
+import pandas as pd
+
+from oemof import solph
+from oemof.outputlib import ResultsDataFrame
+
+
+class ResultsDataFrame_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        bel = solph.Bus(label='electricity')
+        source = solph.Source(label='source', outputs={bel: solph.Flow()})
+        sink = solph.Sink(label='sink', inputs={bel: solph.Flow()})
+        storage = solph.Storage(label='storage', inputs={bel: solph.Flow()},
+                                outputs={bel: solph.Flow()})
+        results = UserDict()
+        results[source] = UserDict({bel: UserList([1, 2, 3])})
+        results[bel] = UserDict({sink: UserList([4, 5, 6]),
+                                 storage: UserList([0, 0, 1]),
+                                 bel: [7, 8, 9]})
+        results[storage] = UserDict({bel: UserList([2, 0, 0]),
+                                     storage: UserList([5, 4, 3])})
+        self.es.results = results
+        self.rdf = ResultsDataFrame(energy_system=self.es)
+
+    def test_index(self):
+        eq_(len(self.rdf), 18)
+        eq_(self.rdf.index.names, ['bus_label', 'type', 'obj_label',
+                                   'datetime'])
+        values = self.rdf.loc[('electricity', 'to_bus', 'source'), 'val']
+        eq_(values.tolist(), [1, 2, 3])
+        eq_(self.rdf.index.is_monotonic_increasing, True)
+
+    def test_wide(self):
+        wide = self.rdf.to_wide()
+        eq_(wide.shape, (3, 6))
+        eq_(wide[('electricity', 'other', 'duals')].tolist(), [7, 8, 9])
+        eq_(wide[('electricity', 'other', 'storage')].tolist(), [5, 4, 3])
+        eq_(list(wide.index), list(self.es.timeindex))
+
+    def test_slice_bus_balance(self):
+        balance = self.rdf.slice_bus_balance('electricity')
+        eq_(list(balance.columns),
+            ['sink', 'storage', 'duals', 'storage', 'source', 'storage'])
+        eq_(balance['source'].tolist(), [1, 2, 3])
+
+    def test_slice_unstacked(self):
+        subset = self.rdf.slice_unstacked(bus_label='electricity',
+                                          type='from_bus', formatted=True,
+                                          date_from='2012-01-01 01:00')
+        eq_(list(subset.columns), ['sink', 'storage'])
+        eq_(subset['sink'].tolist(), [5, 6])
@@ -0,0 +1,53 @@
+from nose.tools import eq_, ok_, assert_raises
+import pandas as pd
+import pyomo.environ as po
+
+from oemof import solph
+from oemof.solph.profiler import BuildProfile
+
+
+class BuildProfile_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        bel = solph.Bus(label='electricity')
+        solph.Source(label='pp', outputs={
+            bel: solph.Flow(nominal_value=10, variable_costs=2)})
+        solph.Sink(label='demand', inputs={bel: solph.Flow(
+            nominal_value=5, actual_value=[1, 0.5, 0.2], fixed=True)})
+
+    def test_blocks(self):
+        """ Every block of the model is profiled.
+        """
+        om = solph.OperationalModel(self.es, profile=True)
+        profile = om.build_profile
+        eq_([b.name for b in profile.blocks][:2], ['flow', 'Bus'])
+        ok_('Flow' in [b.name for b in profile.blocks])
+        eq_((profile['flow'].variables, profile['flow'].constraints), (6, 0))
+        eq_((profile['Bus'].variables, profile['Bus'].constraints,
+             profile['Bus'].nonzeros), (0, 3, 3))
+        ok_('balance' in [name for name, _ in profile['Bus'].components])
+        eq_(profile['Storage'].variables, 0)
+        ok_(all(b.time >= 0 for b in profile.blocks))
+        ok_(profile.objective_time >= 0)
+        eq_(profile.table()['constraints'].tolist(),
+            [b.constraints for b in profile.blocks])
+        # the timed add_component is removed after the build
+        ok_('add_component' not in om.__dict__)
+        ok_('add_component' not in om.Bus.__dict__)
+
+    def test_failed_build(self):
+        """ The block is restored if the build raises.
+        """
+        block = po.ConcreteModel()
+
+        def build():
+            block.x = po.Var()
+            raise RuntimeError
+
+        profile = BuildProfile()
+        assert_raises(RuntimeError, profile.measure, 'failing', build,
+                      block=block)
+        ok_('add_component' not in block.__dict__)
+        eq_(profile.blocks, [])
@@ -0,0 +1,86 @@
+from nose.tools import eq_
+import pandas as pd
+import pyomo.environ as po
+
+from oemof import solph
+from oemof.solph.reduction import NetworkReduction
+
+
+class NetworkReduction_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        self.gas = solph.Bus(label='gas')
+        self.hydrogen = solph.Bus(label='hydrogen')
+        self.bel = solph.Bus(label='electricity')
+        solph.Source(label='gas_import', outputs={self.gas: solph.Flow(
+            variable_costs=30)})
+        self.wind = [solph.Source(label='wind_{0}'.format(k), outputs={
+            self.bel: solph.Flow(nominal_value=k, fixed=True,
+                                 actual_value=profile)})
+            for k, profile in ((1, [1, 0.5, 0]), (3, [0, 0.5, 0]))]
+        self.excess = [solph.Sink(label='excess_{0}'.format(k), inputs={
+            self.bel: solph.Flow(variable_costs=1)}) for k in range(2)]
+        self.electrolysis = solph.LinearTransformer(
+            label='electrolysis', inputs={self.gas: solph.Flow()},
+            outputs={self.hydrogen: solph.Flow()},
+            conversion_factors={self.hydrogen: 0.8})
+        self.fuel_cell = solph.LinearTransformer(
+            label='fuel_cell', inputs={self.hydrogen: solph.Flow()},
+            outputs={self.bel: solph.Flow(nominal_value=10)},
+            conversion_factors={self.bel: 0.5})
+        solph.Sink(label='demand', inputs={self.bel: solph.Flow(
+            nominal_value=5, fixed=True, actual_value=[1, 0.5, 0.2])})
+
+    def test_reduction(self):
+        nodes = len(self.es.nodes)
+        nr = NetworkReduction(self.es)
+        eq_(len(nr.reduced.nodes), nodes - 4)
+        eq_(sorted(n.label for n in nr.reduced.nodes),
+            ['demand', 'electricity', 'electrolysis', 'excess_0_aggregated',
+             'gas', 'gas_import', 'wind_1_aggregated'])
+
+        wind = nr.nodes[self.wind[0]]
+        flow = wind.outputs[nr.nodes[self.bel]]
+        eq_(flow.nominal_value, 4)
+        eq_(list(flow.actual_value), [0.25, 0.5, 0])
+        eq_(nr.flows[self.wind[1], self.bel][1].tolist(), [0, 0.75, 0.75])
+
+        chain = nr.nodes[self.electrolysis]
+        eq_(list(chain.outputs), [nr.nodes[self.bel]])
+        eq_(chain.conversion_factors[nr.nodes[self.bel]][0], 0.4)
+        eq_(chain.outputs[nr.nodes[self.bel]].nominal_value, 10)
+
+        # the original energy system is unchanged and stays the registry
+        eq_(len(self.es.nodes), nodes)
+        eq_(len(self.bel.inputs), 3)
+        solph.Bus(label='new')
+        eq_(len(self.es.nodes), nodes + 1)
+
+    def test_restricted_chain(self):
+        self.fuel_cell.inputs[self.hydrogen].variable_costs = (
+            solph.plumbing.sequence(1))
+        nr = NetworkReduction(self.es, merge=False)
+        eq_(len(nr.reduced.nodes), len(self.es.nodes))
+
+    def test_results(self):
+        nr = NetworkReduction(self.es)
+        om = nr.model()
+        for v in om.component_data_objects(po.Var):
+            v.value = 0
+        wind = nr.nodes[self.wind[0]]
+        bel, gas = nr.nodes[self.bel], nr.nodes[self.gas]
+        chain = nr.nodes[self.electrolysis]
+        for t, value in enumerate([1, 2, 0.5]):
+            om.flow[wind, bel, t].value = value
+            om.flow[gas, chain, t].value = 10 * value
+            om.flow[chain, bel, t].value = 4 * value
+
+        results = nr.results(om)
+        eq_(list(results[self.wind[0]][self.bel]), [1, 0.5, 0.125])
+        eq_(list(results[self.wind[1]][self.bel]), [0, 1.5, 0.375])
+        eq_(list(results[self.bel][self.excess[1]]), [0, 0, 0])
+        eq_(list(results[self.electrolysis][self.hydrogen]), [8, 16, 4])
+        eq_(list(results[self.hydrogen][self.fuel_cell]), [8, 16, 4])
+        eq_(list(results[self.fuel_cell][self.bel]), [4, 8, 2])
@@ -0,0 +1,61 @@
+from nose.tools import eq_, ok_, raises
+import pandas as pd
+import pyomo.environ as po
+
+from oemof import solph
+from oemof.solph.rolling_horizon import RollingHorizon, _set_initial_capacity
+
+
+class RollingHorizon_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=10, freq='H'))
+        self.bus = solph.Bus(label='bus')
+
+    def test_windows(self):
+        """Windows cover the time index and keep every timestep once."""
+        rh = RollingHorizon(self.es, window=6, overlap=2)
+        windows = [(list(t), kept) for t, kept in rh.windows()]
+        eq_(windows, [([0, 1, 2, 3, 4, 5], 4), ([4, 5, 6, 7, 8, 9], 6)])
+        eq_(sum(kept for t, kept in windows), 10)
+
+    def test_windows_without_overlap(self):
+        rh = RollingHorizon(self.es, window=4)
+        eq_([(list(t), kept) for t, kept in rh.windows()],
+            [([0, 1, 2, 3], 4), ([4, 5, 6, 7], 4), ([8, 9], 2)])
+
+    @raises(ValueError)
+    def test_overlap_larger_than_window(self):
+        RollingHorizon(self.es, window=4, overlap=4)
+
+    @raises(ValueError)
+    def test_investment(self):
+        solph.Source(label='source', outputs={self.bus: solph.Flow(
+            investment=solph.Investment(ep_costs=1))})
+        RollingHorizon(self.es, window=4).solve()
+
+    def test_initial_capacity(self):
+        """The capacity before the first timestep replaces the cyclic one."""
+        storage = solph.Storage(
+            label='storage', inputs={self.bus: solph.Flow()},
+            outputs={self.bus: solph.Flow()}, nominal_capacity=10,
+            initial_capacity=0.5, capacity_loss=0.1)
+        om = solph.OperationalModel(self.es, timeindex=self.es.timeindex[2:6],
+                                    timesteps=range(2, 6))
+        ok_(om.Storage.capacity[storage, 5].fixed)
+
+        _set_initial_capacity(om, storage, 4, last=False)
+        ok_(not om.Storage.capacity[storage, 5].fixed)
+        for v in om.component_data_objects(po.Var):
+            v.value = 0
+        eq_(po.value(om.Storage.balance[storage, 2].body), -4 * 0.9)
+
+    def test_window_with_gradient(self):
+        """Gradients are not constrained at the first timestep of a window."""
+        solph.Source(label='source', outputs={self.bus: solph.Flow(
+            nominal_value=10, positive_gradient=0.5)})
+        om = solph.OperationalModel(self.es, timeindex=self.es.timeindex[2:6],
+                                    timesteps=range(2, 6))
+        eq_(sorted(t for i, o, t in om.Flow.positive_gradient_constr),
+            [3, 4, 5])
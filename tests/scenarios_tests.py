@@ -0,0 +1,99 @@
+from collections import UserDict, UserList
+
+from nose.tools import eq_, ok_
+import pandas as pd
+
+from oemof import network
+from oemof import solph
+from oemof.solph import scenarios
+from oemof.solph.scenarios import _isolate, apply_overrides, compact_results
+
+
+def _energy_system():
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+    bus = solph.Bus(label='bus')
+    solph.Source(label='source', outputs={
+        bus: solph.Flow(nominal_value=10, variable_costs=2)})
+    return es
+
+
+class _StubModel:
+    """ Stores the nominal values of the flows as results instead of
+    solving.
+    """
+    def __init__(self, es, **kwargs):
+        self.es = es
+
+    def solve(self, solver, solver_io, **kwargs):
+        results = UserDict()
+        for node in self.es.nodes:
+            for target, flow in node.outputs.items():
+                results.setdefault(node, UserDict())[target] = UserList(
+                    [flow.nominal_value] * len(self.es.timeindex))
+        results.objective = len(self.es.nodes)
+        self.es.results = results
+
+
+class Scenarios_Tests:
+
+    def setup(self):
+        self.registries = (network.Node.registry, network.Entity.registry)
+        self.model = scenarios.OperationalModel
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        self.bus = solph.Bus(label='bus')
+        self.source = solph.Source(label='source', outputs={
+            self.bus: solph.Flow(nominal_value=10, variable_costs=2)})
+
+    def teardown(self):
+        network.Node.registry, network.Entity.registry = self.registries
+        scenarios.OperationalModel = self.model
+
+    def test_apply_overrides(self):
+        apply_overrides(self.es, {
+            ('source', 'bus'): {'variable_costs': [1, 2, 3],
+                                'nominal_value': 20}})
+        flow = self.source.outputs[self.bus]
+        eq_(list(flow.variable_costs), [1, 2, 3])
+        eq_(flow.nominal_value, 20)
+
+    def test_scalar_override_of_sequence(self):
+        apply_overrides(self.es, {('source', 'bus'): {'max': 0.5}})
+        eq_(self.source.outputs[self.bus].max[2], 0.5)
+
+    def test_compact_results(self):
+        results = UserDict()
+        results[self.source] = UserDict({self.bus: UserList([1, 2, 3])})
+        results.objective = 6
+        results.investment = {(self.source, self.bus): 4}
+        compact = compact_results(results)
+        eq_(compact[('source', 'bus')].tolist(), [1.0, 2.0, 3.0])
+        eq_(compact['objective'], 6)
+        eq_(compact['investment'], {('source', 'bus'): 4})
+
+    def test_isolate(self):
+        """ Nodes created after isolation belong to no energy system.
+        """
+        _isolate()
+        ok_(network.Node.registry is None)
+        ok_(network.Entity.registry is None)
+        node = solph.Bus(label='isolated')
+        ok_(node not in self.es.nodes)
+        ok_(node._graph is not self.es.graph)
+        eq_(list(network.flow(self.source)), [self.bus])
+
+    def test_solve_scenarios(self):
+        """ Every scenario is created and solved in a worker process.
+        """
+        # the worker processes are forked and inherit the stub
+        scenarios.OperationalModel = _StubModel
+        results = scenarios.solve_scenarios(
+            _energy_system, [{}, {('source', 'bus'): {'nominal_value': 20}}],
+            solver='test', max_workers=2)
+        eq_([r[('source', 'bus')].tolist() for r in results],
+            [[10.0, 10.0, 10.0], [20.0, 20.0, 20.0]])
+        eq_([r['objective'] for r in results], [2, 2])
+        # the energy system of the calling process is unchanged
+        ok_(network.Node.registry is self.es)
+        eq_(len(self.es.nodes), 2)
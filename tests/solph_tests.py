@@ -1,9 +1,49 @@
-from nose.tools import ok_, eq_
+import os.path as ospath
+import shutil
+import tempfile
+
+from nose.tools import ok_, eq_, assert_raises
+import pandas as pd
+import pyomo.environ as po
 
 from oemof.energy_system import EnergySystem as ES
 from oemof.solph.blocks import InvestmentFlow as IF
+from oemof.solph.matrix import MatrixModel
 from oemof.solph.network import Investment
 import oemof.solph as solph
+from oemof.solph import persistent, plumbing
+from oemof.solph.warmstart import Solution
+from oemof.tools import helpers
+
+
+class LinearExpression_Tests:
+
+    def setup(self):
+        self.version_info = plumbing.version_info
+        self.m = po.ConcreteModel()
+        self.m.x = po.Var([0, 1, 2], initialize=2)
+
+    def teardown(self):
+        plumbing.version_info = self.version_info
+
+    def check_expression(self):
+        x = self.m.x
+        expr = plumbing.linear_expression([x[0], x[1], x[2]], [1, 0, 3], 4)
+        eq_(expr.polynomial_degree(), 1)
+        for values in ([2, 2, 2], [1, -5, 0.5]):
+            for k, v in enumerate(values):
+                x[k].value = v
+            eq_(po.value(expr), values[0] + 3 * values[2] + 4)
+
+    def test_linear_expression(self):
+        self.check_expression()
+
+    def test_without_coopr3_trees(self):
+        """ Newer versions of pyomo do not use the coopr3 sums.
+        """
+        plumbing.version_info = (5, 5, 0)
+        ok_(not plumbing._coopr3_trees())
+        self.check_expression()
 
 
 class Grouping_Tests:
@@ -38,3 +78,400 @@ class Grouping_Tests:
             ("Expected InvestmentFlow group to be nonempty.\n" +
              "Got: {}").format(self.es.groups.get(IF)))
 
+
+class Dump_Tests:
+
+    def setup(self):
+        self.es = ES(groupings=solph.GROUPINGS,
+                     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            variable_costs=2)})
+        solph.Sink(label='Sink', inputs={b: solph.Flow(
+            actual_value=[1., 2., 3.], nominal_value=1, fixed=True)})
+        solph.Bus(label='Gas', balanced=False)
+        solph.Storage(
+            label='Storage', inputs={b: solph.Flow()},
+            outputs={b: solph.Flow()}, nominal_capacity=5,
+            capacity_loss=0.01, initial_capacity=0.5)
+        self.dpath = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.dpath)
+
+    def restore(self, binary):
+        self.es.dump(self.dpath, 'es', binary=binary)
+        restored = ES(groupings=solph.GROUPINGS)
+        restored.restore(self.dpath, 'es')
+        return restored
+
+    def test_groups_of_restored_system(self):
+        """ A system dumped before its groups were accessed is grouped
+        before it is dumped.
+        """
+        for binary in (False, True):
+            restored = self.restore(binary)
+            eq_([n.label for n in restored.groups[solph.blocks.Bus]],
+                ['Bus'])
+
+    def lp_file(self, es):
+        filename = ospath.join(self.dpath, 'model.lp')
+        om = solph.OperationalModel(es)
+        om.write(filename, io_options={'symbolic_solver_labels': True})
+        with open(filename) as f:
+            return f.read()
+
+    def test_model_of_restored_system(self):
+        """ The attributes of the nodes are restored, so a restored system
+        has the same model.
+        """
+        expected = self.lp_file(self.es)
+        for binary in (False, True):
+            restored = self.restore(binary)
+            ok_(not restored.groups['Gas'].balanced)
+            eq_(restored.groups['Storage'].nominal_capacity, 5)
+            eq_(self.lp_file(restored), expected)
+
+    def test_attributes_keyed_by_nodes(self):
+        """ Attributes referring to other nodes refer to the restored
+        nodes.
+        """
+        b = self.es.groups['Bus']
+        solph.LinearTransformer(
+            label='Plant', inputs={self.es.groups['Gas']: solph.Flow()},
+            outputs={b: solph.Flow(nominal_value=2)},
+            conversion_factors={b: 0.4})
+        restored = self.restore(True)
+        factors = restored.groups['Plant'].conversion_factors
+        eq_(list(factors), [restored.groups['Bus']])
+        eq_(factors[restored.groups['Bus']][2], 0.4)
+
+
+class Timeincrement_Tests:
+
+    def setup(self):
+        self.es = ES(groupings=solph.GROUPINGS, timeindex=pd.DatetimeIndex(
+            ['2012-01-01 00:00', '2012-01-01 01:00', '2012-01-01 03:00',
+             '2012-01-01 06:00']))
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            variable_costs=2)})
+
+    def test_irregular_subset_of_timesteps(self):
+        """ The lengths of a subset of the timesteps of an irregular time
+        index are the lengths of these timesteps.
+        """
+        om = solph.OperationalModel(self.es, timesteps=[1, 2])
+        eq_([om.timeincrement[t] for t in om.TIMESTEPS], [2, 3])
+        model = MatrixModel(self.es, timesteps=[1, 2])
+        eq_([model.timeincrement[t] for t in model.timesteps], [2, 3])
+
+
+class Update_Tests:
+
+    def setup(self):
+        self.es = ES(groupings=solph.GROUPINGS,
+                     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        self.tmppath = helpers.extend_basic_path('tmp')
+
+    def lp_file(self, om, name):
+        filename = ospath.join(self.tmppath, name)
+        om.write(filename, io_options={'symbolic_solver_labels': True})
+        with open(filename) as f:
+            return f.read()
+
+    def test_update(self):
+        """ An updated model equals a model built from the changed flows.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=100, variable_costs=[2, 3, 4], fixed_costs=5)})
+        solph.Source(label='Backup', outputs={b: solph.Flow(
+            variable_costs=50)})
+        sink = solph.Sink(label='Sink', inputs={b: solph.Flow(
+            actual_value=[12, 16, 14], nominal_value=1, fixed=True)})
+        om = solph.OperationalModel(self.es)
+
+        source.outputs[b].variable_costs = solph.plumbing.sequence(7)
+        source.outputs[b].max = solph.plumbing.sequence(0.5)
+        source.outputs[b].nominal_value = 50
+        sink.inputs[b].fixed = False
+        om.update()
+
+        eq_(self.lp_file(om, 'updated.lp'),
+            self.lp_file(solph.OperationalModel(self.es), 'built.lp'))
+
+    def test_objective_skips_zero_costs(self):
+        """ Flows without costs are not part of the objective function.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=100, variable_costs=[2, 0, 4], fixed_costs=5)})
+        solph.Source(label='Free', outputs={b: solph.Flow(variable_costs=0)})
+        om = solph.OperationalModel(self.es)
+
+        objective = self.lp_file(om, 'objective.lp').split('s.t.')[0]
+        ok_('Free' not in objective)
+        ok_('flow(Source_Bus_1)' not in objective)
+        ok_('flow(Source_Bus_2)' in objective)
+
+        for t, value in enumerate([1, 2, 3]):
+            om.flow[source, b, t].value = value
+        eq_(om.Flow.variable_costs(), 14)
+        eq_(om.Flow.fixed_costs(), 500)
+        eq_(om.objective(), 514)
+
+    def test_missing_variable_costs(self):
+        """ Variable costs containing None are rejected.
+        """
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            variable_costs=[2, None, 4])})
+        assert_raises(ValueError, solph.OperationalModel, self.es)
+
+
+class Results_Tests:
+
+    def setup(self):
+        self.es = ES(groupings=solph.GROUPINGS,
+                     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+
+    def test_columnar_results(self):
+        """ The columnar results and the dictionary contain the values of
+        the variables.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=100, variable_costs=2)})
+        storage = solph.Storage(
+            label='Storage', inputs={b: solph.Flow()},
+            outputs={b: solph.Flow()}, nominal_capacity=10)
+        om = solph.OperationalModel(self.es)
+        om.receive_duals()
+        for t in om.TIMESTEPS:
+            om.flow[source, b, t].value = t
+            om.flow[b, storage, t].value = 2 * t
+            om.flow[storage, b, t].value = 0
+            om.Storage.capacity[storage, t].value = 3 * t
+            om.dual[om.Bus.balance[b, t]] = 4 * t
+
+        columnar = om.columnar_results()
+        eq_(columnar[source, b].tolist(), [0, 1, 2])
+        eq_(columnar.flow.shape, (3, 3))
+        eq_(columnar.capacity.tolist(), [[0, 3, 6]])
+        eq_(columnar.duals.tolist(), [[0, 4, 8]])
+        eq_(columnar.objective, 6)
+
+        results = om.results()
+        eq_(list(results[source][b]), [0, 1, 2])
+        eq_(list(results[b][storage]), [0, 2, 4])
+        eq_(list(results[storage][storage]), [0, 3, 6])
+        eq_(results[b][b], [0, 4, 8])
+        eq_(results.objective, 6)
+
+    def test_duals_are_divided_by_the_timeincrement(self):
+        """ The duals keep the scale of balances weighted by the length of
+        the timesteps.
+        """
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            variable_costs=2)})
+        om = solph.OperationalModel(self.es, timeincrement=[1, 2, 4])
+        om.receive_duals()
+        for v in om.component_data_objects(po.Var):
+            v.value = 0
+        for t in om.TIMESTEPS:
+            om.dual[om.Bus.balance[b, t]] = 8
+        eq_(om.columnar_results().duals.tolist(), [[8, 4, 2]])
+
+
+class _RecordingSolver:
+    """ Records the calls of a persistent solver interface.
+    """
+    def __init__(self):
+        self.calls = []
+        self.options = {}
+
+    def set_instance(self, om, **kwargs):
+        self.calls.append('set_instance')
+
+    def update_var(self, var):
+        self.calls.append(('update_var', var.name))
+
+    def set_objective(self, objective):
+        self.calls.append('set_objective')
+
+
+class _AvailableSolver:
+
+    def __init__(self, name):
+        self.name = name
+
+    def available(self, exception_flag=True):
+        return True
+
+
+class _SolverRegistry:
+    """ A solver factory as in Pyomo >= 5.5, which does not provide
+    `services`.
+    """
+    def __iter__(self):
+        return iter(['glpk', 'test_persistent'])
+
+    def __call__(self, name, **kwargs):
+        return _AvailableSolver(name)
+
+    def services(self):
+        raise RuntimeError("Unknown solver services")
+
+
+class Persistent_Tests:
+
+    def setup(self):
+        self.es = ES(groupings=solph.GROUPINGS,
+                     timeindex=pd.date_range('1/1/2012', periods=2, freq='H'))
+        self.factory = persistent._persistent_solver_factory
+        self.solver_factory = persistent.SolverFactory
+
+    def teardown(self):
+        persistent._persistent_solver_factory = self.factory
+        persistent.SolverFactory = self.solver_factory
+
+    def test_persistent_interface_lookup(self):
+        """ The persistent interface is found in the registered solvers.
+        """
+        persistent.SolverFactory = _SolverRegistry()
+        eq_(persistent._persistent_solver_factory('test').name,
+            'test_persistent')
+        assert_raises(ValueError, persistent._persistent_solver_factory,
+                      'glpk')
+
+    def test_unknown_solver(self):
+        """ A solver without persistent interface raises a ValueError.
+        """
+        om = solph.OperationalModel(self.es)
+        assert_raises(ValueError, om.solve, solver='nonexistent',
+                      solver_io='persistent')
+
+    def test_update_is_pushed(self):
+        """ An update of the model is pushed to the persistent interface.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=100, variable_costs=2)})
+        om = solph.OperationalModel(self.es)
+        persistent._persistent_solver_factory = (
+            lambda solver: _RecordingSolver())
+        om.persistent = persistent.PersistentSolver(om, solver='test')
+
+        source.outputs[b].nominal_value = 50
+        om.update()
+
+        eq_(om.persistent.opt.calls,
+            ['set_instance', ('update_var', 'flow[Source,Bus,0]'),
+             ('update_var', 'flow[Source,Bus,1]'), 'set_objective'])
+
+
+class _StartValues(Exception):
+    pass
+
+
+class _WarmStartSolver:
+    """ Raises the keyword arguments of `solve` instead of solving.
+    """
+    def __init__(self, *args, **kwargs):
+        self.options = {}
+
+    def warm_start_capable(self):
+        return True
+
+    def solve(self, om, **kwargs):
+        raise _StartValues(kwargs)
+
+
+class WarmStart_Tests:
+
+    def setup(self):
+        self.es = ES(groupings=solph.GROUPINGS,
+                     timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        self.bus = solph.Bus(label='Bus')
+        self.peak = solph.Source(label='Peak', outputs={self.bus: solph.Flow(
+            nominal_value=10, min=0.5, variable_costs=3,
+            binary=solph.BinaryFlow())})
+        self.storage = solph.Storage(
+            label='Storage', inputs={self.bus: solph.Flow()},
+            outputs={self.bus: solph.Flow()}, capacity_loss=0.01,
+            investment=Investment(ep_costs=10))
+        self.demand = solph.Sink(label='Demand', inputs={self.bus: solph.Flow(
+            actual_value=[1, 2, 3], nominal_value=1, fixed=True)})
+        self.factory = solph.models.SolverFactory
+
+    def teardown(self):
+        solph.models.SolverFactory = self.factory
+
+    def test_solution_of_model(self):
+        """ All variables are mapped by label and timestamp.
+        """
+        om = solph.OperationalModel(self.es)
+        for t in om.TIMESTEPS:
+            om.flow[self.peak, self.bus, t].value = 5 * t
+            om.BinaryFlow.status[self.peak, self.bus, t].value = t % 2
+            om.InvestmentStorage.capacity[self.storage, t].value = t
+        om.InvestmentStorage.invest[self.storage].value = 7
+        solution = Solution.from_model(om)
+
+        # a model of the next two hours
+        self.es.timeindex = self.es.timeindex[1:]
+        om = solph.OperationalModel(self.es, timesteps=range(2))
+        om.warm_start(solution)
+        ok_(om.warm_started)
+        eq_([om.flow[self.peak, self.bus, t].value for t in om.TIMESTEPS],
+            [5, 10])
+        eq_([om.BinaryFlow.status[self.peak, self.bus, t].value
+             for t in om.TIMESTEPS], [1, 0])
+        eq_([om.InvestmentStorage.capacity[self.storage, t].value
+             for t in om.TIMESTEPS], [1, 2])
+        eq_(om.InvestmentStorage.invest[self.storage].value, 7)
+        # fixed flows keep their values
+        eq_([om.flow[self.bus, self.demand, t].value for t in om.TIMESTEPS],
+            [1, 2])
+
+    def test_subset_of_timesteps(self):
+        """ A model over some timesteps of the time index is mapped by the
+        timestamps of these timesteps.
+        """
+        solution = Solution(
+            self.es.timeindex, {('flow', ('Peak', 'Bus')): [1., 2., 3.]})
+        om = solph.OperationalModel(self.es, timesteps=[1, 2])
+        om.warm_start(solution)
+        eq_([om.flow[self.peak, self.bus, t].value for t in om.TIMESTEPS],
+            [2, 3])
+        solution = Solution.from_model(om)
+        eq_(list(solution.timeindex), list(self.es.timeindex[1:]))
+        eq_(solution.series['flow', ('Peak', 'Bus')].tolist(), [2, 3])
+
+    def test_save_and_load(self):
+        solution = Solution(
+            self.es.timeindex, {('flow', ('Peak', 'Bus')): [1., 2., 3.]},
+            {('invest', ('Storage',)): 4})
+        filename = ospath.join(helpers.extend_basic_path('tmp'),
+                               'solution.pickle')
+        solution.save(filename)
+        solution = Solution.load(filename)
+        eq_(solution.series, {('flow', ('Peak', 'Bus')): [1., 2., 3.]})
+        eq_(solution.scalars, {('invest', ('Storage',)): 4})
+
+    def test_warmstart_is_passed(self):
+        """ The solver is asked for a warm start after start values were set.
+        """
+        om = solph.OperationalModel(self.es)
+        solph.models.SolverFactory = _WarmStartSolver
+        with assert_raises(_StartValues) as raised:
+            om.solve(solver='test')
+        eq_(raised.exception.args[0], {})
+
+        om.warm_start({self.peak: {self.bus: [5, 6, 7]}})
+        eq_(om.flow[self.peak, self.bus, 2].value, 7)
+        with assert_raises(_StartValues) as raised:
+            om.solve(solver='test', solve_kwargs={'tee': True})
+        eq_(raised.exception.args[0], {'tee': True, 'warmstart': True})
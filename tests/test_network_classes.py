@@ -1,9 +1,11 @@
+import gc
 from traceback import format_exception_only as feo
+import weakref
 
 from nose.tools import assert_raises, eq_, ok_
 
 from oemof.energy_system import EnergySystem as ES
-from oemof.network import Bus, Node, Transformer
+from oemof.network import Bus, GraphStore, Node, Transformer
 
 
 class Node_Tests:
@@ -117,3 +119,69 @@ class EnergySystem_Nodes_Integration_Tests:
         b2 = Bus(label='<B2>')
         Transformer(label='<TF1>', inputs=[b1], outputs=[b2])
         ok_(isinstance(self.es.entities[2], Transformer))
+
+
+class GraphStore_Tests:
+
+    def setup(self):
+        self.es = ES()
+
+    def test_that_every_energy_system_has_its_own_store(self):
+        b1 = Bus(label='<B1>')
+        Node(label='<N1>', inputs=[b1])
+        other = ES()
+        b2 = Bus(label='<B2>')
+        Node(label='<N2>', outputs=[b2])
+        ok_(b1._graph is self.es.graph)
+        ok_(b2._graph is other.graph)
+        ok_(self.es.graph is not other.graph)
+        eq_(len(self.es.graph.nodes), 2)
+        eq_(len(other.graph.nodes), 2)
+
+    def test_that_edges_keep_their_order_when_the_store_is_compacted(self):
+        bus = Bus(label='<B>')
+        nodes = [Node(label=i, inputs=[bus]) for i in range(200)]
+        graph = self.es.graph
+        graph._compact()
+        eq_(graph._pending_size, 0)
+        eq_(list(bus.outputs), nodes)
+        eq_(list(nodes[7].inputs), [bus])
+        eq_(len(graph.outgoing), 200)
+
+    def test_that_setting_an_item_of_a_view_adds_an_edge(self):
+        b1 = Bus(label='<B1>')
+        b2 = Bus(label='<B2>')
+        b1.outputs[b2] = "flow"
+        eq_(b1.outputs[b2], "flow")
+        eq_(dict(b2.inputs.items()), {b1: "flow"})
+        b1.outputs[b2] = "replaced"
+        eq_(list(b2.inputs.values()), ["replaced"])
+        eq_(len(self.es.graph.values), 1)
+
+    def test_edges_between_nodes_of_different_stores(self):
+        b1 = Bus(label='<B1>')
+        other = ES()
+        b2 = Bus(label='<B2>', inputs=[b1])
+        ok_(b2 in b1.outputs)
+        ok_(b1 in b2.inputs)
+        ok_(b2 not in self.es.graph.nodes[0].inputs)
+
+    def test_that_nodes_without_registry_are_not_kept_alive(self):
+        Node.registry = None
+        try:
+            n1 = Node(label='<N1>')
+            n2 = Node(label='<N2>', inputs=[n1])
+            ok_(n1._graph is not n2._graph)
+            ok_(n2 in n1.outputs)
+            ok_(n1 in n2.inputs)
+            reference = weakref.ref(n1)
+            del n1, n2
+            gc.collect()
+            ok_(reference() is None)
+        finally:
+            Node.registry = self.es
+
+    def test_an_empty_store(self):
+        graph = GraphStore()
+        eq_(graph.edges_of(Node(label='<N>')), [])
+        eq_(graph.edge(Node(label='<A>'), Node(label='<B>')), None)